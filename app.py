@@ -1,43 +1,109 @@
-from flask import Flask, render_template, request, jsonify
-import threading
-import main
-import process_state
+import json
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 import config
+import jobs
+import metrics
+import process_state
+from ssextractor import api_scheduler
 
 app = Flask(__name__)
 
+# Every submitted migration runs as a job with its own credentials, status and workspace
+job_manager = jobs.create_job_manager()
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     if request.method == 'POST':
-        # Reset cancel flag for each new migration
-        process_state.cancel_requested = False
-        
-        # Get configuration from form
-        configuration = {
+        # Get configuration from form; keys the form doesn't ask for (AppSheet) keep their configured values
+        configuration = dict(config.CREDENTIALS)
+        configuration.update({
             "SMARTSHEET_API_KEY": request.form.get('smartsheet_api_key'),
             "SMARTSHEET_FOLDER_ID": request.form.get('smartsheet_folder_id'),
             "GOOGLE_DRIVE_SHEETS_FOLDER_ID": request.form.get('google_drive_sheets_folder_id'),
             "GOOGLE_DRIVE__COMMENTS_FOLDER_ID": request.form.get('google_drive_comments_folder_id'),
             "GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID": request.form.get('google_drive_attachments_folder_id')
-        }
-
-        # Update global configuration
-        config.CREDENTIALS.update(configuration)
-        #print(config.CREDENTIALS)
-        # Start migration in a background thread
-        threading.Thread(target=main.run_migration).start()
-        return render_template('migration_started.html')
+        })
+
+        # Queue the migration; the job keeps its own copy of the credentials
+        job = job_manager.submit(configuration)
+        return render_template('migration_started.html', job_id=job.id)
     return render_template('index.html')
 
-@app.route('/status', methods=['GET'])
-def status():
-    # Return current migration status as JSON
-    return jsonify(process_state.migration_status)
+def _job_or_404(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return None, (jsonify({"error": f"Unknown job '{job_id}'"}), 404)
+    return job, None
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify([
+        {"job_id": job.id, "state": job.state, "submitted_at": job.submitted_at}
+        for job in job_manager.list()
+    ])
+
+@app.route('/status/<job_id>', methods=['GET'])
+def status(job_id):
+    # Return the job's migration status as JSON, with live API rate-limit stats (shared by all jobs)
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    data = job.describe()
+    data['api'] = api_scheduler.stats()
+    return jsonify(data)
+
+@app.route('/events/<job_id>', methods=['GET'])
+def events(job_id):
+    # Server-Sent Events: pushes the job's progress as it changes instead of being polled
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+
+    def generate():
+        for event, data in process_state.stream_progress(
+            job.status,
+            lambda: job.finished_at is not None,
+            interval=config.SETTINGS["PROGRESS_EVENT_INTERVAL_SECONDS"],
+            heartbeat=config.SETTINGS["PROGRESS_HEARTBEAT_SECONDS"],
+            window=config.SETTINGS["THROUGHPUT_WINDOW_SECONDS"],
+        ):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            data.update({"job_id": job.id, "state": job.state, "result": job.result})
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Stage timings, API calls, retries and bytes of every run in this process, for Prometheus to scrape
+    return Response(metrics.registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cancel/<job_id>', methods=['POST'])
+def cancel(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    job_manager.cancel(job_id)
+    return jsonify({"job_id": job.id, "status": "cancelled"})
+
+@app.route('/pause/<job_id>', methods=['POST'])
+def pause(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    job_manager.pause(job_id)
+    return jsonify({"job_id": job.id, "status": "paused" if job.token.paused else "not paused"})
 
-@app.route('/cancel', methods=['POST'])
-def cancel():
-    process_state.cancel_requested = True
-    return jsonify({"status": "cancelled"})
+@app.route('/resume/<job_id>', methods=['POST'])
+def resume(job_id):
+    job, error = _job_or_404(job_id)
+    if error:
+        return error
+    job_manager.resume(job_id)
+    return jsonify({"job_id": job.id, "status": "resumed"})
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
@@ -9,7 +9,8 @@ a = Analysis(
         ('templates', 'templates'),
         # ('service_account.json', '.')  # Uncomment if you bundle it
     ],
-    hiddenimports=[],
+    # Imported inside functions (or by pandas at run time), so list them for the bundle explicitly
+    hiddenimports=['pandas', 'openpyxl', 'googleapiclient.discovery', 'google.oauth2.service_account', 'google_auth_httplib2'],
     hookspath=['.'],  # Ensure your custom hook is picked up
     runtime_hooks=[],
     excludes=[]
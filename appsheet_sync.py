@@ -0,0 +1,195 @@
+# appsheet_sync.py
+import threading
+
+from cancellation import Cancelled
+from rate_limiter import raise_for_retryable_status
+from row_fingerprints import row_fingerprint
+from workers import BoundedExecutor
+
+
+def column_letter(number):
+    """1 → 'A', 26 → 'Z', 27 → 'AA', ..."""
+    letters = ""
+    while number > 0:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def a1_range(sheet_name, first_row, last_row, last_column):
+    """A1 notation for rows first_row..last_row, columns A..last_column of a tab (the name quoted as Sheets expects)."""
+    quoted = sheet_name.replace("'", "''")
+    return f"'{quoted}'!A{first_row}:{column_letter(last_column)}{last_row}"
+
+
+class AppSheetSync:
+    """
+    Copies a Google Sheets tab into an AppSheet table.
+
+    The tab's extent comes from its grid size and header row instead of a fixed range, so no column
+    or row is cut off. Rows are read from the Sheets values API `block_rows` at a time and posted to
+    AppSheet in batches of `batch_size` rows, with up to `max_concurrent` batches in flight. Each batch
+    is its own scheduled call, so a throttled or failing batch is retried on its own; a batch that
+    still fails is reported without stopping the others.
+    """
+
+    def __init__(self, sheets_service_factory, scheduler, session_factory, api_base,
+                 block_rows=2000, batch_size=500, max_concurrent=4, locale="en-US"):
+        self.sheets_service_factory = sheets_service_factory
+        self.scheduler = scheduler
+        self.session_factory = session_factory
+        self.api_base = api_base.rstrip("/")
+        self.block_rows = max(1, int(block_rows))
+        self.batch_size = max(1, int(batch_size))
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.locale = locale
+
+    # ✅ Reading the tab
+    def data_extent(self, spreadsheet_id, sheet_name):
+        """Returns (header, grid row count); the grid row count is the upper bound for data rows."""
+        spreadsheets = self.sheets_service_factory().spreadsheets()
+        metadata = spreadsheets.get(
+            spreadsheetId=spreadsheet_id, fields="sheets(properties(title,gridProperties(rowCount,columnCount)))",
+        ).execute()
+        grids = {
+            sheet["properties"]["title"]: sheet["properties"].get("gridProperties", {})
+            for sheet in metadata.get("sheets", [])
+        }
+        if sheet_name not in grids:
+            raise ValueError(f"Spreadsheet {spreadsheet_id} has no tab named '{sheet_name}'")
+        grid = grids[sheet_name]
+        header_range = a1_range(sheet_name, 1, 1, max(1, grid.get("columnCount", 1)))
+        values = spreadsheets.values().get(spreadsheetId=spreadsheet_id, range=header_range).execute().get("values", [])
+        return (values[0] if values else []), grid.get("rowCount", 0)
+
+    def iter_record_blocks(self, spreadsheet_id, sheet_name, header, row_count):
+        """
+        Yields the data rows as AppSheet records ({column: value}), one list per block read. Blank rows are
+        skipped. Every block up to the grid's row count is read, even after an empty one: rows can follow
+        a blank stretch, and a delta sync may only delete rows it has seen the whole tab without.
+        """
+        width = len(header)
+        values_api = self.sheets_service_factory().spreadsheets().values()
+        first = 2
+        while first <= row_count:
+            last = min(row_count, first + self.block_rows - 1)
+            rows = values_api.get(spreadsheetId=spreadsheet_id, range=a1_range(sheet_name, first, last, width)).execute().get("values", [])
+            yield [dict(zip(header, row + [""] * (width - len(row)))) for row in rows if any(cell != "" for cell in row)]
+            first = last + 1
+
+    # ✅ Writing to AppSheet
+    def post_rows(self, app_id, table_name, api_key, rows, action="AddOrUpdate"):
+        """Sends one batch of records to the AppSheet table; returns the number of rows sent."""
+        url = f"{self.api_base}/apps/{app_id}/tables/{table_name}/Action"
+        headers = {"Content-Type": "application/json", "ApplicationAccessKey": api_key}
+        payload = {"Action": action, "Properties": {"Locale": self.locale}, "Rows": rows}
+        response = self.scheduler.call(
+            "appsheet", lambda: raise_for_retryable_status(self.session_factory().post(url, headers=headers, json=payload)),
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"AppSheet {action} returned {response.status_code}: {response.text[:500]}")
+        return len(rows)
+
+    def send(self, app_id, table_name, api_key, records, action="AddOrUpdate", on_sent=None):
+        """
+        Posts records (any iterable) in batches, up to max_concurrent at once, and returns a summary:
+        {"rows", "batches", "failed_batches", "failed_rows", "errors"}. on_sent(batch), if given, is
+        called (one batch at a time) for each batch AppSheet accepted.
+        """
+        summary = {"rows": 0, "batches": 0, "failed_batches": 0, "failed_rows": 0, "errors": []}
+        lock = threading.Lock()
+        cancelled = []
+
+        def post(batch):
+            try:
+                sent = self.post_rows(app_id, table_name, api_key, batch, action)
+            except (Exception, Cancelled) as e:
+                with lock:
+                    summary["failed_batches"] += 1
+                    summary["failed_rows"] += len(batch)
+                    summary["errors"].append(str(e))
+                    if isinstance(e, Cancelled):
+                        cancelled.append(e)
+                return
+            with lock:
+                summary["rows"] += sent
+                if on_sent is not None:
+                    on_sent(batch)
+
+        # The pool's bounded backlog keeps the reader from running far ahead of the posts
+        with BoundedExecutor(self.max_concurrent, thread_name_prefix="appsheet") as pool:
+            batch = []
+            for record in records:
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    pool.submit(post, batch)
+                    summary["batches"] += 1
+                    batch = []
+            if batch:
+                pool.submit(post, batch)
+                summary["batches"] += 1
+
+        if cancelled:
+            raise cancelled[0]
+        return summary
+
+    def sync(self, spreadsheet_id, sheet_name, app_id, table_name, api_key, fingerprints=None):
+        """
+        Copies the tab into the AppSheet table and returns a summary (None if the tab is empty). With a
+        fingerprint store, only rows added or changed since the last sync are sent and rows gone from the
+        tab are deleted; without one, or when the tab has no 'Row ID' column, every row is sent.
+        """
+        header, row_count = self.data_extent(spreadsheet_id, sheet_name)
+        if not header:
+            return None
+        blocks = self.iter_record_blocks(spreadsheet_id, sheet_name, header, row_count)
+        records = (record for block in blocks for record in block)
+        if fingerprints is None or "Row ID" not in header:
+            summary = self.send(app_id, table_name, api_key, records)
+            summary.update(delta=False, unchanged=0, deleted=0)
+            return summary
+        target = f"{app_id}/{table_name}/{spreadsheet_id}/{sheet_name}"
+        return self._send_changes(app_id, table_name, api_key, records, fingerprints, target)
+
+    def _send_changes(self, app_id, table_name, api_key, records, fingerprints, target):
+        """AddOrUpdate for new or changed rows, Delete for rows no longer in the tab; records what AppSheet accepted."""
+        previous = fingerprints.fingerprints(target)
+        current = {}  # Row ID → fingerprint of every row read this time
+        accepted = dict(previous)
+        unchanged = 0
+
+        def changed_records():
+            nonlocal unchanged
+            for record in records:
+                row_id = record["Row ID"]
+                fingerprint = row_fingerprint(record)
+                if row_id:
+                    current[row_id] = fingerprint
+                    if previous.get(row_id) == fingerprint:
+                        unchanged += 1
+                        continue
+                yield record
+
+        def record_sent(batch):
+            for record in batch:
+                if record["Row ID"]:
+                    accepted[record["Row ID"]] = current[record["Row ID"]]
+
+        def record_deleted(batch):
+            for record in batch:
+                accepted.pop(record["Row ID"], None)
+
+        try:
+            summary = self.send(app_id, table_name, api_key, changed_records(), on_sent=record_sent)
+            removed = [{"Row ID": row_id} for row_id in previous if row_id not in current]
+            deletes = self.send(app_id, table_name, api_key, removed, action="Delete", on_sent=record_deleted)
+        finally:
+            # Rows from failed batches keep their old fingerprint (or none), so the next sync sends them again
+            fingerprints.replace(target, accepted)
+
+        summary["batches"] += deletes["batches"]
+        summary["failed_batches"] += deletes["failed_batches"]
+        summary["failed_rows"] += deletes["failed_rows"]
+        summary["errors"] += deletes["errors"]
+        summary.update(delta=True, unchanged=unchanged, deleted=deletes["rows"])
+        return summary
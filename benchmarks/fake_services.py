@@ -0,0 +1,283 @@
+# fake_services.py
+import email.parser
+import itertools
+import json
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from synthetic import SyntheticFolder
+
+
+class FakeState:
+    """Server-side state: the synthetic folder, the fake Drive's files and upload sessions, and request counters."""
+
+    def __init__(self, folder, latency=0.0):
+        self.folder = folder
+        self.latency = latency
+        self.files = {}  # Drive file ID → metadata
+        self.uploads = {}  # upload session ID → {"metadata", "received", "file_id"}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def new_file(self, metadata, size=0, file_id=None):
+        with self.lock:
+            file_id = file_id or f"file{next(self._ids)}"
+            entry = self.files.setdefault(file_id, {"id": file_id, "trashed": False})
+            entry.update({key: value for key, value in metadata.items() if key in ("name", "mimeType", "parents", "shortcutDetails")})
+            entry["size"] = str(size)
+            return dict(entry)
+
+
+def _json(status, payload, headers=None):
+    body = json.dumps(payload).encode("utf-8")
+    return status, dict({"Content-Type": "application/json"}, **(headers or {})), body
+
+
+def _not_found():
+    return _json(404, {"errorCode": 1006, "message": "Not Found", "error": {"code": 404, "message": "Not found"}})
+
+
+def _page(items, query):
+    page_size = int(query.get("pageSize", ["100"])[0])
+    page = int(query.get("page", ["1"])[0])
+    total_pages = max(1, -(-len(items) // page_size))
+    start = (page - 1) * page_size
+    return {
+        "pageNumber": page,
+        "pageSize": page_size,
+        "totalPages": total_pages,
+        "totalCount": len(items),
+        "data": items[start:start + page_size],
+    }
+
+
+# ✅ Smartsheet API (under /2.0)
+def smartsheet_route(state, method, path, query, headers, base_url):
+    state.count("smartsheet_calls")
+    folder = state.folder
+    parts = path.strip("/").split("/")[1:]  # drop "2.0"
+    if method != "GET" or not parts:
+        return _not_found()
+    if parts[0] == "folders" and len(parts) == 2:
+        return _json(200, folder.folder())
+    if parts[0] == "folders" and parts[2:] == ["children"]:
+        sheets = [dict(sheet, resourceType="sheet") for sheet in folder.folder()["sheets"]]
+        return _json(200, {"data": sheets, "lastKey": None})
+    if parts[0] != "sheets" or len(parts) < 2 or not parts[1].isdigit() or not folder.has_sheet(int(parts[1])):
+        return _not_found()
+
+    sheet_id = int(parts[1])
+    if len(parts) == 2:
+        if "application/vnd.ms-excel" in headers.get("accept", ""):
+            body = folder.excel(sheet_id)
+            state.count("bytes_served", len(body))
+            disposition = f'attachment; filename="{folder.sheet_name(sheet_id)}.xlsx";'
+            return 200, {"Content-Type": "application/vnd.ms-excel", "Content-Disposition": disposition}, body
+        sheet = folder.sheet(sheet_id)
+        if "pageSize" in query:
+            page = _page(sheet["rows"], query)
+            sheet["rows"] = page["data"]
+        return _json(200, sheet)
+    if parts[2] == "version":
+        return _json(200, {"version": 1})
+    if parts[2] == "attachments" and len(parts) == 3:
+        return _json(200, _page(folder.attachments(sheet_id), query))
+    if parts[2] == "attachments" and len(parts) == 4:
+        attachment = folder.attachment(sheet_id, int(parts[3]), base_url)
+        return _json(200, attachment) if attachment else _not_found()
+    if parts[2] == "discussions":
+        return _json(200, _page(folder.discussions(sheet_id), query))
+    return _not_found()
+
+
+# ✅ Drive v3 (metadata, multipart / resumable uploads)
+def _query_value(q, pattern):
+    match = re.search(pattern, q)
+    return match.group(1).replace("\\'", "'").replace("\\\\", "\\") if match else None
+
+
+def drive_route(state, method, path, query, headers, body, base_url):
+    state.count("drive_calls")
+    parts = path.strip("/").split("/")
+
+    if parts[0] == "upload":
+        return _upload_route(state, method, parts, query, headers, body, base_url)
+
+    file_id = parts[3] if len(parts) > 3 else None
+    if file_id is None and method == "GET":
+        q = query.get("q", [""])[0]
+        name = _query_value(q, r"name='((?:[^'\\]|\\.)*)'")
+        parent = _query_value(q, r"'([^']*)' in parents")
+        mimetype = _query_value(q, r"mimeType='([^']*)'")
+        with state.lock:
+            files = [
+                {"id": entry["id"], "name": entry.get("name")}
+                for entry in state.files.values()
+                if not entry["trashed"]
+                and (name is None or entry.get("name") == name)
+                and (parent is None or parent in entry.get("parents", []))
+                and (mimetype is None or entry.get("mimeType") == mimetype)
+            ]
+        return _json(200, {"files": files})
+    if file_id is None and method == "POST":
+        return _json(200, state.new_file(json.loads(body or b"{}")))
+    if file_id is not None and method == "GET":
+        with state.lock:
+            entry = state.files.get(file_id)
+        return _json(200, dict(entry)) if entry else _json(404, {"error": {"code": 404, "message": "File not found"}})
+    return _not_found()
+
+
+def _upload_route(state, method, parts, query, headers, body, base_url):
+    upload_type = query.get("uploadType", [""])[0]
+    file_id = parts[4] if len(parts) > 4 else None
+    upload_id = query.get("upload_id", [None])[0]
+
+    if upload_id is not None:
+        # A chunk (or a status check) of a resumable session
+        session = state.uploads.get(upload_id)
+        if session is None:
+            return _json(404, {"error": {"code": 404, "message": "Upload session not found"}})
+        content_range = headers.get("content-range", "")
+        match = re.match(r"bytes (\d+)-(\d+)/(\d+|\*)", content_range)
+        if match:
+            session["received"] = int(match.group(2)) + 1
+            state.count("bytes_received", len(body))
+            total = match.group(3)
+            if total != "*" and session["received"] >= int(total):
+                state.uploads.pop(upload_id, None)
+                return _json(200, state.new_file(session["metadata"], session["received"], session["file_id"]))
+        # Otherwise it is a status check ("bytes */total"): report what we have so far
+        response_headers = {"Range": f"bytes=0-{session['received'] - 1}"} if session["received"] else {}
+        return 308, response_headers, b""
+
+    if upload_type == "resumable":
+        upload_id = uuid.uuid4().hex
+        state.uploads[upload_id] = {"metadata": json.loads(body or b"{}"), "received": 0, "file_id": file_id}
+        location = f"{base_url}/upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}"
+        return 200, {"Location": location, "Content-Length": "0"}, b""
+
+    if upload_type == "multipart":
+        content_type = headers.get("content-type", "")
+        message = email.parser.BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        parts_ = message.get_payload()
+        metadata = json.loads(parts_[0].get_payload(decode=True) or b"{}")
+        media = parts_[1].get_payload(decode=True) or b""
+        state.count("bytes_received", len(media))
+        return _json(200, state.new_file(metadata, len(media), file_id))
+
+    return _not_found()
+
+
+# ✅ Drive batch endpoint: multipart/mixed of embedded HTTP requests
+def batch_route(state, headers, body, base_url):
+    state.count("drive_batch_calls")
+    content_type = headers.get("content-type", "")
+    message = email.parser.BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    boundary = uuid.uuid4().hex
+    out = []
+    for part in message.get_payload():
+        content_id = part.get("Content-ID", "").strip("<>")
+        raw = part.get_payload(decode=True) or part.get_payload().encode()
+        head, _, inner_body = raw.replace(b"\r\n", b"\n").partition(b"\n\n")
+        lines = head.decode().split("\n")
+        inner_method, inner_uri, _ = lines[0].split(" ", 2)
+        inner_headers = {key.lower(): value for key, value in (line.split(": ", 1) for line in lines[1:] if ": " in line)}
+        parsed = urllib.parse.urlparse(inner_uri)
+        state.count("drive_batch_items")
+        status, response_headers, response_body = drive_route(
+            state, inner_method, parsed.path, urllib.parse.parse_qs(parsed.query), inner_headers, inner_body, base_url,
+        )
+        out.append(
+            f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+            f"HTTP/1.1 {status} OK\r\nContent-Type: {response_headers.get('Content-Type', 'application/json')}\r\n\r\n".encode()
+            + response_body + b"\r\n"
+        )
+    payload = b"".join(out) + f"--{boundary}--\r\n".encode()
+    return 200, {"Content-Type": f"multipart/mixed; boundary={boundary}"}, payload
+
+
+class FakeServicesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None  # set on the subclass made by serve()
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self, method):
+        state = self.state
+        if state.latency:
+            time.sleep(state.latency)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        parsed = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(parsed.query)
+        base_url = f"http://{self.headers.get('Host')}"
+        headers = {key.lower(): value for key, value in self.headers.items()}
+
+        if parsed.path.startswith("/files/"):
+            return self._send_attachment(int(parsed.path.rsplit("/", 1)[1]))
+        if parsed.path == "/token":
+            state.count("token_calls")
+            status, response_headers, payload = _json(200, {"access_token": "benchmark-token", "expires_in": 3600, "token_type": "Bearer"})
+        elif parsed.path == "/_stats":
+            with state.lock:
+                status, response_headers, payload = _json(200, dict(state.counters, drive_files=len(state.files)))
+        elif parsed.path.startswith("/2.0/"):
+            status, response_headers, payload = smartsheet_route(state, method, parsed.path, query, headers, base_url)
+        elif parsed.path.startswith("/batch/"):
+            status, response_headers, payload = batch_route(state, headers, body, base_url)
+        elif parsed.path.startswith(("/drive/", "/upload/drive/")):
+            status, response_headers, payload = drive_route(state, method, parsed.path, query, headers, body, base_url)
+        else:
+            status, response_headers, payload = _not_found()
+
+        self.send_response(status)
+        for key, value in response_headers.items():
+            if key.lower() != "content-length":
+                self.send_header(key, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_attachment(self, attachment_id):
+        state = self.state
+        state.count("attachment_downloads")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(state.folder.attachment_size()))
+        self.end_headers()
+        for chunk in state.folder.attachment_chunks(attachment_id):
+            self.wfile.write(chunk)
+        state.count("bytes_served", state.folder.attachment_size())
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+
+def serve(spec, ready, host="127.0.0.1", port=0, latency=0.0):
+    """Runs the fake Smartsheet / Drive / OAuth server until the process is stopped; puts its base URL on `ready`."""
+    state = FakeState(SyntheticFolder(spec), latency)
+    handler = type("Handler", (FakeServicesHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    ready.put(f"http://{host}:{server.server_port}")
+    server.serve_forever()
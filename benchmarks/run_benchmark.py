@@ -0,0 +1,176 @@
+# run_benchmark.py
+"""
+Offline throughput benchmark: runs main.run_migration end to end against local fake Smartsheet and
+Drive services serving a synthetic folder, then reports sheets/min, MB/s, peak RSS and API calls per sheet.
+
+    python benchmarks/run_benchmark.py --sheets 20 --rows 500 --attachments 10 --attachment-kb 512
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import urllib.request
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+import fake_services
+from synthetic import FOLDER_ID, DatasetSpec
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args(argv=None):
+    defaults = DatasetSpec()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sheets", type=int, default=defaults.sheets, help="Sheets in the synthetic folder")
+    parser.add_argument("--rows", type=int, default=defaults.rows, help="Rows per sheet")
+    parser.add_argument("--columns", type=int, default=defaults.columns, help="Columns per sheet")
+    parser.add_argument("--comments", type=int, default=defaults.comments, help="Row comments per sheet")
+    parser.add_argument("--attachments", type=int, default=defaults.attachments, help="Row attachments per sheet")
+    parser.add_argument("--attachment-kb", type=int, default=defaults.attachment_kb, help="Size of each attachment in KB")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay the fake services add to every request")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the real API rate limits (default: effectively unlimited)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a config.SETTINGS value (JSON value), e.g. --set SHEET_CONCURRENCY=8")
+    parser.add_argument("--workdir", help="Working directory for the run (default: a temporary one, removed afterwards)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def write_service_account(path, token_uri):
+    """A service account key that signs real JWTs, pointed at the fake token endpoint."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "type": "service_account",
+            "project_id": "benchmark",
+            "private_key_id": "benchmark",
+            "private_key": pem.decode("ascii"),
+            "client_email": "benchmark@benchmark.iam.gserviceaccount.com",
+            "client_id": "1",
+            "token_uri": token_uri,
+        }, f)
+
+
+def start_fake_services(spec, latency):
+    """Starts the fake services in their own process, so their memory and CPU don't count against the run."""
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(target=fake_services.serve, args=(spec,), kwargs={"ready": ready, "latency": latency}, daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+
+def fetch_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/_stats") as response:
+        return json.load(response)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def configure(base_url, workdir, args):
+    import config
+
+    config.SETTINGS.update({
+        "SMARTSHEET_API_BASE": f"{base_url}/2.0",
+        "GOOGLE_API_ROOT_URL": base_url,
+        "WORKSPACE_ROOT": workdir,
+    })
+    if not args.rate_limits:
+        for key in ("SMARTSHEET_REQUESTS_PER_MINUTE", "DRIVE_REQUESTS_PER_MINUTE", "SHEETS_REQUESTS_PER_MINUTE", "APPSHEET_REQUESTS_PER_MINUTE"):
+            config.SETTINGS[key] = 6_000_000
+    for override in args.set:
+        key, _, value = override.partition("=")
+        config.SETTINGS[key] = json.loads(value)
+    config.CREDENTIALS.update({
+        "SMARTSHEET_API_KEY": "benchmark",
+        "SMARTSHEET_FOLDER_ID": FOLDER_ID,
+        "GOOGLE_DRIVE_SHEETS_FOLDER_ID": "benchmark-sheets",
+        "GOOGLE_DRIVE__COMMENTS_FOLDER_ID": "benchmark-comments",
+        "GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID": "benchmark-attachments",
+    })
+
+
+def run(args):
+    spec = DatasetSpec(args.sheets, args.rows, args.columns, args.comments, args.attachments, args.attachment_kb)
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="ssextractor-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    server, base_url = start_fake_services(spec, args.latency_ms / 1000)
+    cwd = os.getcwd()
+    try:
+        # service_account.json, manifests and upload sessions are all read from the working directory
+        write_service_account(os.path.join(workdir, "service_account.json"), f"{base_url}/token")
+        os.chdir(workdir)
+        sys.path.insert(0, REPO_ROOT)
+        configure(base_url, workdir, args)
+
+        import main
+        import process_state
+        from ssextractor import api_scheduler
+
+        print(f"🚀 Benchmark: {spec.sheets} sheets x {spec.rows} rows x {spec.columns} columns, "
+              f"{spec.comments} comments and {spec.attachments} x {spec.attachment_kb} KB attachments per sheet")
+        started = time.perf_counter()
+        result = main.run_migration()
+        elapsed = time.perf_counter() - started
+
+        status = process_state.migration_status
+        server_stats = fetch_stats(base_url)
+        sheets = max(1, spec.sheets)
+        transferred = server_stats.get("bytes_served", 0) + server_stats.get("bytes_received", 0)
+        report = {
+            "spec": spec._asdict(),
+            "result": result,
+            "seconds": round(elapsed, 3),
+            "sheets_done": status["sheets_done"],
+            "sheets_failed": status["sheets_failed"],
+            "sheets_per_minute": round(status["sheets_done"] / elapsed * 60, 2),
+            "mb_per_second": round(transferred / (1024 * 1024) / elapsed, 2),
+            "mb_downloaded": round(server_stats.get("bytes_served", 0) / (1024 * 1024), 2),
+            "mb_uploaded": round(server_stats.get("bytes_received", 0) / (1024 * 1024), 2),
+            "peak_rss_mb": peak_rss_mb(),
+            "api_calls_per_sheet": {
+                "smartsheet": round(server_stats.get("smartsheet_calls", 0) / sheets, 2),
+                "drive": round(server_stats.get("drive_calls", 0) / sheets, 2),
+                "drive_http_requests": round(
+                    (server_stats.get("drive_calls", 0) - server_stats.get("drive_batch_items", 0)
+                     + server_stats.get("drive_batch_calls", 0)) / sheets, 2),
+                "attachment_downloads": round(server_stats.get("attachment_downloads", 0) / sheets, 2),
+            },
+            "server": server_stats,
+            "scheduler": api_scheduler.stats(),
+        }
+    finally:
+        os.chdir(cwd)
+        server.terminate()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    calls = report["api_calls_per_sheet"]
+    print(f"📊 {report['sheets_done']} sheets ({report['sheets_failed']} failed) in {report['seconds']}s: "
+          f"{report['sheets_per_minute']} sheets/min, {report['mb_per_second']} MB/s, peak RSS {report['peak_rss_mb']} MB")
+    print(f"📊 API calls per sheet: {calls['smartsheet']} Smartsheet, {calls['drive']} Drive "
+          f"({calls['drive_http_requests']} HTTP requests after batching), {calls['attachment_downloads']} attachment downloads")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.json}")
+    return report
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,148 @@
+# synthetic.py
+import io
+from collections import namedtuple
+
+import openpyxl
+
+# Shape of a generated Smartsheet folder
+DatasetSpec = namedtuple(
+    "DatasetSpec",
+    ["sheets", "rows", "columns", "comments", "attachments", "attachment_kb"],
+    defaults=[10, 200, 10, 20, 10, 256],
+)
+
+FOLDER_ID = 1000
+_SHEET_BASE = 10_000
+_ROW_BASE = 1_000_000_000
+_ATTACHMENT_BASE = 2_000_000_000
+_DISCUSSION_BASE = 3_000_000_000
+
+
+class SyntheticFolder:
+    """
+    Deterministic fake Smartsheet folder: `sheets` sheets of rows x columns, each with `comments` row
+    comments and `attachments` row attachments of `attachment_kb` KB. IDs are derived from positions,
+    so the fake server never has to hold the whole dataset.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.sheet_ids = [_SHEET_BASE + index for index in range(spec.sheets)]
+        self._workbooks = {}
+
+    def has_sheet(self, sheet_id):
+        return sheet_id in self.sheet_ids
+
+    def sheet_name(self, sheet_id):
+        return f"Benchmark Sheet {sheet_id - _SHEET_BASE + 1}"
+
+    def row_id(self, sheet_id, row_number):
+        return _ROW_BASE + (sheet_id - _SHEET_BASE) * 100_000 + row_number
+
+    # ✅ Smartsheet API payloads
+    def folder(self):
+        return {
+            "id": FOLDER_ID,
+            "name": "Benchmark Folder",
+            "sheets": [{"id": sheet_id, "name": self.sheet_name(sheet_id)} for sheet_id in self.sheet_ids],
+        }
+
+    def sheet(self, sheet_id):
+        spec = self.spec
+        columns = [
+            {"id": index + 1, "index": index, "title": f"Column {index + 1}", "type": "TEXT_NUMBER", "primary": index == 0}
+            for index in range(spec.columns)
+        ]
+        rows = [
+            {
+                "id": self.row_id(sheet_id, row_number),
+                "rowNumber": row_number,
+                "cells": [
+                    {"columnId": column + 1, "value": self._cell(row_number, column), "displayValue": str(self._cell(row_number, column))}
+                    for column in range(spec.columns)
+                ],
+            }
+            for row_number in range(1, spec.rows + 1)
+        ]
+        return {"id": sheet_id, "name": self.sheet_name(sheet_id), "version": 1, "totalRowCount": spec.rows, "columns": columns, "rows": rows}
+
+    def _row_for(self, index):
+        # Spread comments and attachments over the rows
+        return 1 + (index * 7) % max(1, self.spec.rows)
+
+    def attachments(self, sheet_id):
+        return [
+            {
+                "id": _ATTACHMENT_BASE + (sheet_id - _SHEET_BASE) * 100_000 + index,
+                "name": f"attachment_{index + 1}.bin",
+                "attachmentType": "FILE",
+                "mimeType": "application/octet-stream",
+                "parentType": "ROW",
+                "parentId": self.row_id(sheet_id, self._row_for(index)),
+                "sizeInKb": self.spec.attachment_kb,
+            }
+            for index in range(self.spec.attachments)
+        ]
+
+    def attachment(self, sheet_id, attachment_id, base_url):
+        for attachment in self.attachments(sheet_id):
+            if attachment["id"] == attachment_id:
+                return dict(attachment, url=f"{base_url}/files/{attachment_id}", urlExpiresInMillis=120000)
+        return None
+
+    def discussions(self, sheet_id):
+        return [
+            {
+                "id": _DISCUSSION_BASE + (sheet_id - _SHEET_BASE) * 100_000 + index,
+                "title": f"Comment {index + 1}",
+                "parentType": "ROW",
+                "parentId": self.row_id(sheet_id, self._row_for(index)),
+                "comments": [{
+                    "id": _DISCUSSION_BASE + (sheet_id - _SHEET_BASE) * 100_000 + 50_000 + index,
+                    "text": f"Comment {index + 1}",
+                    "createdBy": {"name": "Benchmark User", "email": "benchmark@example.com"},
+                    "createdAt": "2024-01-01T12:00:00Z",
+                }],
+            }
+            for index in range(self.spec.comments)
+        ]
+
+    @staticmethod
+    def _cell(row_number, column):
+        return f"R{row_number}C{column + 1}" if column % 2 == 0 else row_number * (column + 1)
+
+    # ✅ Excel export, laid out like Smartsheet's: the sheet tab, then a Comments tab
+    def excel(self, sheet_id):
+        workbook = self._workbooks.get(sheet_id)
+        if workbook is None:
+            workbook = self._workbooks[sheet_id] = self._build_excel(sheet_id)
+        return workbook
+
+    def _build_excel(self, sheet_id):
+        spec = self.spec
+        book = openpyxl.Workbook(write_only=True)
+        data = book.create_sheet(self.sheet_name(sheet_id)[:31])
+        data.append([f"Column {index + 1}" for index in range(spec.columns)])
+        for row_number in range(1, spec.rows + 1):
+            data.append([self._cell(row_number, column) for column in range(spec.columns)])
+
+        comments = book.create_sheet("Comments")
+        comments.append(["Row", "Comment", "Created By", "Created On"])
+        for index in range(spec.comments):
+            comments.append([f"Row {self._row_for(index)}", f"Comment {index + 1}", "benchmark@example.com", "2024-01-01 12:00"])
+
+        buffer = io.BytesIO()
+        book.save(buffer)
+        return buffer.getvalue()
+
+    # ✅ Attachment bytes, produced on the fly and unique per attachment
+    def attachment_size(self):
+        return self.spec.attachment_kb * 1024
+
+    def attachment_chunks(self, attachment_id, chunk_size=64 * 1024):
+        remaining = self.attachment_size()
+        block = (f"{attachment_id:020d}".encode() * (chunk_size // 20 + 1))[:chunk_size]
+        while remaining > 0:
+            chunk = block[:min(chunk_size, remaining)]
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,85 @@
+# cancellation.py
+import contextlib
+import contextvars
+import threading
+
+
+class Cancelled(BaseException):
+    """
+    Raised inside a stage or worker once its job has been cancelled. Like KeyboardInterrupt it is not an
+    Exception, so the stages' `except Exception` error handling never swallows it.
+    """
+
+    def __init__(self, message="Migration cancelled"):
+        super().__init__(message)
+
+
+class CancellationToken:
+    """
+    Cancel / pause / resume switch shared by every stage and worker of one migration run.
+
+    Workers call check() between units of work (download and upload chunks, API calls, rows);
+    it raises Cancelled after cancel() and blocks while the run is paused. wait() is a sleep
+    that ends early on cancellation, for backoff and rate-limit delays.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # Wake up anything blocked on a pause so it can see the cancellation
+        self._running.set()
+
+    def pause(self):
+        if not self._cancelled.is_set():
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def check(self):
+        """Raises Cancelled if the run was cancelled; blocks here while it is paused."""
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise Cancelled()
+
+    def wait(self, seconds):
+        """Sleeps for up to `seconds`, raising Cancelled as soon as the run is cancelled."""
+        if self._cancelled.wait(max(0.0, seconds)):
+            raise Cancelled()
+        self.check()
+
+
+_current_token = contextvars.ContextVar("cancellation_token", default=None)
+_idle_token = CancellationToken()
+
+
+def current_token():
+    """Token of the running migration (worker threads started through BoundedExecutor inherit it)."""
+    return _current_token.get() or _idle_token
+
+
+def bind_token(token):
+    """Makes `token` the current cancellation token for the rest of this context (used to set up a job's context)."""
+    _current_token.set(token)
+
+
+@contextlib.contextmanager
+def use_token(token):
+    """Makes `token` the current cancellation token for the enclosed block."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
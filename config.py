@@ -1,4 +1,6 @@
 # config.py
+import contextvars
+
 CREDENTIALS = {
     "SMARTSHEET_API_KEY": None,
     "SMARTSHEET_FOLDER_ID": None,
@@ -8,4 +10,73 @@ CREDENTIALS = {
     "APPSHEET_API_KEY": None,
     "APPSHEET_APP_ID": None,
     "APPSHEET_TABLE_NAME": None,
+    # Google service account key, read on first use; a job can name its own
+    "GOOGLE_SERVICE_ACCOUNT_FILE": "service_account.json",
+}
+
+# Credentials of the job running in the current context (set by jobs.py); CREDENTIALS is used outside a job
+_job_credentials = contextvars.ContextVar("credentials", default=None)
+
+
+def current_credentials():
+    credentials = _job_credentials.get()
+    return CREDENTIALS if credentials is None else credentials
+
+
+def bind_credentials(credentials):
+    """Makes `credentials` the credentials for the current context (used to set up a job's context)."""
+    _job_credentials.set(credentials)
+
+
+# Tuning knobs for a migration run
+SETTINGS = {
+    "WORKSPACE_ROOT": ".",  # Where sheets/, comments/, row_mapping/ and attachments/ are written
+    "SHEET_CACHE_MAX_SHEETS": 4,  # Sheet snapshots kept in memory at once
+    "SHEET_CACHE_MAX_CELLS": 2_000_000,  # Total cells across cached snapshots
+    "IN_MEMORY_PIPELINE": True,  # With COMMENTS_SOURCE "export": parse the exported workbook once and pass DataFrames between stages
+    "WRITE_INTERMEDIATE_FILES": False,  # Also write row_mapping/ files in pipeline mode (debug output)
+    "EXTRACTION_MODE": "excel",  # "excel": Smartsheet's xlsx export; "api": build the sheet table from paged get_sheet JSON
+    "OUTPUT_FORMAT": "xlsx",  # Prepared sheet file in "api" mode: "xlsx", "csv" or "parquet" (needs pyarrow)
+    "SHEET_PAGE_SIZE": 5000,  # Rows per get_sheet page in "api" mode
+    "COMMENTS_SOURCE": "export",  # "export": the export's Comments tab ("excel" mode only); "api": discussions API, keyed by row ID
+    "CELL_VALUE_SOURCE": "value",  # "api" mode cells: "value" (typed, display value if none) or "display" (as shown in Smartsheet)
+    "ATTACHMENT_DOWNLOAD_WORKERS": 8,  # Concurrent attachment downloads per sheet
+    "ATTACHMENT_QUEUE_SIZE": 32,  # Downloads queued ahead of the workers
+    "DOWNLOAD_CHUNK_SIZE": 64 * 1024,  # Bytes read per chunk while streaming a download
+    "SHEET_CONCURRENCY": 4,  # Sheets migrated at the same time (1 = one after another)
+    "MAX_CONCURRENT_SHEETS": 4,  # Web app: sheets migrated at once across all jobs
+    "MAX_ACTIVE_JOBS": 4,  # Web app: jobs sharing those slots; later jobs wait in the queue
+    "FINISHED_JOB_RETENTION_SECONDS": 3600,  # Web app: how long a finished job's status and run report are kept
+    "PROGRESS_EVENT_INTERVAL_SECONDS": 0.5,  # Web app: at most one progress event per job stream this often
+    "PROGRESS_HEARTBEAT_SECONDS": 15,  # Web app: keep-alive comment on an idle progress stream
+    "THROUGHPUT_WINDOW_SECONDS": 10,  # Upload throughput is measured over this trailing window
+    "RUN_REPORT_FILE": "run_report.json",  # JSON timings / API calls / bytes of the last run, in the workspace root
+    "ATTACHMENT_LIST_PAGE_SIZE": 1000,  # Page size for sheet-wide attachment/discussion listings
+    "UPLOAD_CHUNK_SIZE": 8 * 1024 * 1024,  # Resumable Drive upload chunk (rounded up to a 256 KB multiple)
+    "UPLOAD_SESSION_FILE": "upload_sessions.json",  # Where resumable upload sessions are remembered (under WORKSPACE_ROOT)
+    "ATTACHMENT_TRANSFER_MODE": "disk",  # "disk": download, then upload; "stream": pipe Smartsheet → Drive
+    "KEEP_LOCAL_ATTACHMENTS": False,  # In stream mode, also keep a copy under attachments/
+    "INCREMENTAL_SYNC": False,  # Skip unchanged sheets/attachments and update Drive files from earlier runs
+    "SYNC_MANIFEST_FILE": "sync_manifest.json",  # Under WORKSPACE_ROOT; delete it to force a full re-sync
+    "DEDUP_ATTACHMENTS": False,  # Shortcut to an existing Drive file instead of re-uploading identical bytes
+    "DEDUP_INDEX_FILE": "content_index.json",  # sha256 → Drive file ID per service account, kept across runs (under WORKSPACE_ROOT)
+    "SMARTSHEET_REQUESTS_PER_MINUTE": 300,  # Smartsheet's published limit per access token
+    "DRIVE_REQUESTS_PER_MINUTE": 12_000,  # Drive API default per-user quota
+    "SHEETS_REQUESTS_PER_MINUTE": 60,  # Sheets API default read quota per user
+    "APPSHEET_REQUESTS_PER_MINUTE": 60,  # AppSheet API calls (no published figure; kept conservative)
+    "API_MAX_RETRIES": 5,  # Retries for a throttled or failed API call before giving up
+    "API_BACKOFF_SECONDS": 1.0,  # First retry delay; doubles each attempt, with jitter
+    "API_MAX_BACKOFF_SECONDS": 60.0,  # Upper bound for one retry delay
+    "HTTP_CONNECT_TIMEOUT_SECONDS": 10,  # Give up on a connection that can't be opened
+    "HTTP_READ_TIMEOUT_SECONDS": 60,  # Give up on a connection that stops sending
+    "HTTP_POOL_CONNECTIONS": 10,  # Hosts each pooled HTTP session keeps keep-alive connections for
+    "HTTP_POOL_MAXSIZE": 16,  # Keep-alive connections per host in each pooled session (the shared Smartsheet client's covers every sheet worker)
+    "SMARTSHEET_API_BASE": "https://api.smartsheet.com/2.0",  # Smartsheet API root (benchmarks point it at a local fake)
+    "GOOGLE_API_ROOT_URL": None,  # Overrides https://www.googleapis.com/ for Drive/Sheets, uploads and batches alike
+    "APPSHEET_API_BASE": "https://api.appsheet.com/api/v2",  # AppSheet API root
+    "APPSHEET_READ_BLOCK_ROWS": 2000,  # Rows read from the Sheets values API per call when syncing to AppSheet
+    "APPSHEET_BATCH_SIZE": 500,  # Rows per AppSheet Action call
+    "APPSHEET_MAX_CONCURRENT_BATCHES": 4,  # AppSheet calls in flight at once (APPSHEET_REQUESTS_PER_MINUTE still applies)
+    "APPSHEET_DELTA_SYNC": False,  # Send only rows added/changed since the last AppSheet sync, and delete removed ones
+    "APPSHEET_FINGERPRINT_FILE": "appsheet_fingerprints.json",  # Row fingerprints of the last AppSheet sync (under WORKSPACE_ROOT); delete to re-send every row
 }
@@ -0,0 +1,94 @@
+# dedup_index.py
+import contextlib
+import contextvars
+
+from json_store import JsonStore
+
+SHORTCUT_MIMETYPE = "application/vnd.google-apps.shortcut"
+
+
+class ContentIndex(JsonStore):
+    """
+    Persistent sha256 → Drive file index used to avoid uploading the same bytes twice.
+
+    Entries are kept per scope (the service account uploading them), so a job only ever shortcuts
+    to files its own account put in Drive, and forgetting a file one account lost leaves every other
+    account's entries alone.
+
+    Layout: {"scopes": {scope: {sha256: {"file_id": str, "size": int}}}}. Entries are also indexed by
+    size in KB, so a streaming transfer can tell cheaply whether a file *might* be a duplicate before
+    spending a download on hashing it.
+    """
+
+    def __init__(self, path, flush_every=100):
+        super().__init__(path, flush_every)
+        self._by_size_kb = {}  # scope → {size in KB: {sha256, ...}}
+
+    def _empty(self):
+        return {"scopes": {}}
+
+    def _loaded(self, data):
+        data.setdefault("scopes", {})
+        for scope, entries in data["scopes"].items():
+            sizes = self._by_size_kb.setdefault(scope, {})
+            for digest, entry in entries.items():
+                sizes.setdefault(entry["size"] // 1024, set()).add(digest)
+
+    def _entries(self, scope):
+        return self._load()["scopes"].setdefault(str(scope), {})
+
+    def get(self, scope, digest):
+        with self._lock:
+            return self._entries(scope).get(digest)
+
+    def may_contain_size(self, scope, size_in_kb):
+        """True if some file indexed for scope has about this size (Smartsheet only reports sizes in KB)."""
+        if size_in_kb is None:
+            return False
+        with self._lock:
+            self._load()
+            sizes = self._by_size_kb.get(str(scope), {})
+            return any(sizes.get(kb) for kb in (size_in_kb - 1, size_in_kb, size_in_kb + 1))
+
+    def add(self, scope, digest, file_id, size):
+        with self._lock:
+            entries = self._entries(scope)
+            if digest in entries:
+                return
+            entries[digest] = {"file_id": file_id, "size": size}
+            self._by_size_kb.setdefault(str(scope), {}).setdefault(size // 1024, set()).add(digest)
+            self._changed()
+
+    def forget(self, scope, digest):
+        """Drops an entry whose Drive file has gone away."""
+        with self._lock:
+            entry = self._entries(scope).pop(digest, None)
+            if entry is not None:
+                self._by_size_kb.get(str(scope), {}).get(entry["size"] // 1024, set()).discard(digest)
+                self._changed()
+
+
+# (scope, Drive file ID) pairs already confirmed to exist during the running migration. Each run (and
+# job) starts with an empty set, so a file deleted from Drive since an earlier run is checked again.
+_verified_targets = contextvars.ContextVar("verified_dedup_targets", default=None)
+
+
+def current_verified_targets():
+    """The running migration's set of verified dedup targets (worker threads inherit it), or None outside one."""
+    return _verified_targets.get()
+
+
+def bind_verified_targets(targets):
+    """Makes targets current for the rest of this context (used to set up a job's context)."""
+    _verified_targets.set(targets)
+    return targets
+
+
+@contextlib.contextmanager
+def use_verified_targets(targets):
+    """Makes targets current for the duration of a run."""
+    token = _verified_targets.set(targets)
+    try:
+        yield targets
+    finally:
+        _verified_targets.reset(token)
@@ -0,0 +1,93 @@
+# drive_batch.py
+import random
+import time
+
+from googleapiclient.errors import HttpError
+
+from rate_limiter import classify_error
+
+# Drive accepts at most 100 calls in one batch request
+MAX_BATCH_SIZE = 100
+
+
+def is_retryable(error):
+    """True for throttling and server errors that are worth sending again."""
+    return isinstance(error, HttpError) and classify_error(error) is not None
+
+
+class DriveBatch:
+    """
+    Sends many small Drive metadata calls as batch requests of up to 100 calls each.
+
+    Each operation is a zero-argument function that builds the request (e.g.
+    lambda: service.files().get(fileId=...)), so failed items can be rebuilt and retried on
+    their own. Items that fail with a throttling or server error are retried with backoff;
+    other errors are reported per item without failing the rest of the batch.
+
+    With a scheduler (rate_limiter.RequestScheduler), each batch is charged one token per call it
+    carries and throttled items slow down the whole Drive service instead of just this batch. Retry
+    waits use the scheduler's sleep, so a cancelled run stops waiting at once.
+    """
+
+    def __init__(self, service_factory, max_retries=3, backoff=1.0, batch_size=MAX_BATCH_SIZE,
+                 scheduler=None, service_name="drive", sleep=None):
+        self.service_factory = service_factory
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.scheduler = scheduler
+        self.service_name = service_name
+        self.sleep = sleep or (scheduler.sleep if scheduler else time.sleep)
+
+    def execute(self, operations):
+        """Runs {key: request_factory} and returns ({key: response}, {key: error})."""
+        results = {}
+        errors = {}
+        remaining = dict(operations)
+        attempt = 0
+        while remaining:
+            retry = {}
+            retry_error = None
+            keys = list(remaining)
+            for start in range(0, len(keys), self.batch_size):
+                chunk = keys[start:start + self.batch_size]
+                for key, outcome in self._send(chunk, remaining).items():
+                    if isinstance(outcome, Exception):
+                        if attempt < self.max_retries and is_retryable(outcome):
+                            retry[key] = remaining[key]
+                            retry_error = outcome
+                        else:
+                            errors[key] = outcome
+                    else:
+                        results[key] = outcome
+            remaining = retry
+            if remaining:
+                attempt += 1
+                if self.scheduler:
+                    # The scheduler pauses every Drive caller when we are being throttled
+                    self.sleep(self.scheduler.backoff(self.service_name, attempt - 1, retry_error))
+                else:
+                    self.sleep(self.backoff * (2 ** (attempt - 1)) * (1 + random.random()))
+        return results, errors
+
+    def _send(self, keys, operations):
+        outcomes = {}
+        ids = {str(index): key for index, key in enumerate(keys)}
+
+        def callback(request_id, response, exception):
+            outcomes[ids[request_id]] = exception if exception is not None else response
+
+        batch = self.service_factory().new_batch_http_request(callback=callback)
+        for request_id, key in ids.items():
+            batch.add(operations[key](), request_id=request_id)
+        try:
+            if self.scheduler:
+                self.scheduler.call(self.service_name, batch.execute, cost=len(keys))
+            else:
+                batch.execute()
+        except Exception as e:
+            # The whole batch call failed; report it against every item that has no outcome yet
+            for key in keys:
+                outcomes.setdefault(key, e)
+        return outcomes
+
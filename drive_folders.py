@@ -0,0 +1,179 @@
+# drive_folders.py
+import contextlib
+import contextvars
+import threading
+
+FOLDER_MIMETYPE = "application/vnd.google-apps.folder"
+
+
+class DriveFolderCache:
+    """
+    Resolves Drive folder IDs by (parent ID, folder name).
+
+    The first lookup under a parent lists all of that parent's subfolders in one paged query, so
+    later lookups are answered from memory. A (parent, name) pair is claimed by one creator at a
+    time, so parallel workers never create two folders with the same name.
+    """
+
+    def __init__(self, service_factory, page_size=1000):
+        self._service = service_factory
+        self.page_size = page_size
+        self._ids = {}
+        self._warmed = set()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._warm_locks = {}
+
+    def lookup(self, folder_name, parent_id):
+        """Returns the cached folder ID, or None if it is not known yet."""
+        with self._lock:
+            return self._ids.get((parent_id, folder_name))
+
+    def remember(self, folder_name, parent_id, folder_id):
+        with self._lock:
+            self._ids.setdefault((parent_id, folder_name), folder_id)
+            return self._ids[(parent_id, folder_name)]
+
+    def is_warm(self, parent_id):
+        with self._lock:
+            return parent_id in self._warmed
+
+    def warm(self, parent_id):
+        """Loads every subfolder of parent_id into the cache with a single paged listing."""
+        with self._lock:
+            warm_lock = self._warm_locks.setdefault(parent_id, threading.Lock())
+        with warm_lock:
+            if self.is_warm(parent_id):
+                return
+            query = f"'{parent_id}' in parents and mimeType='{FOLDER_MIMETYPE}' and trashed=false"
+            page_token = None
+            while True:
+                results = self._service().files().list(
+                    q=query,
+                    fields="nextPageToken, files(id, name)",
+                    pageSize=self.page_size,
+                    pageToken=page_token,
+                ).execute()
+                for folder in results.get("files", []):
+                    # Keep the first match, like the old per-name query did
+                    self.remember(folder["name"], parent_id, folder["id"])
+                page_token = results.get("nextPageToken")
+                if not page_token:
+                    break
+            with self._lock:
+                self._warmed.add(parent_id)
+
+    def _claim(self, keys):
+        """Marks unresolved keys as being created by the caller; returns (claimed, events to wait on)."""
+        claimed, waiting = [], []
+        with self._lock:
+            for key in keys:
+                if key in self._ids:
+                    continue
+                event = self._pending.get(key)
+                if event is None:
+                    self._pending[key] = threading.Event()
+                    claimed.append(key)
+                else:
+                    waiting.append(event)
+        return claimed, waiting
+
+    def _release(self, keys):
+        with self._lock:
+            for key in keys:
+                event = self._pending.pop(key, None)
+                if event is not None:
+                    event.set()
+
+    @staticmethod
+    def _folder_metadata(folder_name, parent_id):
+        return {
+            "name": folder_name,
+            "mimeType": FOLDER_MIMETYPE,
+            "parents": [parent_id],
+        }
+
+    def get_or_create(self, folder_name, parent_id):
+        """Returns the ID of folder_name under parent_id, creating the folder if it doesn't exist."""
+        key = (parent_id, folder_name)
+        while True:
+            folder_id = self.lookup(folder_name, parent_id)
+            if folder_id:
+                return folder_id
+            claimed, waiting = self._claim([key])
+            if claimed:
+                break
+            # Someone else is resolving this folder; wait for them and look again
+            waiting[0].wait()
+
+        try:
+            self.warm(parent_id)
+            folder_id = self.lookup(folder_name, parent_id)
+            if folder_id:
+                return folder_id
+
+            # ✅ Create folder if it doesn't exist
+            folder = self._service().files().create(
+                body=self._folder_metadata(folder_name, parent_id), fields="id"
+            ).execute()
+            return self.remember(folder_name, parent_id, folder["id"])
+        finally:
+            self._release([key])
+
+    def ensure_folders(self, folder_names, parent_id, batch):
+        """
+        Makes sure every name in folder_names exists under parent_id, creating the missing ones
+        through Drive batch requests. Returns ({name: folder_id}, {name: error}).
+        """
+        self.warm(parent_id)
+        keys = [(parent_id, name) for name in dict.fromkeys(folder_names)]
+        claimed, waiting = self._claim(keys)
+        errors = {}
+        try:
+            if claimed:
+                created, failed = batch.execute({
+                    name: (lambda name=name: self._service().files().create(
+                        body=self._folder_metadata(name, parent_id), fields="id"
+                    ))
+                    for _, name in claimed
+                })
+                for name, folder in created.items():
+                    self.remember(name, parent_id, folder["id"])
+                errors.update(failed)
+        finally:
+            self._release(claimed)
+        for event in waiting:
+            event.wait()
+
+        folder_ids = {}
+        for _, name in keys:
+            folder_id = self.lookup(name, parent_id)
+            if folder_id:
+                folder_ids[name] = folder_id
+            elif name not in errors:
+                errors[name] = RuntimeError(f"Folder {name} was not created")
+        return folder_ids, errors
+
+
+_current_cache = contextvars.ContextVar("drive_folder_cache", default=None)
+
+
+def current_folder_cache():
+    """The folder cache of the running migration (worker threads inherit it), or None outside one."""
+    return _current_cache.get()
+
+
+def bind_folder_cache(cache):
+    """Makes cache current for the rest of this context (used to set up a job's context)."""
+    _current_cache.set(cache)
+    return cache
+
+
+@contextlib.contextmanager
+def use_folder_cache(cache):
+    """Makes cache current for the duration of a run."""
+    token = _current_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _current_cache.reset(token)
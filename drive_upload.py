@@ -0,0 +1,232 @@
+# drive_upload.py
+import functools
+import hashlib
+import os
+import time
+
+from googleapiclient.errors import HttpError
+
+from json_store import JsonStore
+
+# Drive requires resumable chunks to be a multiple of 256 KB
+CHUNK_ALIGNMENT = 256 * 1024
+
+
+# Drive keeps a resumable session for a week; older ones are dropped instead of being tried again
+SESSION_MAX_AGE_SECONDS = 6 * 24 * 3600
+
+
+class UploadSessionStore(JsonStore):
+    """
+    Persists resumable upload session URIs so an interrupted upload can continue after a restart.
+
+    Layout: {key: {"uri": str, "created": unix time}}. An entry is removed when its upload completes
+    and dropped once it is older than Drive keeps a session. New sessions are written at once, since
+    resuming after a crash is the point of keeping them.
+    """
+
+    def _loaded(self, data):
+        now = time.time()
+        for key in [key for key, entry in data.items() if not self._fresh(entry, now)]:
+            del data[key]
+            self._pending += 1
+
+    @staticmethod
+    def _fresh(entry, now):
+        return isinstance(entry, dict) and now - entry.get("created", 0) < SESSION_MAX_AGE_SECONDS
+
+    def get(self, key):
+        with self._lock:
+            sessions = self._load()
+            entry = sessions.get(key)
+            if entry is None:
+                return None
+            if not self._fresh(entry, time.time()):
+                del sessions[key]
+                self._changed()
+                return None
+            return entry["uri"]
+
+    def put(self, key, session_uri):
+        with self._lock:
+            self._load()[key] = {"uri": session_uri, "created": time.time()}
+            self._write()
+
+    def remove(self, key):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._changed()
+
+
+def aligned_chunk_size(chunk_size):
+    """Rounds a chunk size up to the 256 KB multiple Drive expects."""
+    return max(1, -(-int(chunk_size) // CHUNK_ALIGNMENT)) * CHUNK_ALIGNMENT
+
+
+def _session_key(file_path, metadata, file_id=None):
+    """
+    Identifies one upload of some content to one Drive location. The key comes from the bytes (size and
+    sha256), not the local path or mtime, so it still matches after the file is written again on a re-run.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    parents = ",".join(metadata.get("parents", []))
+    return f"{size}|{digest.hexdigest()}|{parents}|{metadata.get('name')}|{file_id or ''}"
+
+
+def _media_request(service, metadata, media, file_id=None):
+    """Builds a create request, or an update of the existing file's content when file_id is given."""
+    if file_id:
+        return service.files().update(fileId=file_id, body={"name": metadata.get("name")}, media_body=media, fields="id")
+    return service.files().create(body=metadata, media_body=media, fields="id")
+
+
+def upload_file(service, file_path, metadata, mimetype, chunk_size, session_store=None,
+                progress_callback=None, num_retries=3, file_id=None):
+    """
+    Uploads file_path to Drive and returns the file resource ({"id": ...}). With file_id, the
+    existing Drive file gets the new content instead of a new file being created.
+
+    Files larger than one chunk go through a resumable session, sent chunk_size bytes at a time;
+    the session URI is kept in session_store so a later call for the same file picks up from the
+    last byte Drive acknowledged. progress_callback(bytes_sent, total_bytes) is called after each chunk.
+    """
+    from googleapiclient.http import MediaFileUpload
+
+    total = os.path.getsize(file_path)
+    chunk_size = aligned_chunk_size(chunk_size)
+
+    if total <= chunk_size:
+        # One request is cheaper than opening a session for small files
+        media = MediaFileUpload(file_path, mimetype=mimetype)
+        response = _media_request(service, metadata, media, file_id).execute(num_retries=num_retries)
+        if progress_callback:
+            progress_callback(total, total)
+        return response
+
+    key = _session_key(file_path, metadata, file_id)
+    saved_uri = session_store.get(key) if session_store else None
+
+    def new_request(resume_uri):
+        media = MediaFileUpload(file_path, mimetype=mimetype, chunksize=chunk_size, resumable=True)
+        request = _media_request(service, metadata, media, file_id)
+        if resume_uri:
+            # Ask Drive how many bytes it already has before sending the next chunk
+            request.resumable_uri = resume_uri
+            request._in_error_state = True
+        return request
+
+    request = new_request(saved_uri)
+    response = None
+    while response is None:
+        try:
+            status, response = request.next_chunk(num_retries=num_retries)
+        except HttpError as e:
+            if saved_uri and e.resp.status in (404, 410):
+                # The saved session expired; start a fresh one
+                print(f"⚠️ Upload session for {os.path.basename(file_path)} expired, restarting upload.")
+                session_store.remove(key)
+                saved_uri = None
+                request = new_request(None)
+                continue
+            raise
+        if session_store and request.resumable_uri and request.resumable_uri != saved_uri:
+            saved_uri = request.resumable_uri
+            session_store.put(key, saved_uri)
+        if progress_callback:
+            progress_callback(total if response is not None else request.resumable_progress, total)
+
+    if session_store:
+        session_store.remove(key)
+    return response
+
+
+@functools.lru_cache(maxsize=None)
+def streaming_media_upload_class():
+    """
+    Returns StreamingMediaUpload. It subclasses googleapiclient's MediaUpload, whose module pulls in
+    httplib2, so the class is only defined once the first streaming upload needs it.
+    """
+    from googleapiclient.http import MediaUpload
+
+    class StreamingMediaUpload(MediaUpload):
+        """
+        Resumable media fed from an iterator of byte chunks (e.g. an HTTP download) instead of a file.
+
+        Only the bytes Drive has not yet acknowledged (and one chunk of read-ahead) are kept, so memory
+        stays around two upload chunks no matter how large the file is. The total size is unknown up
+        front; it is reported once the read-ahead reaches the end of the stream, so the last chunk is
+        sent with it even when the stream is an exact multiple of the chunk size.
+        """
+
+        def __init__(self, chunks, mimetype, chunksize):
+            super().__init__()
+            self._chunks = iter(chunks)
+            self._mimetype = mimetype
+            self._chunksize = aligned_chunk_size(chunksize)
+            self._buffer = bytearray()
+            self._buffer_start = 0
+            self._exhausted = False
+            self.bytes_read = 0
+
+        def chunksize(self):
+            return self._chunksize
+
+        def mimetype(self):
+            return self._mimetype
+
+        def size(self):
+            # Read one byte past the chunk next_chunk() is about to send: if the stream ends within it,
+            # that chunk must carry the total size (an empty closing chunk has no valid Content-Range)
+            self._fill(self._buffer_start + 2 * self._chunksize + 1)
+            return self._buffer_start + len(self._buffer) if self._exhausted else None
+
+        def resumable(self):
+            return True
+
+        def has_stream(self):
+            return False
+
+        def getbytes(self, begin, length):
+            if begin < self._buffer_start:
+                raise ValueError("Streaming upload cannot rewind past bytes Drive already acknowledged.")
+            # Everything before `begin` has been acknowledged and can be dropped
+            del self._buffer[:begin - self._buffer_start]
+            self._buffer_start = begin
+            self._fill(begin + length)
+            return bytes(self._buffer[:length])
+
+        def _fill(self, end):
+            """Reads from the source until the buffer reaches stream offset `end` or the source runs out."""
+            while self._buffer_start + len(self._buffer) < end and not self._exhausted:
+                try:
+                    chunk = next(self._chunks)
+                except StopIteration:
+                    self._exhausted = True
+                    break
+                self._buffer.extend(chunk)
+                self.bytes_read += len(chunk)
+
+    return StreamingMediaUpload
+
+
+def upload_stream(service, chunks, metadata, mimetype, chunk_size, progress_callback=None, num_retries=3):
+    """
+    Uploads the bytes produced by `chunks` to Drive through a resumable session without touching
+    disk, and returns the created file resource. progress_callback(bytes_sent, None) is called after
+    each chunk and progress_callback(total, total) once the upload finishes.
+    """
+    media = streaming_media_upload_class()(chunks, mimetype, chunk_size)
+    request = service.files().create(body=metadata, media_body=media, fields="id")
+    response = None
+    while response is None:
+        status, response = request.next_chunk(num_retries=num_retries)
+        if progress_callback and response is None:
+            progress_callback(request.resumable_progress, None)
+    if progress_callback:
+        progress_callback(media.bytes_read, media.bytes_read)
+    return response
@@ -1,6 +1,5 @@
-import smartsheet # Import Smartsheet SDK
+# The Smartsheet SDK and pandas are imported inside the functions that use them, so importing this module stays fast
 import os
-import pandas as pd
 #from dotenv import load_dotenv
 
 # ✅ Load environment variables
@@ -10,16 +9,31 @@ import pandas as pd
 # ✅ Initialize Smartsheet Client
 #smartsheet_client = smartsheet.Smartsheet(SMARTSHEET_API_KEY)
 
+def list_folder_sheets(client, folder_id):
+    """Returns the sheets directly inside a folder, using the paged children listing where the SDK has it."""
+    folders = client.Folders
+    if not hasattr(folders, "get_folder_children"):
+        # Older SDKs (before get_folder was removed) return the folder with its sheets in one call
+        return list(folders.get_folder(folder_id).sheets or [])
+    sheets = []
+    last_key = None
+    while True:
+        page = folders.get_folder_children(folder_id, children_resource_types=["sheets"], last_key=last_key)
+        sheets.extend(page.data or [])
+        last_key = page.last_key
+        if not last_key:
+            return sheets
+
 def get_sheets_in_folder(client, folder_id):
     """Retrieves all sheets inside a given Smartsheet folder and returns them as a list of dictionaries."""
+    import smartsheet # Import Smartsheet SDK
+
     try:
-        # ✅ Get the folder details
-        folder = client.Folders.get_folder(folder_id)
-        if hasattr(folder, 'sheets'):
-            sheets = folder.sheets
-            sheet_info = [{"Sheet ID": sheet.id, "Sheet Name": sheet.name} for sheet in sheets]
-            sheet_ids_list = [sheet.id for sheet in sheets]
-            print(f"✅ Found {len(sheets)} sheets in Folder ID {folder_id}.")
+        # ✅ Get the folder's sheets
+        sheets = list_folder_sheets(client, folder_id)
+        sheet_info = [{"Sheet ID": sheet.id, "Sheet Name": sheet.name} for sheet in sheets]
+        sheet_ids_list = [sheet.id for sheet in sheets]
+        print(f"✅ Found {len(sheets)} sheets in Folder ID {folder_id}.")
         for sheet in sheet_info:
             print(f"  - {sheet['Sheet Name']} (ID: {sheet['Sheet ID']})")
         return sheets,sheet_info,sheet_ids_list
@@ -33,6 +47,8 @@ def get_sheets_in_folder(client, folder_id):
 
 def save_sheet_ids_to_csv(folder_id, output_folder="sheet_id_exports"):
     """Extracts all sheet IDs from a Smartsheet folder and saves them as a CSV file."""
+    import pandas as pd
+
     try:
         os.makedirs(output_folder, exist_ok=True)  # ✅ Ensure output folder exists
         sheets = get_sheets_in_folder(folder_id)
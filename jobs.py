@@ -0,0 +1,287 @@
+# jobs.py
+import contextvars
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+
+import config
+import main
+import metrics
+import process_state
+from cancellation import Cancelled, CancellationToken, bind_token
+from dedup_index import bind_verified_targets
+from drive_folders import bind_folder_cache
+from workers import BoundedExecutor
+from workspace import bind_workspace
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class Job:
+    """
+    One migration submitted through the web app. It has its own credentials, status, cancellation
+    token, workspace, Drive folder cache and verified dedup targets, all held in a context that every
+    piece of its work runs in, so jobs never see each other's keys or progress.
+    """
+
+    def __init__(self, credentials, workspace_root):
+        self.id = uuid.uuid4().hex[:12]
+        self.state = QUEUED
+        self.result = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.status = process_state.new_status()
+        self.token = CancellationToken()
+        self.pending = deque()  # sheet IDs not yet handed to a worker
+        self.in_flight = 0
+        self.planned = False
+        self.closing = False  # set once a worker has taken on finishing the job
+
+        self._credentials = dict(credentials)
+        self.context = contextvars.Context()
+        self.workspace = self.context.run(self._bind, self._credentials, os.path.join(workspace_root, "jobs", self.id))
+
+    def _bind(self, credentials, workspace_root):
+        config.bind_credentials(credentials)
+        process_state.bind_status(self.status)
+        bind_token(self.token)
+        workspace = bind_workspace(workspace_root)
+        bind_folder_cache(main.new_drive_folder_cache())
+        bind_verified_targets(set())
+        metrics.bind_run()
+        return workspace
+
+    def release(self):
+        """Frees what a finished job no longer needs: its API keys and its local working files (the run report stays)."""
+        self._credentials.clear()
+        self.workspace.clear()
+
+    def run(self, fn, *args):
+        """Runs fn in (a copy of) this job's context; copies let several workers run for the job at once."""
+        return self.context.copy().run(fn, *args)
+
+    def describe(self):
+        """Job summary plus a snapshot of its migration status."""
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "result": self.result,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "queued_sheets": len(self.pending),
+            "status": process_state.snapshot(self.status),
+        }
+
+
+class JobManager:
+    """
+    Runs migration jobs on one shared pool of max_concurrent_sheets workers.
+
+    Up to max_active_jobs jobs are admitted at a time; the rest wait in a FIFO queue. Admitted jobs take
+    turns (round-robin) whenever a worker frees up, so a job with hundreds of sheets can't starve one
+    with a few, and the total load on the shared API quotas stays capped no matter how many jobs are submitted.
+
+    A finished job gives up its credentials and working files right away; its status stays available for
+    retention_seconds, after which the job and its workspace folder are removed.
+    """
+
+    def __init__(self, max_concurrent_sheets, max_active_jobs, workspace_root, retention_seconds=3600):
+        self.max_concurrent_sheets = max(1, int(max_concurrent_sheets))
+        self.max_active_jobs = max(1, int(max_active_jobs))
+        self.workspace_root = workspace_root
+        self.retention_seconds = max(0, retention_seconds)
+        self._jobs = {}
+        self._queue = deque()
+        self._active = deque()
+        self._busy = 0
+        self._cond = threading.Condition()
+        self._executor = BoundedExecutor(self.max_concurrent_sheets, queue_size=0, thread_name_prefix="job")
+        self._dispatcher = None
+
+    # ✅ Public API used by app.py
+    def submit(self, credentials):
+        """Queues a migration with its own copy of the credentials and returns the Job."""
+        self._prune()
+        job = Job(credentials, self.workspace_root)
+        job.status['progress'] = 'Queued'
+        with self._cond:
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self._ensure_dispatcher()
+            self._cond.notify_all()
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._cond:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancels a job; queued sheets are dropped and running ones stop at their next checkpoint."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.token.cancel()
+            job.status['paused'] = False
+            for sheet_id in job.pending:
+                job.status['sheets'][str(sheet_id)] = CANCELLED
+            job.pending.clear()
+            if job in self._queue:
+                # Never started; finish it right away
+                self._queue.remove(job)
+                job.planned = True
+                job.status['progress'] = 'Migration Cancelled'
+            closing = self._claim_if_idle(job)
+            self._cond.notify_all()
+        if closing:
+            self._close(job)
+        return job
+
+    def pause(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.token.pause()
+            job.status['paused'] = job.token.paused
+            process_state.mark_changed()
+        return job
+
+    def resume(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.token.resume()
+            job.status['paused'] = False
+            process_state.mark_changed()
+            with self._cond:
+                self._cond.notify_all()
+        return job
+
+    # ✅ Scheduling
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def _admit(self):
+        while self._queue and len(self._active) < self.max_active_jobs:
+            job = self._queue.popleft()
+            job.state = RUNNING
+            self._active.append(job)
+
+    def _next_work(self):
+        """Picks the next unit of work round-robin across active jobs: (job, None) to plan it, (job, sheet_id), or None."""
+        self._admit()
+        for _ in range(len(self._active)):
+            job = self._active[0]
+            self._active.rotate(-1)
+            if job.token.paused:
+                continue
+            if not job.planned and job.in_flight == 0:
+                return job, None
+            if job.pending:
+                return job, job.pending.popleft()
+        return None
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                work = None
+                while True:
+                    if self._busy < self.max_concurrent_sheets:
+                        work = self._next_work()
+                        if work is not None:
+                            break
+                    # Woken by new jobs, finished work, cancel or resume (paused jobs are rechecked every second)
+                    self._cond.wait(timeout=1.0)
+                job, sheet_id = work
+                job.in_flight += 1
+                self._busy += 1
+            if sheet_id is None:
+                future = self._executor.submit(job.run, self._plan, job)
+            else:
+                future = self._executor.submit(job.run, main.process_sheet, sheet_id)
+            future.add_done_callback(lambda f, job=job: self._work_done(job, f))
+
+    def _plan(self, job):
+        sheet_ids = main.plan_migration()
+        with self._cond:
+            job.planned = True
+            if sheet_ids is None:
+                job.result = "Error: Could not retrieve sheets from folder. Please verify your API key and folder ID."
+                job.state = FAILED
+            elif not job.token.cancelled:
+                job.pending.extend(sheet_ids)
+
+    def _work_done(self, job, future):
+        with self._cond:
+            self._busy -= 1
+            job.in_flight -= 1
+            error = future.exception()
+            if error is not None and not job.planned:
+                job.planned = True
+                if not isinstance(error, Cancelled):
+                    job.state = FAILED
+                    job.result = f"Error: {error}"
+            closing = self._claim_if_idle(job)
+            self._cond.notify_all()
+        if closing:
+            self._close(job)
+
+    def _claim_if_idle(self, job):
+        """
+        True if the job has been planned, none of its sheets are queued or running and no one is closing
+        it yet; the caller (which holds the lock) must then call _close() once it has released the lock.
+        """
+        if not job.planned or job.pending or job.in_flight or job.closing:
+            return False
+        job.closing = True
+        if job in self._active:
+            self._active.remove(job)
+        return True
+
+    def _close(self, job):
+        """Finishes a claimed job; finish_migration runs without the lock so other jobs keep being scheduled."""
+        result = None if job.state == FAILED else job.run(main.finish_migration)
+        job.release()
+        with self._cond:
+            if job.state == FAILED:
+                job.status['running'] = False
+                job.status['progress'] = job.result
+            else:
+                job.result = result
+                job.state = CANCELLED if job.token.cancelled else DONE
+            # Set last, so a progress stream that sees the job finished also sees its final status
+            job.finished_at = time.time()
+            self._cond.notify_all()
+        process_state.mark_changed()
+        self._prune()
+
+    def _prune(self):
+        """Drops jobs that finished more than retention_seconds ago, with their workspace folders."""
+        cutoff = time.time() - self.retention_seconds
+        with self._cond:
+            expired = [job for job in self._jobs.values() if job.finished_at is not None and job.finished_at <= cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.workspace.root, ignore_errors=True)
+
+
+def create_job_manager():
+    return JobManager(
+        config.SETTINGS["MAX_CONCURRENT_SHEETS"],
+        config.SETTINGS["MAX_ACTIVE_JOBS"],
+        config.SETTINGS["WORKSPACE_ROOT"],
+        config.SETTINGS["FINISHED_JOB_RETENTION_SECONDS"],
+    )
@@ -0,0 +1,74 @@
+# json_store.py
+import json
+import os
+import threading
+
+import config
+
+
+def state_path(path):
+    """Where a state file kept across runs lives: relative paths go under WORKSPACE_ROOT, not the working directory."""
+    if os.path.isabs(path):
+        return path
+    return os.path.join(os.path.abspath(config.SETTINGS["WORKSPACE_ROOT"]), path)
+
+
+class JsonStore:
+    """
+    Base for the small JSON files the pipeline keeps across runs (upload sessions, sync manifest, content index, AppSheet row fingerprints).
+
+    The file is read on first use. Changes are written in batches, after every `flush_every` changes
+    and whenever flush() is called (at the end of each sheet and of the run), through a temp file and
+    a rename so a crash never leaves it half written. Subclasses read and change `_data` under `_lock`
+    and call `_changed()` after each change.
+    """
+
+    def __init__(self, path, flush_every=100):
+        self.file_name = path
+        self.flush_every = max(1, int(flush_every))
+        self._lock = threading.RLock()
+        self._path = None
+        self._data = None
+        self._pending = 0
+
+    @property
+    def path(self):
+        if self._path is None:
+            self._path = state_path(self.file_name)
+        return self._path
+
+    def _empty(self):
+        return {}
+
+    def _loaded(self, data):
+        """Hook for subclasses: fix up or index the data just read from disk."""
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = self._empty()
+            self._loaded(self._data)
+        return self._data
+
+    def _changed(self):
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._write()
+
+    def _write(self):
+        data = self._load()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._pending = 0
+
+    def flush(self):
+        """Writes any changes not yet on disk."""
+        with self._lock:
+            if self._pending:
+                self._write()
@@ -1,6 +1,5 @@
 import os
 import time
-import smartsheet
 import process_state
 from ssextractor import (
     download_smartsheet_as_excel,
@@ -13,22 +12,179 @@ from ssextractor import (
     upload_comments_to_drive,
     upload_attachments_to_drive,
     access_config_file,
-    get_smartsheet_client
+    get_smartsheet_client,
+    release_sheet_snapshot,
+    process_sheet_in_memory,
+    extract_sheet_from_api,
+    extract_comments_from_api,
+    transfer_attachments_to_drive,
+    access_setting,
+    incremental_sync_enabled,
+    get_sheet_version,
+    is_sheet_unchanged,
+    record_synced_sheet,
+    flush_sync_state,
+    new_drive_folder_cache,
+    api_scheduler,
 )
 from getSsSheetID import get_sheets_in_folder
-import config
+from workers import BoundedExecutor
+from workspace import current_workspace, use_workspace
+from drive_folders import use_folder_cache
+from dedup_index import use_verified_targets
+from cancellation import Cancelled, current_token, use_token
+import metrics
 
+# Stages that still run for a sheet whose data has not changed since the last sync
+ATTACHMENT_STAGES = (download_smartsheet_attachments, upload_attachments_to_drive, transfer_attachments_to_drive)
 
 
+def _sheet_stages():
+    """Returns the (stage name, function) chain each sheet goes through."""
+    if access_setting("ATTACHMENT_TRANSFER_MODE") == "stream":
+        # ✅ Attachments go straight from Smartsheet to Drive
+        download_attachments = ("transferring attachments", transfer_attachments_to_drive)
+        upload_attachments = None
+    else:
+        download_attachments = ("downloading attachments", download_smartsheet_attachments)
+        upload_attachments = ("uploading attachments", upload_attachments_to_drive)
 
-def run_migration():
+    api_mode = access_setting("EXTRACTION_MODE") == "api"
+    comments_from_api = api_mode or access_setting("COMMENTS_SOURCE") == "api"
+    if api_mode:
+        # ✅ No export: the sheet table comes straight from paged get_sheet responses
+        stages = [("extracting sheet", extract_sheet_from_api)]
+    elif comments_from_api:
+        # ✅ The export is only needed for the sheet itself, streamed into the prepared file
+        stages = [
+            ("downloading export", download_smartsheet_as_excel),
+            ("preparing sheet", prepare_sheet_for_drive_upload),
+        ]
+    elif access_setting("IN_MEMORY_PIPELINE"):
+        stages = [
+            ("downloading export", download_smartsheet_as_excel),
+            # ✅ Comments, mapping, merge and prepare on a single workbook parse
+            ("transforming", process_sheet_in_memory),
+        ]
+    else:
+        stages = [
+            ("downloading export", download_smartsheet_as_excel),
+            ("extracting comments", extract_and_store_comments),
+            ("mapping rows", create_relative_row_mapping),
+            ("merging comments", merge_comments_with_row_mapping),
+            ("preparing sheet", prepare_sheet_for_drive_upload),
+        ]
+    if comments_from_api:
+        # ✅ Discussions API, already keyed by row ID: the final comments table in one pass
+        stages.append(("extracting comments", extract_comments_from_api))
+
+    stages += [
+        download_attachments,
+        ("uploading sheet", upload_to_google_drive),
+        ("uploading comments", upload_comments_to_drive),
+        upload_attachments,
+    ]
+    return [stage for stage in stages if stage is not None]
+
+
+def reset_sheet_workspace(sheet_id):
+    """Clears this sheet's local working folders so it only ever sees files from its own run."""
+    current_workspace().reset_sheet(sheet_id)
+
+
+def _keep_going(token):
+    """Blocks while the run is paused; returns False once it has been cancelled."""
+    try:
+        token.check()
+        return True
+    except Cancelled:
+        return False
+
+
+def process_sheet(sheet_id):
+    """
+    Runs the full stage chain for one sheet and returns 'done', 'failed' or 'cancelled'.
+    Errors are contained here so one failing sheet never stops the others.
+    """
+    # Stage timings, API calls and bytes recorded below are attributed to this sheet in the run report
+    with metrics.sheet_scope(sheet_id):
+        return _process_sheet(sheet_id)
+
+
+def _process_sheet(sheet_id):
+    outcome = 'done'
+    token = current_token()
+    try:
+        reset_sheet_workspace(sheet_id)
+        stages = _sheet_stages()
+
+        # ✅ Incremental mode: an unchanged sheet only has its attachments checked for new files
+        version = None
+        if incremental_sync_enabled():
+            version = get_sheet_version(sheet_id)
+            if is_sheet_unchanged(sheet_id, version):
+                print(f"⏭️ Sheet {sheet_id} unchanged since last sync (version {version}), checking attachments only")
+                stages = [(name, stage) for name, stage in stages if stage in ATTACHMENT_STAGES]
+                version = None
+
+        results = {}
+        for stage_name, stage in stages:
+            # Waits here while the run is paused
+            token.check()
+            process_state.set_sheet_status(sheet_id, stage_name)
+            started = time.monotonic()
+            try:
+                results[stage] = stage(sheet_id)
+            finally:
+                # Stages return None when they fail
+                metrics.record_stage(stage_name, time.monotonic() - started, results.get(stage) is not None)
+
+        # Stages return None when they fail; a sheet with a failed stage is reported as failed
+        failed_stages = [stage_name for stage_name, stage in stages if results.get(stage) is None]
+        if failed_stages:
+            print(f"❌ Sheet {sheet_id} failed at: {', '.join(failed_stages)}")
+            outcome = 'failed'
+
+        # Only remember the version once every sheet and comments stage succeeded, so a failed one is retried next run
+        if version is not None and all(
+            results.get(stage) is not None for _, stage in stages if stage not in ATTACHMENT_STAGES
+        ):
+            record_synced_sheet(sheet_id, version)
+    except Cancelled:
+        outcome = 'cancelled'
+    except Exception as e:
+        print(f"❌ Sheet {sheet_id} failed: {e}")
+        outcome = 'failed'
+    finally:
+        # ✅ Free the sheet snapshot and artifact records shared by the stages above
+        release_sheet_snapshot(sheet_id)
+        current_workspace().forget_sheet(sheet_id)
+        flush_sync_state()
+    if outcome != 'cancelled' and token.cancelled:
+        # Stages stopped by the cancel return None too; they didn't fail
+        outcome = 'cancelled'
+    process_state.finish_sheet(sheet_id, outcome)
+    return outcome
+
+
+def run_migration(workspace_root=None):
     """
-    Runs the migration process using configuration from the form.
+    Runs the migration process using configuration from the form. Local files go under workspace_root
+    (default: the WORKSPACE_ROOT setting).
     """
+    # A fresh token per run: a cancelled earlier run must not cancel this one
+    with use_workspace(workspace_root or access_setting("WORKSPACE_ROOT")), use_token(process_state.new_cancel_token()), \
+            use_folder_cache(new_drive_folder_cache()), use_verified_targets(set()), metrics.use_run():
+        return _run_migration()
+
+
+def plan_migration():
+    """Lists the sheets in the configured Smartsheet folder and resets the status for them; returns the sheet IDs or None."""
+    status = process_state.current_status()
     # Set initial process state
-    process_state.migration_status['running'] = True
-    process_state.migration_status['progress'] = 'Starting migration'
-    process_state.migration_status['details'] = ''
+    status['running'] = True
+    status['progress'] = 'Starting migration'
+    status['details'] = ''
     
     
     # Update environment variables for other credentials if needed.
@@ -45,64 +201,82 @@ def run_migration():
     # Get sheets in the specified Smartsheet folder
     sheets_data = get_sheets_in_folder(client, smartsheet_folder_id)
     if not sheets_data:
-        process_state.migration_status['progress'] = 'Error retrieving sheets'
-        process_state.migration_status['running'] = False
-        return "Error: Could not retrieve sheets from folder. Please verify your API key and folder ID."
+        status['progress'] = 'Error retrieving sheets'
+        status['running'] = False
+        return None
     
     sheets, sheet_info, sheet_ids_list = sheets_data
-    process_state.migration_status['progress'] = f"Found {len(sheets)} sheets in folder ID {smartsheet_folder_id}."
-
-    # Process each sheet
-    for sheet in sheets:
-        if process_state.cancel_requested:
-            process_state.migration_status['progress'] = 'Migration Cancelled'
-            process_state.migration_status['running'] = False
-            return "Migration Cancelled by User"
-            
-        sheet_id = sheet.id
-        process_state.migration_status['progress'] = f"Processing sheet {sheet_id}..."
-        
-        download_smartsheet_as_excel(sheet_id)
-        if process_state.cancel_requested: break
-        
-        extract_and_store_comments(sheet_id)
-        if process_state.cancel_requested: break
-        
-        create_relative_row_mapping(sheet_id)
-        if process_state.cancel_requested: break
-        
-        merge_comments_with_row_mapping(sheet_id)
-        if process_state.cancel_requested: break
-        
-        download_smartsheet_attachments(sheet_id)
-        if process_state.cancel_requested: break
-        
-        prepare_sheet_for_drive_upload(sheet_id)
-        if process_state.cancel_requested: break
-        
-        upload_to_google_drive(sheet_id)
-        if process_state.cancel_requested: break
-        
-        upload_comments_to_drive(sheet_id)
-        if process_state.cancel_requested: break
-        
-        upload_attachments_to_drive(sheet_id)
-        if process_state.cancel_requested: break
-        
-        # Optional: simulate delay between processing sheets
-        time.sleep(1)
-    
-    if process_state.cancel_requested:
-        process_state.migration_status['progress'] = 'Migration Cancelled'
-        process_state.migration_status['running'] = False
+    status['progress'] = f"Found {len(sheets)} sheets in folder ID {smartsheet_folder_id}."
+
+    sheet_ids = list(dict.fromkeys(sheet.id for sheet in sheets))
+    process_state.start_sheets(sheet_ids)
+    return sheet_ids
+
+
+def finish_migration():
+    """Reports the end of a run and returns its result message."""
+    status = process_state.current_status()
+    flush_sync_state()
+    # ✅ Per-stage / per-API timings of this run, also for a cancelled one
+    metrics.write_run_report(os.path.join(current_workspace().root, access_setting("RUN_REPORT_FILE")))
+    if current_token().cancelled:
+        status['progress'] = 'Migration Cancelled'
+        status['running'] = False
         return "Migration Cancelled by User"
     
-    process_state.migration_status['progress'] = "Migration Completed"
-    process_state.migration_status['running'] = False
+    if status['dedup_files']:
+        saved_mb = status['dedup_bytes_saved'] / (1024 * 1024)
+        print(f"♻️ {status['dedup_files']} duplicate attachments shortcut instead of uploaded ({saved_mb:.1f} MB saved)")
+
+    for service, stats in api_scheduler.stats().items():
+        if stats['calls']:
+            print(
+                f"📊 {service} API: {stats['calls']} calls, {stats['throttled']} throttled, {stats['retries']} retries, "
+                f"saturation {stats['saturation']:.0%} (rate {stats['current_rate_per_second']}/{stats['limit_per_second']:g} per s)"
+            )
+
+    failed = status['sheets_failed']
+    status['running'] = False
+    if failed:
+        status['progress'] = f"Migration Completed ({failed} sheets failed)"
+        print(f"⚠️ Migration Completed with {failed} failed sheets")
+        return f"Migration Completed with {failed} failed sheets"
+    status['progress'] = "Migration Completed"
     print("🎉 Migration Completed Successfully!")
     return "Migration Completed Successfully!"
 
 
+def _run_migration():
+    sheet_ids = plan_migration()
+    if sheet_ids is None:
+        return "Error: Could not retrieve sheets from folder. Please verify your API key and folder ID."
+
+    concurrency = access_setting("SHEET_CONCURRENCY")
+    token = current_token()
+
+    if concurrency <= 1:
+        # Process each sheet
+        for sheet_id in sheet_ids:
+            if not _keep_going(token):
+                break
+            process_sheet(sheet_id)
+
+            # Optional: simulate delay between processing sheets
+            time.sleep(1)
+    else:
+        # ✅ Run up to SHEET_CONCURRENCY sheets at once; submit() waits for a free slot
+        executor = BoundedExecutor(concurrency, queue_size=0, thread_name_prefix="sheet")
+        try:
+            for sheet_id in sheet_ids:
+                if not _keep_going(token):
+                    break
+                executor.submit(process_sheet, sheet_id)
+        finally:
+            executor.shutdown(wait=True, cancel_pending=token.cancelled)
+
+    return finish_migration()
+
+
 # Flask app to handle user input and display migration status
 if __name__ == '__main__':
     #SMARTSHEET_API_KEY = config.CREDENTIALS["SMARTSHEET_API_KEY"]
@@ -0,0 +1,265 @@
+# metrics.py
+import bisect
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the duration histogram buckets; wide enough for a 1s API call and a 5 min export
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Histogram:
+    """Cumulative-bucket duration histogram in the Prometheus style (count, sum, per-bucket counts)."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self):
+        """[(upper bound, observations <= bound)], ending with ('+Inf', count)."""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total_seconds": round(self.sum, 3),
+            "mean_seconds": round(self.sum / self.count, 3) if self.count else 0.0,
+            "max_seconds": round(self.max, 3),
+        }
+
+
+def _new_totals():
+    return {"api_calls": 0, "api_errors": 0, "retries": 0, "bytes_uploaded": 0, "bytes_downloaded": 0, "stage_errors": 0}
+
+
+class Recorder:
+    """
+    Stage timings, API calls, bytes and error / retry counts. One process-wide recorder backs /metrics;
+    each run also gets its own, which adds per-sheet totals and becomes the JSON run report.
+    """
+
+    def __init__(self, per_sheet=False):
+        self.per_sheet = per_sheet
+        self.started_at = time.time()
+        self.stage_durations = {}  # stage → Histogram
+        self.stage_errors = {}  # stage → count
+        self.api_durations = {}  # service → Histogram
+        self.api_calls = {}  # (service, outcome) → count
+        self.retries = {}  # (service, kind) → count
+        self.bytes = {}  # direction → count
+        self.sheets = {}  # sheet ID → {"stages": {stage: seconds}, ...totals}
+        self._lock = threading.Lock()
+
+    def _sheet(self, sheet_id):
+        # Caller holds the lock
+        if not self.per_sheet or sheet_id is None:
+            return None
+        sheet = self.sheets.get(sheet_id)
+        if sheet is None:
+            sheet = self.sheets[sheet_id] = {"stages": {}, **_new_totals()}
+        return sheet
+
+    def stage(self, stage, sheet_id, seconds, ok):
+        with self._lock:
+            self.stage_durations.setdefault(stage, Histogram()).observe(seconds)
+            if not ok:
+                self.stage_errors[stage] = self.stage_errors.get(stage, 0) + 1
+            sheet = self._sheet(sheet_id)
+            if sheet is not None:
+                sheet["stages"][stage] = round(sheet["stages"].get(stage, 0.0) + seconds, 3)
+                if not ok:
+                    sheet["stage_errors"] += 1
+
+    def api_call(self, service, sheet_id, seconds, outcome):
+        with self._lock:
+            self.api_durations.setdefault(service, Histogram()).observe(seconds)
+            key = (service, outcome)
+            self.api_calls[key] = self.api_calls.get(key, 0) + 1
+            sheet = self._sheet(sheet_id)
+            if sheet is not None:
+                sheet["api_calls"] += 1
+                if outcome != "ok":
+                    sheet["api_errors"] += 1
+
+    def retry(self, service, sheet_id, kind):
+        with self._lock:
+            key = (service, kind)
+            self.retries[key] = self.retries.get(key, 0) + 1
+            sheet = self._sheet(sheet_id)
+            if sheet is not None:
+                sheet["retries"] += 1
+
+    def add_bytes(self, direction, sheet_id, count):
+        with self._lock:
+            self.bytes[direction] = self.bytes.get(direction, 0) + count
+            sheet = self._sheet(sheet_id)
+            if sheet is not None:
+                sheet[f"bytes_{direction}"] += count
+
+    def report(self):
+        """JSON-friendly summary: per-stage and per-service timings, counts and per-sheet totals."""
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "finished_at": time.time(),
+                "duration_seconds": round(time.time() - self.started_at, 3),
+                "stages": {
+                    stage: {**histogram.summary(), "errors": self.stage_errors.get(stage, 0)}
+                    for stage, histogram in self.stage_durations.items()
+                },
+                "api": {
+                    service: {
+                        **histogram.summary(),
+                        "outcomes": {outcome: count for (name, outcome), count in self.api_calls.items() if name == service},
+                        "retries": sum(count for (name, _), count in self.retries.items() if name == service),
+                    }
+                    for service, histogram in self.api_durations.items()
+                },
+                "bytes": dict(self.bytes),
+                "sheets": {sheet_id: dict(sheet, stages=dict(sheet["stages"])) for sheet_id, sheet in self.sheets.items()},
+            }
+
+    def render_prometheus(self):
+        """The recorded metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(name, help_text, label, histograms):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, hist in sorted(histograms.items()):
+                for bound, count in hist.cumulative():
+                    lines.append(f'{name}_bucket{{{label}="{_escape(key)}",le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{{label}="{_escape(key)}"}} {hist.sum:.6f}')
+                lines.append(f'{name}_count{{{label}="{_escape(key)}"}} {hist.count}')
+
+        def counter(name, help_text, labels, values):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                label_text = ",".join(f'{label}="{_escape(part)}"' for label, part in zip(labels, key))
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        with self._lock:
+            histogram("ssextractor_stage_duration_seconds", "Time spent in each sheet stage.", "stage", self.stage_durations)
+            counter("ssextractor_stage_errors_total", "Sheet stages that failed.", ("stage",), self.stage_errors)
+            histogram("ssextractor_api_call_duration_seconds", "Duration of each API call attempt.", "service", self.api_durations)
+            counter("ssextractor_api_calls_total", "API call attempts by outcome.", ("service", "outcome"), self.api_calls)
+            counter("ssextractor_api_retries_total", "API calls retried, by reason.", ("service", "kind"), self.retries)
+            counter("ssextractor_bytes_total", "Bytes transferred.", ("direction",), self.bytes)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide totals exposed on /metrics
+registry = Recorder()
+
+_current_run = contextvars.ContextVar("run_metrics", default=None)
+_current_sheet = contextvars.ContextVar("metrics_sheet", default=None)
+
+
+def _recorders():
+    run = _current_run.get()
+    return (registry, run) if run is not None else (registry,)
+
+
+def record_stage(stage, seconds, ok=True):
+    sheet_id = _current_sheet.get()
+    for recorder in _recorders():
+        recorder.stage(stage, sheet_id, seconds, ok)
+
+
+def record_api_call(service, seconds, outcome="ok"):
+    sheet_id = _current_sheet.get()
+    for recorder in _recorders():
+        recorder.api_call(service, sheet_id, seconds, outcome)
+
+
+def record_retry(service, kind):
+    sheet_id = _current_sheet.get()
+    for recorder in _recorders():
+        recorder.retry(service, sheet_id, kind or "error")
+
+
+def add_bytes(direction, count):
+    """Counts bytes 'uploaded' or 'downloaded'."""
+    if count <= 0:
+        return
+    sheet_id = _current_sheet.get()
+    for recorder in _recorders():
+        recorder.add_bytes(direction, sheet_id, count)
+
+
+@contextlib.contextmanager
+def timer(stage):
+    """Times the enclosed block as `stage`; an exception counts as a stage error."""
+    started = time.monotonic()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record_stage(stage, time.monotonic() - started, ok)
+
+
+@contextlib.contextmanager
+def sheet_scope(sheet_id):
+    """Attributes everything recorded in the enclosed block (and threads it starts through BoundedExecutor) to a sheet."""
+    token = _current_sheet.set(str(sheet_id))
+    try:
+        yield
+    finally:
+        _current_sheet.reset(token)
+
+
+def bind_run():
+    """Starts a run recorder for the rest of this context (used to set up a job's context)."""
+    recorder = Recorder(per_sheet=True)
+    _current_run.set(recorder)
+    return recorder
+
+
+@contextlib.contextmanager
+def use_run():
+    """Records the enclosed run into its own recorder, for the run report."""
+    token = _current_run.set(Recorder(per_sheet=True))
+    try:
+        yield _current_run.get()
+    finally:
+        _current_run.reset(token)
+
+
+def write_run_report(path):
+    """Writes the current run's report as JSON to path and returns it (None outside a run)."""
+    run = _current_run.get()
+    if run is None:
+        return None
+    report = run.report()
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📊 Run report written to {path}")
+    except Exception as e:
+        print(f"❌ Error writing run report {path}: {e}")
+    return report
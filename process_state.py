@@ -1,11 +1,253 @@
 # process_state.py
+import contextvars
+import threading
+import time
+from collections import deque
 
-# Global dictionary to track migration status
-migration_status = {
-    'running': False,
-    'progress': 'Not started',
-    'details': ''
-}
+import metrics
+from cancellation import CancellationToken
 
-# Global flag to signal cancellation
-cancel_requested = False
+
+def new_status():
+    """A fresh status dictionary for one migration run."""
+    return {
+        'running': False,
+        'paused': False,
+        'progress': 'Not started',
+        'details': '',
+        'sheets': {},  # sheet ID → current stage / outcome
+        'sheets_total': 0,
+        'sheets_done': 0,
+        'sheets_failed': 0,
+        'started_at': None,
+        'attachments_done': 0,
+        'attachments_failed': 0,
+        'uploads': {},  # file → {'sent': bytes, 'total': bytes} for uploads in flight
+        'bytes_uploaded': 0,
+        'dedup_files': 0,  # attachments replaced by a shortcut to identical bytes
+        'dedup_bytes_saved': 0,
+    }
+
+
+# Status of a run started directly with main.run_migration(); jobs (jobs.py) each have their own
+migration_status = new_status()
+
+# Cancel / pause switch of a direct run; a new one is made for every migration
+cancel_token = CancellationToken()
+
+# The status dictionary the code running in this context reports to
+_current_status = contextvars.ContextVar("migration_status", default=None)
+
+# Sheets may run in parallel, so per-sheet updates go through this lock
+_status_lock = threading.Lock()
+
+# Progress streams wait on this for the next update; _version counts updates across all runs
+_status_changed = threading.Condition(_status_lock)
+_version = 0
+
+
+def current_status():
+    """Status of the job running in this context, or the module-level migration_status."""
+    status = _current_status.get()
+    return migration_status if status is None else status
+
+
+def bind_status(status):
+    """Makes `status` the status dictionary for the current context (used to set up a job's context)."""
+    _current_status.set(status)
+
+
+def new_cancel_token():
+    """Starts a fresh cancellation token for a new migration run."""
+    global cancel_token
+    cancel_token = CancellationToken()
+    migration_status['paused'] = False
+    return cancel_token
+
+
+def start_sheets(sheet_ids):
+    """Resets the per-sheet status for a new batch of sheets."""
+    status = current_status()
+    with _status_lock:
+        status['sheets'] = {str(sheet_id): 'queued' for sheet_id in sheet_ids}
+        status['sheets_total'] = len(sheet_ids)
+        status['sheets_done'] = 0
+        status['sheets_failed'] = 0
+        status['started_at'] = time.time()
+        _changed()
+
+
+def set_sheet_status(sheet_id, stage):
+    """Records the stage a sheet is currently in."""
+    status = current_status()
+    with _status_lock:
+        status['sheets'][str(sheet_id)] = stage
+        _refresh_progress(status)
+        _changed()
+
+
+def finish_sheet(sheet_id, outcome):
+    """Records a sheet's final outcome ('done', 'failed' or 'cancelled')."""
+    status = current_status()
+    with _status_lock:
+        status['sheets'][str(sheet_id)] = outcome
+        if outcome == 'done':
+            status['sheets_done'] += 1
+        elif outcome == 'failed':
+            status['sheets_failed'] += 1
+        _refresh_progress(status)
+        _changed()
+
+
+def set_upload_progress(file_label, sent, total):
+    """Records byte progress for one file upload (total may be None while unknown); finished uploads drop out of the in-flight list."""
+    status = current_status()
+    with _status_lock:
+        uploads = status['uploads']
+        previous = uploads.get(file_label, {}).get('sent', 0)
+        uploaded = max(0, sent - previous)
+        status['bytes_uploaded'] += uploaded
+        if total is not None and sent >= total:
+            uploads.pop(file_label, None)
+        else:
+            uploads[file_label] = {'sent': sent, 'total': total}
+        _changed()
+    metrics.add_bytes("uploaded", uploaded)
+
+
+def finish_attachment(ok):
+    """Counts one attachment transfer that finished (ok) or failed."""
+    status = current_status()
+    with _status_lock:
+        status['attachments_done' if ok else 'attachments_failed'] += 1
+        _changed()
+
+
+def add_dedup_savings(size):
+    """Counts one attachment that was not re-uploaded because identical bytes were already in Drive."""
+    status = current_status()
+    with _status_lock:
+        status['dedup_files'] += 1
+        status['dedup_bytes_saved'] += size
+        _changed()
+
+
+def mark_changed():
+    """Wakes progress streams after a status field was set directly (progress text, running, paused)."""
+    with _status_lock:
+        _changed()
+
+
+def wait_for_change(version, timeout):
+    """Blocks until some status changed after `version` (or the timeout passed) and returns the current version."""
+    with _status_changed:
+        _status_changed.wait_for(lambda: _version != version, timeout)
+        return _version
+
+
+def snapshot(status=None):
+    """A copy of a status dictionary that is safe to serialise while workers keep updating it."""
+    status = current_status() if status is None else status
+    with _status_lock:
+        copy = dict(status)
+        copy['sheets'] = dict(status['sheets'])
+        copy['uploads'] = {label: dict(upload) for label, upload in status['uploads'].items()}
+    return copy
+
+
+def progress_event(status, throughput=None):
+    """
+    Structured progress of a run for the event stream: sheet counts, per-stage state, attachments,
+    bytes and throughput (bytes/s), and an ETA extrapolated from the sheets finished so far.
+    """
+    current = snapshot(status)
+    finished = current['sheets_done'] + current['sheets_failed']
+    remaining = current['sheets_total'] - finished
+    elapsed = time.time() - current['started_at'] if current['started_at'] else None
+
+    stages = {}
+    for state in current['sheets'].values():
+        stages[state] = stages.get(state, 0) + 1
+
+    eta = None
+    if elapsed is not None and finished and remaining > 0:
+        eta = round(elapsed / finished * remaining, 1)
+
+    return {
+        'running': current['running'],
+        'paused': current['paused'],
+        'progress': current['progress'],
+        'sheets_total': current['sheets_total'],
+        'sheets_done': current['sheets_done'],
+        'sheets_failed': current['sheets_failed'],
+        'stages': stages,
+        'sheets': current['sheets'],
+        'attachments_done': current['attachments_done'],
+        'attachments_failed': current['attachments_failed'],
+        'bytes_uploaded': current['bytes_uploaded'],
+        'uploads': current['uploads'],
+        'throughput_bytes_per_second': throughput,
+        'elapsed_seconds': round(elapsed, 1) if elapsed is not None else None,
+        'eta_seconds': eta,
+    }
+
+
+def stream_progress(status, is_finished, interval=0.5, heartbeat=15.0, window=10.0):
+    """
+    Yields ('progress', event) whenever the run's status changed, at most once per `interval` seconds:
+    updates in between are coalesced into the next event, so a busy worker pool can't flood a client.
+    Yields (None, None) as a keep-alive after `heartbeat` idle seconds and ends with ('done', event)
+    once is_finished() is true.
+    """
+    version = -1
+    last_event = None
+    last_sent = 0.0
+    samples = deque()  # (time, bytes uploaded) over the throughput window
+
+    while True:
+        done = is_finished()
+        now = time.monotonic()
+        with _status_lock:
+            uploaded = status['bytes_uploaded']
+        samples.append((now, uploaded))
+        while len(samples) > 2 and now - samples[0][0] > window:
+            samples.popleft()
+        span = now - samples[0][0]
+        throughput = round((uploaded - samples[0][1]) / span, 1) if span > 0 else None
+
+        event = progress_event(status, throughput)
+        if done:
+            yield 'done', event
+            return
+        # Throughput and timings tick on their own; only real progress is worth an event
+        comparable = {key: value for key, value in event.items() if key not in ('throughput_bytes_per_second', 'elapsed_seconds', 'eta_seconds')}
+        if comparable != last_event:
+            last_event = comparable
+            last_sent = now
+            yield 'progress', event
+        elif now - last_sent >= heartbeat:
+            last_sent = now
+            yield None, None
+
+        # Coalesce: hold off for the interval, then wait (up to a second) for the next change
+        time.sleep(interval)
+        version = wait_for_change(version, timeout=1.0)
+
+
+def _changed():
+    # Caller holds _status_lock
+    global _version
+    _version += 1
+    _status_changed.notify_all()
+
+
+def _refresh_progress(status):
+    finished = status['sheets_done'] + status['sheets_failed']
+    active = sum(
+        1 for state in status['sheets'].values()
+        if state not in ('queued', 'done', 'failed', 'cancelled')
+    )
+    progress = f"Processed {finished}/{status['sheets_total']} sheets ({active} in progress"
+    if status['sheets_failed']:
+        progress += f", {status['sheets_failed']} failed"
+    status['progress'] = progress + ")"
@@ -0,0 +1,334 @@
+# rate_limiter.py
+import random
+import socket
+import sys
+import threading
+import time
+
+import requests
+from googleapiclient.errors import HttpError
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+
+
+def _smartsheet_errors(*names):
+    """
+    Smartsheet SDK exception classes, looked up only once the SDK has been imported (by whoever made the
+    call that failed); before that no error can be one of them, and importing the SDK here would be slow.
+    """
+    exceptions = sys.modules.get("smartsheet.exceptions")
+    return tuple(getattr(exceptions, name) for name in names) if exceptions else ()
+
+
+def classify_error(error):
+    """Returns 'throttled' for quota errors, 'server' for transient server/network errors, or None if retrying won't help."""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        if status == 429:
+            return "throttled"
+        if status == 403:
+            content = error.content.decode("utf-8", "ignore") if isinstance(error.content, bytes) else str(error.content)
+            return "throttled" if any(reason in content for reason in RATE_LIMIT_REASONS) else None
+        return "server" if status in RETRYABLE_STATUSES else None
+    if isinstance(error, _smartsheet_errors("RateLimitExceededError")):
+        return "throttled"
+    if isinstance(error, _smartsheet_errors("ApiError")):
+        return "server" if error.should_retry else None
+    if isinstance(error, _smartsheet_errors("HttpError")):
+        if error.status_code == 429:
+            return "throttled"
+        return "server" if error.status_code in RETRYABLE_STATUSES else None
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        if error.response.status_code == 429:
+            return "throttled"
+        return "server" if error.response.status_code in RETRYABLE_STATUSES else None
+    network_errors = (requests.ConnectionError, requests.Timeout, ConnectionError, socket.timeout)
+    if isinstance(error, _smartsheet_errors("UnexpectedRequestError") + network_errors):
+        return "server"
+    return None
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait (Retry-After header), if any."""
+    headers = None
+    if isinstance(error, HttpError):
+        headers = error.resp
+    elif isinstance(error, requests.HTTPError) and error.response is not None:
+        headers = error.response.headers
+    try:
+        return float(headers.get("retry-after")) if headers is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def raise_for_retryable_status(response):
+    """Turns a plain requests response with a 429/5xx status into an exception the scheduler can retry."""
+    if response.status_code in RETRYABLE_STATUSES:
+        response.raise_for_status()
+    return response
+
+
+class TokenBucket:
+    """
+    Hands out `rate` tokens per second with bursts of up to `capacity`. A call costing more than
+    the capacity (e.g. a 100-call batch) is let through once the bucket is full and leaves it in
+    debt, so the average rate still holds.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def acquire(self, tokens=1, sleep=time.sleep):
+        """Blocks until `tokens` are available and returns the seconds spent waiting."""
+        needed = min(float(tokens), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+            sleep(delay)
+            waited += delay
+
+
+class _ServiceLimit:
+    """Token bucket plus adaptive rate and counters for one API."""
+
+    def __init__(self, name, requests_per_second, burst=None, min_fraction=0.1):
+        self.name = name
+        self.limit = float(requests_per_second)
+        self.min_rate = self.limit * min_fraction
+        self.bucket = TokenBucket(self.limit, burst)
+        self.lock = threading.Lock()
+        self.paused_until = 0.0
+        self.calls = 0
+        self.delayed_calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+
+class RequestScheduler:
+    """
+    Single gateway for outgoing API calls. Each service (smartsheet, drive, ...) has a token bucket
+    sized to its published limit. Throttled calls (429 / rate-limit errors) halve that service's rate
+    and pause every caller of it for the backoff period; successes creep the rate back up to the limit.
+    Transient server and network errors are retried with exponential backoff and jitter.
+
+    checkpoint() runs before every attempt and may raise to stop the caller (e.g. on cancellation);
+    sleep(seconds) is used for every wait, so a cancellable sleep keeps backoffs from delaying shutdown.
+    on_attempt(service, seconds, outcome) is told about every attempt ('ok', 'throttled', 'server' or
+    'error') and on_retry(service, kind) about every retry, for instrumentation.
+    """
+
+    def __init__(self, max_retries=5, base_backoff=1.0, max_backoff=60.0, checkpoint=None, sleep=time.sleep,
+                 on_attempt=None, on_retry=None):
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.checkpoint = checkpoint
+        self.sleep = sleep
+        self.on_attempt = on_attempt
+        self.on_retry = on_retry
+        self._services = {}
+        self._local = threading.local()
+        self._started = time.monotonic()
+
+    def add_service(self, name, requests_per_second, burst=None):
+        self._services[name] = _ServiceLimit(name, requests_per_second, burst)
+
+    def _service(self, name):
+        try:
+            return self._services[name]
+        except KeyError:
+            raise ValueError(f"Unknown API service '{name}'") from None
+
+    def _wait_for_pause(self, limit):
+        while True:
+            with limit.lock:
+                delay = limit.paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            self.sleep(delay)
+
+    def backoff(self, service, attempt, error, kind=None):
+        """
+        Records a failed attempt and returns how long to wait before retrying it. Throttling slows
+        the whole service down and pauses all of its callers; server errors only delay this caller.
+        """
+        limit = self._service(service)
+        kind = kind or classify_error(error)
+        delay = retry_after(error)
+        if delay is None:
+            delay = min(self.max_backoff, self.base_backoff * (2 ** attempt)) * (0.5 + random.random())
+        with limit.lock:
+            limit.retries += 1
+            if kind == "throttled":
+                limit.throttled += 1
+                limit.bucket.set_rate(max(limit.min_rate, limit.bucket.rate / 2))
+                limit.paused_until = max(limit.paused_until, time.monotonic() + delay)
+            else:
+                limit.server_errors += 1
+            limit.backoff_seconds += delay
+        if self.on_retry:
+            self.on_retry(service, kind)
+        return delay
+
+    def _succeeded(self, limit):
+        with limit.lock:
+            if limit.bucket.rate < limit.limit:
+                limit.bucket.set_rate(min(limit.limit, limit.bucket.rate + limit.limit * 0.02))
+
+    def call(self, service, func, *args, cost=1, **kwargs):
+        """Runs func(*args, **kwargs) against `service`'s rate limit, retrying throttling and transient errors."""
+        if self.checkpoint:
+            self.checkpoint()
+        if getattr(self._local, "active", False):
+            # Already inside a scheduled call on this thread (e.g. execute() looping over next_chunk())
+            return func(*args, **kwargs)
+
+        limit = self._service(service)
+        attempt = 0
+        while True:
+            self._wait_for_pause(limit)
+            waited = limit.bucket.acquire(cost, sleep=self.sleep)
+            with limit.lock:
+                limit.calls += 1
+                limit.wait_seconds += waited
+                if waited:
+                    limit.delayed_calls += 1
+                limit.in_flight += 1
+                limit.peak_in_flight = max(limit.peak_in_flight, limit.in_flight)
+            self._local.active = True
+            started = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if self.on_attempt:
+                    self.on_attempt(service, time.monotonic() - started, kind or "error")
+                if kind is None or attempt >= self.max_retries:
+                    with limit.lock:
+                        limit.failures += 1
+                    raise
+                delay = self.backoff(service, attempt, e, kind)
+                print(f"⚠️ {service} API {'throttled' if kind == 'throttled' else 'error'} ({type(e).__name__}); retrying in {delay:.1f}s")
+                attempt += 1
+            else:
+                if self.on_attempt:
+                    self.on_attempt(service, time.monotonic() - started, "ok")
+                self._succeeded(limit)
+                return result
+            finally:
+                self._local.active = False
+                with limit.lock:
+                    limit.in_flight -= 1
+            self.sleep(delay)
+            if self.checkpoint:
+                self.checkpoint()
+
+    def execute(self, service, request, cost=1):
+        """Executes a googleapiclient request through the scheduler."""
+        return self.call(service, request.execute, cost=cost)
+
+    def stats(self):
+        """
+        Per-service saturation numbers. `saturation` is the share of calls that had to wait for a token:
+        near 1 the rate limit is the bottleneck and more workers won't help; near 0 with no throttling
+        there is headroom for more concurrency.
+        """
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        stats = {}
+        for name, limit in self._services.items():
+            with limit.lock:
+                stats[name] = {
+                    "limit_per_second": limit.limit,
+                    "current_rate_per_second": round(limit.bucket.rate, 3),
+                    "calls": limit.calls,
+                    "calls_per_second": round(limit.calls / elapsed, 3),
+                    "saturation": round(limit.delayed_calls / limit.calls, 3) if limit.calls else 0.0,
+                    "throttled": limit.throttled,
+                    "server_errors": limit.server_errors,
+                    "retries": limit.retries,
+                    "failures": limit.failures,
+                    "wait_seconds": round(limit.wait_seconds, 3),
+                    "backoff_seconds": round(limit.backoff_seconds, 3),
+                    "in_flight": limit.in_flight,
+                    "peak_in_flight": limit.peak_in_flight,
+                }
+        return stats
+
+
+def scheduled_request_class(scheduler, service):
+    """
+    Returns an HttpRequest subclass whose execute() and next_chunk() go through the scheduler.
+    Pass it to googleapiclient's build(requestBuilder=...) so every request of that client is scheduled.
+    """
+    from googleapiclient.http import HttpRequest
+
+    class ScheduledHttpRequest(HttpRequest):
+        def execute(self, http=None, num_retries=0):
+            return scheduler.call(service, super().execute, http=http, num_retries=num_retries)
+
+        def next_chunk(self, http=None, num_retries=0):
+            return scheduler.call(service, super().next_chunk, http=http, num_retries=num_retries)
+
+    return ScheduledHttpRequest
+
+
+class _ScheduledSection:
+    def __init__(self, section, scheduler, service):
+        self._section = section
+        self._scheduler = scheduler
+        self._service = service
+
+    def __getattr__(self, name):
+        attr = getattr(self._section, name)
+        if not callable(attr):
+            return attr
+
+        def scheduled(*args, **kwargs):
+            return self._scheduler.call(self._service, attr, *args, **kwargs)
+
+        return scheduled
+
+
+class ScheduledSmartsheetClient:
+    """
+    Wraps a Smartsheet SDK client so every API method (client.Sheets.get_sheet(...), ...) goes through
+    the scheduler. The SDK's own retry loop should be turned off (max_retry_time=0) and errors raised
+    as exceptions, so throttling is seen and handled here.
+    """
+
+    def __init__(self, client, scheduler, service="smartsheet"):
+        self.client = client
+        self._scheduler = scheduler
+        self._service = service
+
+    def __getattr__(self, name):
+        attr = getattr(self.client, name)
+        if name[:1].isupper():
+            # API sections: Sheets, Attachments, Discussions, Folders, ...
+            return _ScheduledSection(attr, self._scheduler, self._service)
+        return attr
@@ -0,0 +1,37 @@
+# row_fingerprints.py
+import hashlib
+import json
+
+from json_store import JsonStore
+
+
+def row_fingerprint(record):
+    """Stable digest of a record's values ({column: value}), independent of column order."""
+    text = json.dumps(record, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class RowFingerprintStore(JsonStore):
+    """
+    Fingerprints of the rows last sent to each AppSheet table, so a re-sync only sends what changed.
+
+    Layout: {"targets": {target: {row_id: fingerprint}}}, where a target names the AppSheet table and
+    the Google Sheets tab feeding it. Only rows AppSheet accepted are recorded.
+    """
+
+    def _empty(self):
+        return {"targets": {}}
+
+    def _loaded(self, data):
+        data.setdefault("targets", {})
+
+    def fingerprints(self, target):
+        """Copy of the {row_id: fingerprint} map recorded for target (empty if it was never synced)."""
+        with self._lock:
+            return dict(self._load()["targets"].get(target, {}))
+
+    def replace(self, target, fingerprints):
+        with self._lock:
+            self._load()["targets"][target] = dict(fingerprints)
+            # Each sync ends with a single replace, so it is written right away
+            self._write()
@@ -0,0 +1,94 @@
+# sheet_cache.py
+import threading
+from collections import OrderedDict
+
+
+class SheetSnapshot:
+    """One fetched copy of a Smartsheet sheet, shared by every stage of a run."""
+
+    def __init__(self, sheet, row_ids=None):
+        # Built from row_ids alone when the rows were already streamed elsewhere (API extraction)
+        self.sheet = sheet
+        self.rows = list(sheet.rows or []) if sheet is not None else []
+        # ✅ Shared row number → row ID index (treat as read-only)
+        self.row_ids = row_ids if row_ids is not None else {row.row_number: row.id for row in self.rows}
+        # Rough memory weight: one unit per cell plus one per row
+        self.cell_count = sum(len(row.cells or []) for row in self.rows) + len(self.row_ids)
+
+
+class SheetSnapshotCache:
+    """Bounded LRU cache of sheet snapshots keyed by sheet ID."""
+
+    def __init__(self, max_sheets=4, max_cells=2_000_000):
+        self.max_sheets = max_sheets
+        self.max_cells = max_cells
+        self._entries = OrderedDict()
+        self._cells = 0
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sheet_id, loader):
+        """Returns the cached snapshot for sheet_id, calling loader(sheet_id) only on a miss."""
+        with self._lock:
+            snapshot = self._lookup(sheet_id)
+            if snapshot is not None:
+                return snapshot
+            load_lock = self._loading.setdefault(sheet_id, threading.Lock())
+
+        # Only one thread fetches a given sheet; the others wait and reuse its result
+        with load_lock:
+            with self._lock:
+                snapshot = self._lookup(sheet_id)
+                if snapshot is not None:
+                    return snapshot
+                self.misses += 1
+            try:
+                snapshot = SheetSnapshot(loader(sheet_id))
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(sheet_id, None)
+                raise
+            # Store before dropping the loading marker, so a caller arriving in between finds the snapshot
+            with self._lock:
+                self._store(sheet_id, snapshot)
+                self._loading.pop(sheet_id, None)
+            return snapshot
+
+    def put(self, sheet_id, snapshot):
+        """Caches a snapshot built by the caller, so later get() calls don't fetch the sheet again."""
+        with self._lock:
+            self._store(sheet_id, snapshot)
+
+    def release(self, sheet_id):
+        """Drops a sheet from the cache once all of its stages are finished."""
+        with self._lock:
+            snapshot = self._entries.pop(sheet_id, None)
+            if snapshot is not None:
+                self._cells -= snapshot.cell_count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._cells = 0
+
+    def _lookup(self, sheet_id):
+        snapshot = self._entries.get(sheet_id)
+        if snapshot is not None:
+            self._entries.move_to_end(sheet_id)
+            self.hits += 1
+        return snapshot
+
+    def _store(self, sheet_id, snapshot):
+        old = self._entries.pop(sheet_id, None)
+        if old is not None:
+            self._cells -= old.cell_count
+        self._entries[sheet_id] = snapshot
+        self._cells += snapshot.cell_count
+        # ✅ Evict least recently used sheets, but always keep the newest one
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_sheets or self._cells > self.max_cells
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._cells -= evicted.cell_count
@@ -1,16 +1,32 @@
+# pandas, the Smartsheet SDK and the Google API client are imported where they are used, so importing
+# this module (and starting the web app) stays fast and needs no credentials
 import re
 import os
-import pandas as pd
-import requests
-import glob  # ✅ Used for wildcard search
-import smartsheet
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.oauth2 import service_account
+from googleapiclient.errors import HttpError
 #from dotenv import load_dotenv
-import time  # ✅ For sleep
-from process_state import cancel_requested  # or import process_state and reference process_state.cancel_requested
+import threading
+import hashlib
+import contextlib
+import tempfile
 import config
+from sheet_cache import SheetSnapshot, SheetSnapshotCache
+from workers import BoundedExecutor
+from drive_upload import UploadSessionStore, upload_file, upload_stream
+from drive_folders import DriveFolderCache, current_folder_cache
+from drive_batch import DriveBatch
+from appsheet_sync import AppSheetSync
+from row_fingerprints import RowFingerprintStore
+from sync_manifest import SyncManifest
+from dedup_index import ContentIndex, SHORTCUT_MIMETYPE, current_verified_targets
+from rate_limiter import RequestScheduler, ScheduledSmartsheetClient
+import process_state
+import metrics
+import transport
+import xlsx_stream
+import table_writer
+import workspace
+from workspace import current_workspace
+from cancellation import Cancelled, current_token
 
 # If you still need .env for other non-SMARTSHEET values, you can load it.
 #load_dotenv(override=True)
@@ -23,25 +39,80 @@ import config
 #APPSHEET_APP_ID = config.CREDENTIALS["APPSHEET_APP_ID"]
 #APPSHEET_TABLE_NAME = config.CREDENTIALS["APPSHEET_TABLE_NAME"]
 
-#✅ Google API Credentials
-SCOPES = ["https://www.googleapis.com/auth/drive", "https://www.googleapis.com/auth/spreadsheets"]
-SERVICE_ACCOUNT_FILE = "service_account.json"
-credentials = service_account.Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-drive_service = build("drive", "v3", credentials=credentials)
-sheet_service = build("sheets", "v4", credentials=credentials)
+# ✅ Every Smartsheet, Drive, Sheets and AppSheet call goes through one rate-limit-aware scheduler
+api_scheduler = RequestScheduler(
+    max_retries=config.SETTINGS["API_MAX_RETRIES"],
+    base_backoff=config.SETTINGS["API_BACKOFF_SECONDS"],
+    max_backoff=config.SETTINGS["API_MAX_BACKOFF_SECONDS"],
+    # Backoffs and rate-limit waits end as soon as the running migration is cancelled, and no new call starts after it
+    checkpoint=lambda: current_token().check(),
+    sleep=lambda seconds: current_token().wait(seconds),
+    on_attempt=metrics.record_api_call,
+    on_retry=metrics.record_retry,
+)
+api_scheduler.add_service("smartsheet", config.SETTINGS["SMARTSHEET_REQUESTS_PER_MINUTE"] / 60)
+api_scheduler.add_service("drive", config.SETTINGS["DRIVE_REQUESTS_PER_MINUTE"] / 60)
+api_scheduler.add_service("sheets", config.SETTINGS["SHEETS_REQUESTS_PER_MINUTE"] / 60)
+api_scheduler.add_service("appsheet", config.SETTINGS["APPSHEET_REQUESTS_PER_MINUTE"] / 60)
+
+#✅ Google API clients: one per thread, built on first use (see transport.py)
+def get_drive_service():
+    """Returns a Drive service owned by the calling thread."""
+    return transport.get_google_service("drive", "v3", api_scheduler)
+
+def get_sheets_service():
+    """Returns a Sheets service owned by the calling thread."""
+    return transport.get_google_service("sheets", "v4", api_scheduler)
+
+_smartsheet_clients = {}
+_smartsheet_clients_lock = threading.Lock()
 
 def get_smartsheet_client():
-    import config
-    api_key = config.CREDENTIALS["SMARTSHEET_API_KEY"]
+    """
+    Returns one shared Smartsheet client per API key instead of building a new one per call.
+    Its calls go through api_scheduler, which does the retrying, so the SDK's own retry loop is off.
+    """
+    api_key = access_config_file("SMARTSHEET_API_KEY")
     #print("DEBUG: API Key is:", api_key)  # This should print the key entered by the user
     if not api_key:
         raise ValueError("No API key provided. Please update config.CREDENTIALS.")
-    return smartsheet.Smartsheet(api_key)
+    with _smartsheet_clients_lock:
+        client = _smartsheet_clients.get(api_key)
+        if client is None:
+            import smartsheet
+
+            sdk_client = smartsheet.Smartsheet(api_key, max_retry_time=0, api_base=access_setting("SMARTSHEET_API_BASE"))
+            # Raise API errors instead of returning them, so throttling is retried and real failures are not mistaken for data
+            sdk_client.errors_as_exceptions(True)
+            # The SDK sends without a timeout (a stalled connection would otherwise outlive a cancel), and its
+            # session is shared by every sheet worker, so give it a pool large enough for all of them
+            transport.mount_pooled_adapter(sdk_client._session)
+            client = ScheduledSmartsheetClient(sdk_client, api_scheduler)
+            _smartsheet_clients[api_key] = client
+    return client
 
 def access_config_file(key):
-    import config
-    config_value = config.CREDENTIALS[key]
+    """Returns a credential of the job running in this context (config.CREDENTIALS outside a job)."""
+    config_value = config.current_credentials()[key]
     return config_value
+
+def access_setting(key):
+    """Returns a tuning value from config.SETTINGS."""
+    return config.SETTINGS[key]
+
+# ✅ Per-run sheet snapshots, so each sheet is fetched from Smartsheet once
+sheet_cache = SheetSnapshotCache(
+    max_sheets=config.SETTINGS["SHEET_CACHE_MAX_SHEETS"],
+    max_cells=config.SETTINGS["SHEET_CACHE_MAX_CELLS"],
+)
+
+def get_sheet_snapshot(sheet_id):
+    """Returns the cached snapshot of a sheet (rows + row number → row ID index), fetching it on first use."""
+    return sheet_cache.get(sheet_id, lambda sid: get_smartsheet_client().Sheets.get_sheet(sid))
+
+def release_sheet_snapshot(sheet_id):
+    """Frees the cached snapshot once every stage for the sheet has finished."""
+    sheet_cache.release(sheet_id)
     
 
 # ✅ Initialize Smartsheet Client
@@ -68,42 +139,40 @@ def sanitize_filename(filename, max_length=100):
     return filename
 
 def download_smartsheet_as_excel(sheet_id):
-    """Downloads a Smartsheet as an Excel file and adds the Row ID column efficiently."""
+    """Downloads a Smartsheet as an Excel file, registers it as the sheet's export artifact and returns its path."""
     smartsheet_client = get_smartsheet_client()
     try:
         # ✅ Define folders and paths
-        sheet_folder = os.path.abspath(f"sheets/{sheet_id}")
-        os.makedirs(sheet_folder, exist_ok=True)  # Ensure directory exists
+        sheet_folder = current_workspace().folder(workspace.EXPORT, sheet_id)
 
-        # ✅ Download Excel and save it
+        # ✅ Download Excel (the SDK saves it under the name Smartsheet suggests)
         excel_data = smartsheet_client.Sheets.get_sheet_as_excel(sheet_id, sheet_folder)
-        excel_data.save_to_file()  # Save file in the directory
+        excel_path = os.path.join(excel_data.download_directory, excel_data.filename)
+        current_workspace().register(workspace.EXPORT, sheet_id, excel_path)
+        metrics.add_bytes("downloaded", os.path.getsize(excel_path))
         print(f"✅ Smartsheet {sheet_id} downloaded")
-        return None
+        return excel_path
 
     except Exception as e:
         print(f"❌ Error downloading Smartsheet {sheet_id}: {e}")
         return None
-    
 
-def wait_for_excel_file(sheet_folder, retries=100, delay=2):
-    """Waits until the Excel file appears in the specified folder."""
-    while retries > 0:
-        excel_files = glob.glob(os.path.join(sheet_folder, "*.xlsx"))
-        if excel_files:
-            return excel_files[0]  # Return the first (and only) file
-        print("⚠️ Waiting for Excel file to be available...")
-        time.sleep(delay)
-        retries -= 1
-    print(f"❌ No Excel file found in {sheet_folder} after waiting.")
-    return None
+
+# Returned by a stage that had nothing to do for the sheet (e.g. it has no comments); None means the stage failed
+NOTHING_TO_DO = "nothing to do"
+
+def require_artifact(kind, sheet_id):
+    """Returns the path a previous stage registered for this sheet, or None (with a message) if it is missing."""
+    path = current_workspace().get_path(kind, sheet_id)
+    if not path or not os.path.exists(path):
+        print(f"❌ No {kind} file registered for Sheet {sheet_id}; did the stage that produces it run?")
+        return None
+    return path
 
 def fetch_smartsheet_row_ids(sheet_id):
     """Fetches all row IDs from Smartsheet and returns a row number to row ID mapping."""
     try:
-        smartsheet_client = get_smartsheet_client()
-        sheet_data = smartsheet_client.Sheets.get_sheet(sheet_id)
-        row_mapping = {row.row_number: row.id for row in sheet_data.rows}  # ✅ Map row number → row ID
+        row_mapping = get_sheet_snapshot(sheet_id).row_ids  # ✅ Map row number → row ID (shared, read-only)
 
         print(f"✅ Retrieved {len(row_mapping)} Smartsheet row IDs for Sheet {sheet_id}")
         return row_mapping
@@ -113,97 +182,137 @@ def fetch_smartsheet_row_ids(sheet_id):
         return {}
     
 
+# ✅ Shared DataFrame transforms (used by both the per-stage functions and the in-memory pipeline)
+COMMENT_COLUMNS = ["Relative Row", "Comments", "Created By", "Created On", "Actual Row ID"]
+
+def _assign_comment_headers(df_comments):
+    """Trims the raw Comments tab to the known columns and assigns headers to the ones present."""
+    df_comments = df_comments.iloc[:, :len(COMMENT_COLUMNS)].copy()  # Trim extra columns
+    df_comments.columns = COMMENT_COLUMNS[:df_comments.shape[1]]  # Assign only existing columns
+    return df_comments
+
+def _extract_row_numbers(series):
+    """Pulls the numeric row number out of the 'Relative Row' text."""
+    return series.astype(str).str.extract(r"(\d+)").astype(float).astype("Int64")
+
+def build_comments_table(df_raw_comments):
+    """Builds the row-wise comments table from the raw (header-less) Comments tab."""
+    df_comments = _assign_comment_headers(df_raw_comments)
+    df_comments = df_comments.dropna(how='all')
+    df_comments['Relative Row'] = df_comments['Relative Row'].ffill()
+    return df_comments
+
+def build_row_mapping_table(df_raw_comments, row_mapping):
+    """Builds the 'Relative Row' → 'Row ID' table from the raw Comments tab and the row ID index."""
+    import pandas as pd
+
+    df_comments = _assign_comment_headers(df_raw_comments)
+
+    # ✅ Extract numeric row numbers from "Relative Row"
+    df_comments["Relative Row"] = _extract_row_numbers(df_comments["Relative Row"])
+
+    # ✅ Map "Relative Row" to "Actual Row ID" using Smartsheet row numbers
+    df_comments["Actual Row ID"] = df_comments["Relative Row"].map(row_mapping)
+
+    # ✅ Create a dictionary mapping "Relative Row" to "Actual Row ID"
+    mapping_table = df_comments.set_index("Relative Row")["Actual Row ID"].to_dict()
+
+    # ✅ Convert to DataFrame
+    return pd.DataFrame(mapping_table.items(), columns=["Relative Row", "Row ID"])
+
+def merge_comments_table(df_comments, df_mapping, sheet_id):
+    """Joins the comments table with the row mapping table and tags it with the Sheet ID."""
+    df_comments = df_comments.copy()
+    df_mapping = df_mapping.copy()
+
+    # ✅ Ensure correct column names before merging
+    df_comments.rename(columns={
+        df_comments.columns[0]: "Relative Row",
+        df_comments.columns[1]: "Comments",
+        df_comments.columns[2]: "Created By",
+        df_comments.columns[3]: "Created On"
+    }, inplace=True)
+    df_comments["Relative Row"] = _extract_row_numbers(df_comments["Relative Row"])
+
+    df_mapping.rename(columns={
+        df_mapping.columns[0]: "Relative Row",
+        df_mapping.columns[1]: "Row ID"
+    }, inplace=True)
+    df_mapping['Relative Row'] = df_mapping['Relative Row'].astype("Int64")
+
+    # ✅ Merge comments with row mapping
+    df_merged = df_comments.merge(df_mapping, on="Relative Row", how="left")
+
+    # ✅ Add Sheet ID column
+    df_merged.insert(0, "Sheet ID", sheet_id)
+    return df_merged
+
+
 # ✅ Extract & Store Comments
 def extract_and_store_comments(sheet_id):
     """Reads Smartsheet Excel, extracts comments, and stores them row-wise."""
-    try:
-        # ✅ Find the downloaded Excel file
-        sheet_folder = os.path.abspath(f"sheets/{sheet_id}")
-        excel_files = glob.glob(os.path.join(sheet_folder, "*.xlsx"))
-        if not excel_files:
-            print(f"❌ Smartsheet Excel not found in {sheet_folder}")
-            return
+    import pandas as pd
 
-        excel_path = excel_files[0]
-        comments_folder = os.path.abspath(f"comments/{sheet_id}")
-        
-        ensure_folder(comments_folder)
-        original_file = wait_for_excel_file(sheet_folder, retries=100, delay=2)  # Use the first (and only) file
+    try:
+        # ✅ The export registered by download_smartsheet_as_excel
+        original_file = require_artifact(workspace.EXPORT, sheet_id)
+        if not original_file:
+            return None
 
         # ✅ Load Excel into Pandas Safely
         with pd.ExcelFile(original_file, engine="openpyxl") as xls:
+            if "Comments" not in xls.sheet_names:
+                print(f"⚠️ No 'Comments' sheet found in {original_file}")
+                return NOTHING_TO_DO
             df_comments = pd.read_excel(xls, sheet_name="Comments", header=None)
 
-        # ✅ Dynamically assign headers (Fixes length mismatch error)
-        expected_columns = ["Relative Row", "Comments", "Created By", "Created On", "Actual Row ID"]
-        df_comments = df_comments.iloc[:, :len(expected_columns)]  # Trim extra columns
-        df_comments.columns = expected_columns[:df_comments.shape[1]]  # Assign only existing columns
-        df_comments = df_comments.dropna(how='all')
-        df_comments['Relative Row']= df_comments['Relative Row'].ffill()
-        df_comments.to_excel(f"{comments_folder}/{sheet_id}_comments.xlsx", index=False)
-
-
+        if df_comments.empty:
+            print(f"⚠️ No comments found in 'Comments' sheet for {sheet_id}.")
+            return NOTHING_TO_DO
+        df_comments = build_comments_table(df_comments)
+        comments_path = current_workspace().path(workspace.COMMENTS, sheet_id, f"{sheet_id}_comments.xlsx")
+        df_comments.to_excel(comments_path, index=False)
+        current_workspace().register(workspace.COMMENTS, sheet_id, comments_path)
 
-        print(f"✅ Saved comments to {comments_folder}/{sheet_id}_comments.xlsx")
-        
+        print(f"✅ Saved comments to {comments_path}")
+        return comments_path
 
     except Exception as e:
         print(f"❌ Error extracting comments for Sheet {sheet_id}: {e}")
+        return None
 
 
 
 def create_relative_row_mapping(sheet_id):
     """Creates a mapping table of 'Relative Row' to 'Actual Row ID' from Smartsheet comments data."""
+    import pandas as pd
+
     try:
-        # ✅ Find the downloaded Smartsheet Excel file
-        sheet_folder = os.path.abspath(f"sheets/{sheet_id}")
-        mapping_folder = os.path.abspath(f"row_mapping/{sheet_id}")
-        ensure_folder(mapping_folder)
-        excel_files = glob.glob(os.path.join(sheet_folder, "*.xlsx"))
-
-        if not excel_files:
-            print(f"❌ Smartsheet Excel not found in {sheet_folder}")
+        # ✅ The export registered by download_smartsheet_as_excel
+        original_file = require_artifact(workspace.EXPORT, sheet_id)
+        if not original_file:
             return None
 
-        original_file = wait_for_excel_file(sheet_folder, retries=100, delay=2)
-
         # ✅ Load Excel into Pandas Safely
         with pd.ExcelFile(original_file, engine="openpyxl") as xls:
+            if "Comments" not in xls.sheet_names:
+                print(f"⚠️ No 'Comments' sheet found in {original_file}")
+                return NOTHING_TO_DO
             df_comments = pd.read_excel(xls, sheet_name="Comments", header=None)
 
-        if "Comments" not in xls.sheet_names:
-            print(f"⚠️ No 'Comments' sheet found in {sheet_folder}")
-            return None
-        
         if df_comments.empty:
             print(f"⚠️ No comments found in 'Comments' sheet for {sheet_id}.")
-            return None
-
-        # ✅ Assign headers dynamically (Handle missing headers)
-        expected_columns = ["Relative Row", "Comments", "Created By", "Created On", "Actual Row ID"]
-        df_comments = df_comments.iloc[:, :len(expected_columns)]  # Trim extra columns
-        df_comments.columns = expected_columns[:df_comments.shape[1]]  # Assign headers
+            return NOTHING_TO_DO
 
         # ✅ Fetch Smartsheet row IDs from API
         row_mapping = fetch_smartsheet_row_ids(sheet_id)
-    
-
-        # ✅ Extract numeric row numbers from "Relative Row"
-        df_comments["Relative Row"] = df_comments["Relative Row"].astype(str).str.extract(r"(\d+)").astype(float).astype("Int64")
-
 
-        # ✅ Map "Relative Row" to "Actual Row ID" using Smartsheet row numbers
-        df_comments["Actual Row ID"] = df_comments["Relative Row"].map(row_mapping)
-
-        # ✅ Create a dictionary mapping "Relative Row" to "Actual Row ID"
-        mapping_table = df_comments.set_index("Relative Row")["Actual Row ID"].to_dict()
-
-        # ✅ Convert to DataFrame
-        df_mapping = pd.DataFrame(mapping_table.items(), columns=["Relative Row", "Row ID"])
+        df_mapping = build_row_mapping_table(df_comments, row_mapping)
 
         # ✅ Save to file
-        mapping_path = os.path.join(mapping_folder, f"{sheet_id}_relative_row_mapping.xlsx")
+        mapping_path = current_workspace().path(workspace.ROW_MAPPING, sheet_id, f"{sheet_id}_relative_row_mapping.xlsx")
         df_mapping.to_excel(mapping_path, index=False)
+        current_workspace().register(workspace.ROW_MAPPING, sheet_id, mapping_path)
 
         print(f"✅ Created Relative Row → Row ID mapping table: {mapping_path}")
         return df_mapping
@@ -215,140 +324,415 @@ def create_relative_row_mapping(sheet_id):
 
 
 def prepare_sheet_for_drive_upload(sheet_id):
-    """Adds Row ID and Filename columns to the downloaded Excel file for Google Drive upload."""
+    """Adds Row ID and Filename columns to the downloaded Excel file for Google Drive upload; returns (new path, original path)."""
     try:
-        smartsheet_client = get_smartsheet_client()
-        # ✅ Define folders and paths
-        sheet_folder = os.path.abspath(f"sheets/{sheet_id}")
-        ensure_folder(sheet_folder)
-    
-        original_file = wait_for_excel_file(sheet_folder, retries=100, delay=2)  # Use the first (and only) file
-
-        # ✅ Load Excel into Pandas Safely
-        with pd.ExcelFile(original_file, engine="openpyxl") as xls:
-            sheet_name = xls.sheet_names[0]  # Assume first sheet contains data
-            df = pd.read_excel(xls, sheet_name=sheet_name)
-
-        # ✅ Fetch Smartsheet Row IDs in bulk (Efficient)
-        sheet_data = smartsheet_client.Sheets.get_sheet(sheet_id)
-
-        row_ids = {row.row_number: row.id for row in sheet_data.rows}  # Map row_number → row_id
-
-        # ✅ Add Row ID column (Efficient mapping)
-        # ✅ Check if "Row ID" column already exists
-        if "Row ID" not in df.columns:
-            df.insert(0, "Row ID", pd.Series(range(1, len(df) + 1)).map(row_ids))
-        else:
-            print(f"⚠️ 'Row ID' column already exists in {original_file}, skipping insertion.")
+        # ✅ The export registered by download_smartsheet_as_excel
+        original_file = require_artifact(workspace.EXPORT, sheet_id)
+        if not original_file:
+            return None
 
-        # ✅ Add "Filename" column
-        df["Filename"] = os.path.basename(original_file)
+        # ✅ Reuse the cached sheet snapshot for Row IDs
+        row_ids = get_sheet_snapshot(sheet_id).row_ids  # Map row_number → row_id
 
-        # ✅ Save the updated file
-        updated_excel_path = os.path.join(sheet_folder, f"{sheet_id}.xlsx")
-        df.to_excel(updated_excel_path, index=False)
+        # ✅ Stream the rows into the updated file with Row ID and Filename columns added
+        updated_excel_path = current_workspace().path(workspace.SHEET, sheet_id, f"{sheet_id}.xlsx")
+        partial_path = updated_excel_path + ".partial"  # moved into place once the export is closed; they can share a name
+        with xlsx_stream.open_workbook(original_file) as book:
+            sheet_name = book.sheetnames[0]  # Assume first sheet contains data
+            xlsx_stream.write_upload_table(book[sheet_name], partial_path, row_ids, os.path.basename(original_file))
+        os.replace(partial_path, updated_excel_path)
+        current_workspace().register(workspace.SHEET, sheet_id, updated_excel_path)
 
-    
-       
         # ✅ Delete the original downloaded file after modification
-        
-        if os.path.exists(original_file):
-            os.remove(original_file)
-        print(f"🗑️ Deleted original Excel file: {original_file}")
-        return updated_excel_path,original_file
-    
+        _remove_export(sheet_id, original_file, updated_excel_path)
+        return updated_excel_path, original_file
+
     except Exception as e:
         print(f"❌ Error preparing Excel for Google Drive upload: {e}")
+        return None
+
+def _remove_export(sheet_id, original_file, updated_excel_path):
+    """Deletes the raw export once the prepared file exists (unless both have the same name)."""
+    current_workspace().discard(workspace.EXPORT, sheet_id)
+    if os.path.abspath(original_file) != os.path.abspath(updated_excel_path) and os.path.exists(original_file):
+        os.remove(original_file)
+    print(f"🗑️ Deleted original Excel file: {original_file}")
 
 def merge_comments_with_row_mapping(sheet_id):
-    """Merges the comments table with row mapping table using wildcard search."""
+    """Merges the comments table with the row mapping table registered by the earlier stages."""
+    import pandas as pd
+
     try:
-        # ✅ Define the folder path
-        comments_folder = os.path.abspath(f"comments/{sheet_id}")
-        row_mapping_folder = os.path.abspath(f"row_mapping/{sheet_id}")
-        
-        # ✅ Find the comments file using wildcard
-        comments_files = glob.glob(os.path.join(comments_folder, f"{sheet_id}*_comments.xlsx"))
-        mapping_files = glob.glob(os.path.join(row_mapping_folder, f"{sheet_id}*_relative_row_mapping.xlsx"))
-        
-        if not comments_files or not mapping_files:
-            print(f"❌ Comments or Mapping file not found in {comments_folder} or in {row_mapping_folder}")
+        # ✅ Files registered by extract_and_store_comments and create_relative_row_mapping
+        comments_file = current_workspace().get_path(workspace.COMMENTS, sheet_id)
+        mapping_file = current_workspace().get_path(workspace.ROW_MAPPING, sheet_id)
+
+        if not comments_file:
+            print(f"⏭️ No comments registered for Sheet {sheet_id}, nothing to merge.")
+            return NOTHING_TO_DO
+        if not mapping_file:
+            print(f"❌ Mapping file not registered for Sheet {sheet_id}")
             return None
-        
-        comments_file = comments_files[0]
-        mapping_file = mapping_files[0]
-        
+
         # ✅ Load the comments and mapping data
         df_comments = pd.read_excel(comments_file)
         df_mapping = pd.read_excel(mapping_file)
         
-        # ✅ Ensure correct column names before merging
-        df_comments.rename(columns={
-            df_comments.columns[0]: "Relative Row",
-            df_comments.columns[1]: "Comments",
-            df_comments.columns[2]: "Created By",
-            df_comments.columns[3]: "Created On"
-        }, inplace=True)
-        df_comments["Relative Row"] = df_comments["Relative Row"].astype(str).str.extract(r"(\d+)").astype(float).astype("Int64")
-      
-        
-        df_mapping.rename(columns={
-            df_mapping.columns[0]: "Relative Row",
-            df_mapping.columns[1]: "Row ID"
-        }, inplace=True)
-        df_mapping['Relative Row'] = df_mapping['Relative Row'].astype("Int64")
-        
-        # ✅ Merge comments with row mapping
-        df_merged = df_comments.merge(df_mapping, on="Relative Row", how="left")
-        
-        # ✅ Add Sheet ID column
-        df_merged.insert(0, "Sheet ID", sheet_id)
+        df_merged = merge_comments_table(df_comments, df_mapping, sheet_id)
         
         # ✅ Save the updated comments table
-        merged_file_path = os.path.join(comments_folder, f"{sheet_id}_comments.xlsx")
+        merged_file_path = current_workspace().path(workspace.COMMENTS, sheet_id, f"{sheet_id}_comments.xlsx")
         df_merged.to_excel(merged_file_path, index=False)
-        
+        current_workspace().register(workspace.COMMENTS, sheet_id, merged_file_path)
+
         print(f"✅ Merged comments saved: {merged_file_path}")
         return merged_file_path
     except Exception as e:
         print(f"❌ Error merging comments with row mapping for {sheet_id}: {e}")
         return None
 
-def get_or_create_drive_folder(folder_name, parent_folder_id):
-    """Checks if a folder exists in Google Drive, creates it if not, and returns its ID."""
+def process_sheet_in_memory(sheet_id, write_intermediate=None):
+    """
+    Runs the comments, row mapping, merge and prepare stages on one open of the exported workbook.
+    DataFrames are passed between stages in memory; only the final sheet and comments files are written,
+    plus the row mapping file when write_intermediate (or the WRITE_INTERMEDIATE_FILES setting) is on.
+    """
+    import pandas as pd
+
+    if write_intermediate is None:
+        write_intermediate = access_setting("WRITE_INTERMEDIATE_FILES")
     try:
-        query = f"name='{folder_name}' and '{parent_folder_id}' in parents and mimeType='application/vnd.google-apps.folder'"
-        results = drive_service.files().list(q=query, fields="files(id)").execute()
+        ws = current_workspace()
+        original_file = require_artifact(workspace.EXPORT, sheet_id)
+        if not original_file:
+            return None
 
-        if results.get("files"):
-            return results["files"][0]["id"]  # ✅ Return existing folder ID
+        row_ids = get_sheet_snapshot(sheet_id).row_ids
+
+        # ✅ Open the workbook once: the small Comments tab is parsed into a DataFrame, while the sheet tab
+        # is streamed row by row into the prepared file, so memory stays flat however large the sheet is
+        updated_excel_path = ws.path(workspace.SHEET, sheet_id, f"{sheet_id}.xlsx")
+        partial_path = updated_excel_path + ".partial"  # moved into place once the export is closed; they can share a name
+        with metrics.timer("parsing workbook"), pd.ExcelFile(original_file, engine="openpyxl") as xls:
+            df_raw_comments = None
+            if "Comments" in xls.sheet_names:
+                df_raw_comments = pd.read_excel(xls, sheet_name="Comments", header=None)
+            xlsx_stream.write_upload_table(xls.book[xls.sheet_names[0]], partial_path, row_ids, os.path.basename(original_file))
+        os.replace(partial_path, updated_excel_path)
+        ws.register(workspace.SHEET, sheet_id, updated_excel_path)
+
+        # ✅ Comments → mapping → merge, all in memory
+        merged_file_path = None
+        if df_raw_comments is None or df_raw_comments.empty:
+            print(f"⚠️ No comments found in 'Comments' sheet for {sheet_id}.")
+        else:
+            df_comments = build_comments_table(df_raw_comments)
+            df_mapping = build_row_mapping_table(df_raw_comments, row_ids)
+            df_merged = merge_comments_table(df_comments, df_mapping, sheet_id)
 
-        # ✅ Create folder if it doesn't exist
-        file_metadata = {
-            "name": folder_name,
-            "mimeType": "application/vnd.google-apps.folder",
-            "parents": [parent_folder_id]
-        }
-        folder = drive_service.files().create(body=file_metadata, fields="id").execute()
-        return folder["id"]
+            merged_file_path = ws.path(workspace.COMMENTS, sheet_id, f"{sheet_id}_comments.xlsx")
+            df_merged.to_excel(merged_file_path, index=False)
+            ws.register(workspace.COMMENTS, sheet_id, merged_file_path)
+            print(f"✅ Merged comments saved: {merged_file_path}")
+
+            if write_intermediate:
+                mapping_path = ws.path(workspace.ROW_MAPPING, sheet_id, f"{sheet_id}_relative_row_mapping.xlsx")
+                df_mapping.to_excel(mapping_path, index=False)
+                ws.register(workspace.ROW_MAPPING, sheet_id, mapping_path)
+                print(f"✅ Created Relative Row → Row ID mapping table: {mapping_path}")
+
+        _remove_export(sheet_id, original_file, updated_excel_path)
+        return updated_excel_path, merged_file_path
+
+    except Exception as e:
+        print(f"❌ Error processing Sheet {sheet_id} in memory: {e}")
+        return None
+
+# ✅ API extraction: the sheet table built straight from paged get_sheet responses, with no xlsx export to wait for or parse
+def iter_sheet_pages(sheet_id, page_size=None):
+    """Yields get_sheet responses of up to page_size (SHEET_PAGE_SIZE) rows each until every row has been fetched."""
+    page_size = page_size or access_setting("SHEET_PAGE_SIZE")
+    client = get_smartsheet_client()
+    page = 1
+    fetched = 0
+    while True:
+        current_token().check()
+        sheet = client.Sheets.get_sheet(sheet_id, page_size=page_size, page=page)
+        rows = sheet.rows or []
+        fetched += len(rows)
+        yield sheet
+        if not rows or fetched >= (sheet.total_row_count or 0):
+            return
+        page += 1
+
+def _parse_api_datetime(value):
+    """Smartsheet's ISO date / datetime text as a (naive UTC) datetime, so xlsx output gets real dates like the export."""
+    import datetime
+
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def api_cell_value(cell, column_type, source="value"):
+    """A cell of a get_sheet response as it goes into the sheet table (see the CELL_VALUE_SOURCE setting)."""
+    value, display_value = cell.value, cell.display_value
+    if source == "display":
+        return display_value if display_value not in (None, "") else value
+    if value is None or value == "":
+        return display_value or None
+    if column_type in ("DATE", "DATETIME", "ABSTRACT_DATETIME") and isinstance(value, str):
+        return _parse_api_datetime(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def extract_sheet_from_api(sheet_id):
+    """
+    Writes the sheet table (Row ID, the sheet's columns, Filename, laid out like the export's; see
+    xlsx_stream.UploadLayout) in OUTPUT_FORMAT from paged get_sheet responses, one page in memory at a
+    time. Registers and returns the prepared file's path.
+    """
+    try:
+        output_format = access_setting("OUTPUT_FORMAT")
+        source = access_setting("CELL_VALUE_SOURCE")
+        ws = current_workspace()
+        sheet_path = ws.path(workspace.SHEET, sheet_id, f"{sheet_id}.{output_format}")
+        partial_path = sheet_path + ".partial"
+
+        writer = None
+        rows_written = 0
+        row_ids = {}
+        try:
+            for sheet in iter_sheet_pages(sheet_id):
+                if writer is None:
+                    columns = [(column.id, str(column.type)) for column in sheet.columns or []]
+                    layout = xlsx_stream.UploadLayout(xlsx_stream.column_names([column.title for column in sheet.columns or []]))
+                    if not layout.add_row_id:
+                        print(f"⚠️ 'Row ID' column already exists in Sheet {sheet_id}, skipping insertion.")
+                    # Same file name the export would have had, so the table is identical in both modes
+                    filename = f"{sheet.name}.xlsx"
+                    writer = table_writer.open_table_writer(partial_path, output_format, layout.columns)
+                for row in sheet.rows or []:
+                    cells = {cell.column_id: cell for cell in row.cells or []}
+                    values = [
+                        api_cell_value(cells[column_id], column_type, source) if column_id in cells else None
+                        for column_id, column_type in columns
+                    ]
+                    writer.append(layout.row(row.id, values, filename))
+                    row_ids[row.row_number] = row.id
+                    rows_written += 1
+        finally:
+            if writer is not None:
+                writer.close()
+
+        os.replace(partial_path, sheet_path)
+        ws.register(workspace.SHEET, sheet_id, sheet_path)
+        # ✅ Later stages (comments) get row numbers from this index instead of fetching the sheet again
+        sheet_cache.put(sheet_id, SheetSnapshot(None, row_ids))
+        print(f"✅ Extracted {rows_written} rows of Sheet {sheet_id} through the API into {sheet_path}")
+        return sheet_path
+
+    except Exception as e:
+        print(f"❌ Error extracting Sheet {sheet_id} through the API: {e}")
+        return None
+
+# ✅ API comments: discussions and their comments for the whole sheet, already keyed by row ID
+COMMENTS_TABLE_COLUMNS = ["Sheet ID", "Relative Row", "Comments", "Created By", "Created On", "Row ID"]
+
+def _comment_time(created_at):
+    """A comment's creation time as a naive UTC datetime (xlsx cannot hold time zones)."""
+    import datetime
+
+    if created_at is None or created_at.tzinfo is None:
+        return created_at
+    return created_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+def extract_comments_from_api(sheet_id):
+    """
+    Builds the final comments table (Sheet ID, Relative Row, Comments, Created By, Created On, Row ID) from the
+    paged discussions listing in one pass, replacing the Comments-tab parse, row mapping and merge. Row numbers
+    come from the shared sheet snapshot. Registers and returns the comments file's path.
+    """
+    try:
+        smartsheet_client = get_smartsheet_client()
+        discussions = _fetch_all_pages(
+            lambda **paging: smartsheet_client.Discussions.get_all_discussions(sheet_id, include="comments", **paging),
+            access_setting("ATTACHMENT_LIST_PAGE_SIZE"),
+        )
+        row_numbers = {row_id: row_number for row_number, row_id in get_sheet_snapshot(sheet_id).row_ids.items()}
+
+        records = []
+        for discussion in discussions:
+            # Sheet-level discussions have no row; they are kept with the row columns left blank
+            row_id = discussion.parent_id if str(discussion.parent_type) == "ROW" else None
+            for comment in discussion.comments or []:
+                created_by = comment.created_by
+                author = (created_by.name or created_by.email) if created_by is not None else None
+                records.append([sheet_id, row_numbers.get(row_id), comment.text, author, _comment_time(comment.created_at), row_id])
+
+        if not records:
+            print(f"⚠️ No comments found for {sheet_id}.")
+            return NOTHING_TO_DO
+
+        # ✅ Grouped by row like the export's Comments tab (sheet-level comments last), oldest first within a row
+        records.sort(key=lambda record: (record[1] is None, record[1] or 0, record[4] is None, record[4] or 0))
+
+        ws = current_workspace()
+        comments_path = ws.path(workspace.COMMENTS, sheet_id, f"{sheet_id}_comments.xlsx")
+        writer = table_writer.open_table_writer(comments_path, "xlsx", COMMENTS_TABLE_COLUMNS)
+        try:
+            for record in records:
+                writer.append(record)
+        finally:
+            writer.close()
+        ws.register(workspace.COMMENTS, sheet_id, comments_path)
+
+        print(f"✅ Saved {len(records)} comments from {len(discussions)} discussions to {comments_path}")
+        return comments_path
+
+    except Exception as e:
+        print(f"❌ Error extracting comments for Sheet {sheet_id} through the API: {e}")
+        return None
+
+# ✅ Folder IDs are resolved once per (parent, name) and shared by the workers of a run. Each run (and job)
+# starts with its own cache, so a folder deleted or trashed in Drive since an earlier run is looked up again.
+_default_drive_folders = DriveFolderCache(get_drive_service)
+
+def new_drive_folder_cache():
+    return DriveFolderCache(get_drive_service)
+
+def drive_folder_cache():
+    """The running migration's folder cache (a process-wide one outside a run)."""
+    return current_folder_cache() or _default_drive_folders
+
+# ✅ Small metadata calls are grouped into Drive batch requests
+drive_batch = DriveBatch(get_drive_service, scheduler=api_scheduler)
+
+def get_or_create_drive_folder(folder_name, parent_folder_id):
+    """Checks if a folder exists in Google Drive, creates it if not, and returns its ID."""
+    try:
+        return drive_folder_cache().get_or_create(str(folder_name), parent_folder_id)
 
     except Exception as e:
         print(f"❌ Error creating Google Drive folder {folder_name}: {e}")
         return None
+
+def ensure_drive_folders(folder_names, parent_folder_id):
+    """Creates any missing folders under parent_folder_id using Drive batch requests and returns {name: folder ID}."""
+    try:
+        folder_ids, errors = drive_folder_cache().ensure_folders([str(name) for name in folder_names], parent_folder_id, drive_batch)
+        for folder_name, error in errors.items():
+            print(f"❌ Error creating Google Drive folder {folder_name}: {error}")
+        return folder_ids
+
+    except Exception as e:
+        print(f"❌ Error creating Google Drive folders under {parent_folder_id}: {e}")
+        return {}
     
 
+XLSX_MIMETYPE = table_writer.MIMETYPES["xlsx"]
+
+# ✅ Resumable upload sessions survive restarts, so large files continue where they stopped
+upload_sessions = UploadSessionStore(config.SETTINGS["UPLOAD_SESSION_FILE"])
+
+def flush_sync_state():
+    """Writes the pending changes of the state files kept across runs (after each sheet and at the end of a run)."""
+    upload_sessions.flush()
+    sync_manifest.flush()
+    content_index.flush()
+
+def upload_file_to_drive(file_path, file_name, mimetype, parent_folder_id, file_id=None):
+    """
+    Uploads a local file into a Drive folder in resumable chunks, reporting byte progress to the migration status.
+    With file_id, the existing Drive file is updated in place (a new file is created if it no longer exists).
+    """
+    file_metadata = {
+        "name": file_name,
+        "mimeType": mimetype,
+        "parents": [parent_folder_id],
+    }
+
+    def upload(target_file_id):
+        return upload_file(
+            get_drive_service(),
+            file_path,
+            file_metadata,
+            mimetype,
+            access_setting("UPLOAD_CHUNK_SIZE"),
+            session_store=upload_sessions,
+            progress_callback=lambda sent, total: process_state.set_upload_progress(file_path, sent, total),
+            num_retries=0,  # api_scheduler retries each chunk
+            file_id=target_file_id,
+        )
+
+    if file_id:
+        try:
+            return upload(file_id)
+        except HttpError as e:
+            if e.resp.status != 404:
+                raise
+            print(f"⚠️ Drive file {file_id} for {file_name} no longer exists, uploading a new copy.")
+    return upload(None)
+
+# ✅ Incremental sync: remembers sheet versions and Drive file IDs from earlier runs
+sync_manifest = SyncManifest(config.SETTINGS["SYNC_MANIFEST_FILE"])
+
+DRIVE_FOLDER_KEYS = ("GOOGLE_DRIVE_SHEETS_FOLDER_ID", "GOOGLE_DRIVE__COMMENTS_FOLDER_ID", "GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID")
+
+def google_account():
+    """The service account this context writes to Drive as."""
+    return transport.get_google_credentials().service_account_email
+
+def manifest_key(sheet_id):
+    """
+    The sheet's manifest entry for this context's destination: the same sheet synced into other Drive
+    folders, or by another service account, is tracked separately and starts with a full sync.
+    """
+    folders = ",".join(str(access_config_file(key) or "") for key in DRIVE_FOLDER_KEYS)
+    return f"{sheet_id}|{folders}|{google_account()}"
+
+def incremental_sync_enabled():
+    return access_setting("INCREMENTAL_SYNC")
+
+def get_sheet_version(sheet_id):
+    """Returns the sheet's current version number without loading its rows."""
+    return get_smartsheet_client().Sheets.get_sheet_version(sheet_id).version
+
+def is_sheet_unchanged(sheet_id, version):
+    """True if the previous run already synced this exact version of the sheet."""
+    return version is not None and sync_manifest.sheet_version(manifest_key(sheet_id)) == version
+
+def record_synced_sheet(sheet_id, version):
+    sync_manifest.record_sheet_version(manifest_key(sheet_id), version)
+
+def _skip_synced_attachments(sheet_id, attachments_by_row):
+    """Drops attachments that already have a Drive copy from an earlier run (incremental mode only)."""
+    if not incremental_sync_enabled():
+        return attachments_by_row
+    synced = sync_manifest.synced_attachment_ids(manifest_key(sheet_id))
+    remaining = {}
+    skipped = 0
+    for row_id, attachments in attachments_by_row.items():
+        new = [att for att in attachments if str(att.id) not in synced]
+        skipped += len(attachments) - len(new)
+        if new:
+            remaining[row_id] = new
+    if skipped:
+        print(f"⏭️ Skipping {skipped} attachments already synced for sheet {sheet_id}")
+    return remaining
+
 def upload_to_google_drive(sheet_id):
-    """Uploads an Excel file to Google Drive in sheets/{sheet_id} folder."""
+    """Uploads the prepared sheet file (xlsx, csv or parquet) to Google Drive in sheets/{sheet_id} folder."""
     try:
-        # ✅ Find the downloaded Excel file using wildcard
-        sheet_folder = os.path.abspath(f"sheets/{sheet_id}")
-        excel_files = glob.glob(os.path.join(sheet_folder, "*.xlsx"))
-        if not excel_files:
-            print(f"❌ Smartsheet Excel not found in {sheet_folder}")
+        # ✅ The prepared sheet registered by the prepare stage
+        file_path = require_artifact(workspace.SHEET, sheet_id)
+        if not file_path:
             return None
-
-        file_path = excel_files[0]  # ✅ Select first found file
-        GOOGLE_DRIVE_SHEETS_FOLDER_ID = config.CREDENTIALS["GOOGLE_DRIVE_SHEETS_FOLDER_ID"]
+        GOOGLE_DRIVE_SHEETS_FOLDER_ID = access_config_file("GOOGLE_DRIVE_SHEETS_FOLDER_ID")
         # ✅ Ensure `sheets/{sheet_id}` folder exists in Google Drive
         drive_sheet_folder_id = get_or_create_drive_folder(str(sheet_id), GOOGLE_DRIVE_SHEETS_FOLDER_ID)
 
@@ -356,14 +740,11 @@ def upload_to_google_drive(sheet_id):
             print(f"❌ Failed to create/find folder in Google Drive for Sheet {sheet_id}")
             return None
 
-        # ✅ Upload the file to `sheets/{sheet_id}` folder in Drive
-        file_metadata = {
-            "name": os.path.basename(file_path),
-            "mimeType": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            "parents": [drive_sheet_folder_id],
-        }
-        media = MediaFileUpload(file_path, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        file = drive_service.files().create(body=file_metadata, media_body=media, fields="id").execute()
+        # ✅ Upload the file to `sheets/{sheet_id}` folder in Drive (replacing last run's copy in incremental mode)
+        existing_file_id = sync_manifest.file_id(manifest_key(sheet_id), "sheet") if incremental_sync_enabled() else None
+        mimetype = table_writer.MIMETYPES.get(os.path.splitext(file_path)[1].lstrip("."), XLSX_MIMETYPE)
+        file = upload_file_to_drive(file_path, os.path.basename(file_path), mimetype, drive_sheet_folder_id, existing_file_id)
+        sync_manifest.record_file(manifest_key(sheet_id), "sheet", file.get("id"))
 
         print(f"✅ Uploaded {file_path} to Google Drive folder: sheets/{sheet_id}")
         return file.get("id")
@@ -374,92 +755,441 @@ def upload_to_google_drive(sheet_id):
 
 
 
-def download_smartsheet_attachments(sheet_id):
+def _open_attachment_download(sheet_id, att_id):
+    """Resolves an attachment's download URL and opens a streaming response, or returns None if it has no file."""
     smartsheet_client = get_smartsheet_client()
-    """Downloads all attachments from a Smartsheet and saves them in /attachments/{sheet_id}/{row_id}/"""
-    try:
-        SMARTSHEET_API_KEY = config.CREDENTIALS["SMARTSHEET_API_KEY"]
-        # Create base folder for the sheet's attachments
-        base_folder = os.path.abspath(f"attachments/{sheet_id}")
-        os.makedirs(base_folder, exist_ok=True)
+    SMARTSHEET_API_KEY = access_config_file("SMARTSHEET_API_KEY")
 
-        # Get all rows in the sheet
-        sheet_data = smartsheet_client.Sheets.get_sheet(sheet_id)
+    current_token().check()
 
-        for row in sheet_data.rows:
-            # Check for cancellation before processing a new row
-            from process_state import cancel_requested  # If not already imported globally
-            if cancel_requested:
-                print("Cancellation requested before processing row; stopping attachments download.")
-                return
+    # Fetch attachment details
+    retrieve_att = smartsheet_client.Attachments.get_attachment(sheet_id, att_id)
+    file_url = retrieve_att.url  # Check if it's downloadable
+    if not file_url:
+        return None
+
+    response = transport.get_session().get(file_url, headers={"Authorization": f"Bearer {SMARTSHEET_API_KEY}"}, stream=True)
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    return response
+
+def _iter_download_chunks(response, local_file=None, digest=None):
+    """
+    Yields the response body chunk by chunk, stopping on cancellation and holding while paused. Optionally copies it to
+    local_file and feeds it to digest (a ContentDigest) on the way through.
+    """
+    for chunk in response.iter_content(chunk_size=access_setting("DOWNLOAD_CHUNK_SIZE")):
+        # Check for cancellation (or a pause) between chunks; this also covers streaming uploads fed by this download
+        current_token().check()
+        metrics.add_bytes("downloaded", len(chunk))
+        if local_file is not None:
+            local_file.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        yield chunk
+
+class ContentDigest:
+    """sha256 and byte count of a file, computed while it streams past."""
+
+    def __init__(self):
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+
+    def update(self, chunk):
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+def _hash_file(file_path):
+    digest = ContentDigest()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest
+
+class _PartialFile:
+    """Writes to a unique `.part` file next to path and only moves it into place if the block finishes without error."""
+
+    def __init__(self, path):
+        self.path = path
+        self.partial_path = None
+
+    def __enter__(self):
+        # A unique temp name per download: two same-named attachments in one row must not share a .part file
+        directory, name = os.path.split(self.path)
+        fd, self.partial_path = tempfile.mkstemp(prefix=f"{name}.", suffix=".part", dir=directory or None)
+        self.file = os.fdopen(fd, "wb")
+        return self.file
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.partial_path, self.path)
+        elif os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+        return False
+
+# ✅ Content-addressed dedup: identical attachment bytes are uploaded once per service account and shortcut everywhere else
+content_index = ContentIndex(config.SETTINGS["DEDUP_INDEX_FILE"])
+_default_verified_dedup_targets = set()
+_verified_dedup_lock = threading.Lock()
+
+def verified_dedup_targets():
+    """Dedup targets already checked by the running migration (a process-wide set outside a run)."""
+    targets = current_verified_targets()
+    return _default_verified_dedup_targets if targets is None else targets
+
+def dedup_enabled():
+    return access_setting("DEDUP_ATTACHMENTS")
+
+def _live_dedup_target(digest):
+    """Returns the Drive file already holding these bytes, checking once per run that it still exists."""
+    scope = google_account()
+    entry = content_index.get(scope, digest)
+    if not entry:
+        return None
+    file_id = entry["file_id"]
+    with _verified_dedup_lock:
+        if (scope, file_id) in verified_dedup_targets():
+            return file_id
+    try:
+        metadata = get_drive_service().files().get(fileId=file_id, fields="id, trashed").execute()
+    except HttpError as e:
+        if e.resp.status != 404:
+            raise
+        metadata = None
+    if not metadata or metadata.get("trashed"):
+        content_index.forget(scope, digest)
+        return None
+    with _verified_dedup_lock:
+        verified_dedup_targets().add((scope, file_id))
+    return file_id
+
+def create_drive_shortcut(file_name, target_file_id, parent_folder_id):
+    """Places a Drive shortcut to an existing file instead of uploading another copy."""
+    file_metadata = {
+        "name": file_name,
+        "mimeType": SHORTCUT_MIMETYPE,
+        "parents": [parent_folder_id],
+        "shortcutDetails": {"targetId": target_file_id},
+    }
+    return get_drive_service().files().create(body=file_metadata, fields="id").execute()
+
+def _download_attachment(sheet_id, attachment, file_name, row_folder):
+    """Worker: streams one attachment into row_folder as file_name. Returns the saved path, or None if it has no file."""
+    file_path = os.path.join(row_folder, file_name)
+    response = _open_attachment_download(sheet_id, attachment.id)
+    if response is None:
+        return None
+    # Download to a temporary name so a cancelled or failed transfer never leaves a partial file behind
+    digest = ContentDigest()
+    with response, _PartialFile(file_path) as file:
+        for _ in _iter_download_chunks(response, local_file=file, digest=digest):
+            pass
+    # The Drive file ID is filled in by upload_attachments_to_drive
+    row_id = os.path.basename(row_folder)
+    sync_manifest.record_attachment(manifest_key(sheet_id), attachment.id, row_id, file_name,
+        sha256=digest.hexdigest(), size=digest.size,
+    )
+    current_workspace().register(workspace.ATTACHMENT, sheet_id, file_path, row_id=row_id, attachment_id=attachment.id)
+    return file_path
+
+def _stream_attachment_to_drive(sheet_id, attachment, file_name, target):
+    """
+    Worker: pipes one attachment from Smartsheet straight into a chunked Drive upload named file_name.
+    target is (row ID, Drive row folder ID, local row folder or None); a local copy is only written when
+    KEEP_LOCAL_ATTACHMENTS is on. Returns the Drive file ID, or None if the attachment has no file.
+    """
+    row_id, drive_row_folder_id, local_row_folder = target
+    dedup = dedup_enabled()
+
+    def keep_local_copy():
+        if local_row_folder:
+            local_path = os.path.join(local_row_folder, file_name)
+            current_workspace().register(workspace.ATTACHMENT, sheet_id, local_path, row_id=row_id, attachment_id=attachment.id)
+            return _PartialFile(local_path)
+        return contextlib.nullcontext()
+
+    if dedup and content_index.may_contain_size(google_account(), attachment.size_in_kb):
+        # ✅ Same size as a file we already have: hash it first, without uploading anything
+        response = _open_attachment_download(sheet_id, attachment.id)
+        if response is None:
+            return None
+        digest = ContentDigest()
+        with response, keep_local_copy() as local_file:
+            for _ in _iter_download_chunks(response, local_file=local_file, digest=digest):
+                pass
+        target_file_id = _live_dedup_target(digest.hexdigest())
+        if target_file_id:
+            shortcut = create_drive_shortcut(file_name, target_file_id, drive_row_folder_id)
+            process_state.add_dedup_savings(digest.size)
+            sync_manifest.record_attachment(manifest_key(sheet_id), attachment.id, row_id, file_name, shortcut.get("id"),
+                sha256=digest.hexdigest(), size=digest.size,
+            )
+            print(f"♻️ {file_name} is a duplicate, added a shortcut instead of uploading {digest.size} bytes")
+            return shortcut.get("id")
+        # Not a duplicate after all; fall through and stream it to Drive
+
+    response = _open_attachment_download(sheet_id, attachment.id)
+    if response is None:
+        return None
 
-            row_id = row.id  # Unique Row ID in Smartsheet
-            row_folder = os.path.join(base_folder, str(row_id))
-            os.makedirs(row_folder, exist_ok=True)  # Create folder for row
+    label = f"attachments/{sheet_id}/{row_id}/{file_name}"  # same-named files on other rows have their own progress
+    file_metadata = {
+        "name": file_name,
+        "mimeType": "application/octet-stream",
+        "parents": [drive_row_folder_id],
+    }
+    digest = ContentDigest()
+    with response, keep_local_copy() as local_file:
+        file = upload_stream(
+            get_drive_service(),
+            _iter_download_chunks(response, local_file=local_file, digest=digest),
+            file_metadata,
+            "application/octet-stream",
+            access_setting("UPLOAD_CHUNK_SIZE"),
+            progress_callback=lambda sent, total: process_state.set_upload_progress(label, sent, total),
+            num_retries=0,  # api_scheduler retries each chunk
+        )
+    if dedup:
+        content_index.add(google_account(), digest.hexdigest(), file.get("id"), digest.size)
+    sync_manifest.record_attachment(manifest_key(sheet_id), attachment.id, row_id, file_name, file.get("id"),
+        sha256=digest.hexdigest(), size=digest.size,
+    )
+    return file.get("id")
+
+def _fetch_all_pages(list_page, page_size):
+    """Calls a paged Smartsheet listing (list_page(page_size=..., page=...)) until every page has been read."""
+    items = []
+    page = 1
+    while True:
+        result = list_page(page_size=page_size, page=page)
+        items.extend(result.data or [])
+        if not result.total_pages or page >= result.total_pages:
+            return items
+        page += 1
+
+def list_sheet_attachments(sheet_id):
+    """
+    Builds the sheet's attachment inventory from the paged sheet-wide listing and groups it by
+    parent row: {row_id: [attachment, ...]}. Attachments on row comments are filed under their row;
+    sheet-level attachments are left out, as before.
+    """
+    smartsheet_client = get_smartsheet_client()
+    page_size = access_setting("ATTACHMENT_LIST_PAGE_SIZE")
+    attachments = _fetch_all_pages(
+        lambda **paging: smartsheet_client.Attachments.list_all_attachments(sheet_id, **paging),
+        page_size,
+    )
+
+    # ✅ Comment attachments point at the comment; look up each comment's row only if we need to
+    comment_rows = {}
+    # (the SDK's enum values raise KeyError when compared with a name they don't define, so compare strings)
+    if any(str(att.parent_type) in ("COMMENT", "DISCUSSION") for att in attachments):
+        discussions = _fetch_all_pages(
+            lambda **paging: smartsheet_client.Discussions.get_all_discussions(sheet_id, include="comments", **paging),
+            page_size,
+        )
+        for discussion in discussions:
+            if str(discussion.parent_type) != "ROW":
+                continue
+            comment_rows[discussion.id] = discussion.parent_id
+            for comment in discussion.comments or []:
+                comment_rows[comment.id] = discussion.parent_id
+
+    attachments_by_row = {}
+    for att in attachments:
+        if str(att.parent_type) == "ROW":
+            row_id = att.parent_id
+        else:
+            row_id = comment_rows.get(att.parent_id)
+        if row_id is not None:
+            attachments_by_row.setdefault(row_id, []).append(att)
+    return attachments_by_row
 
-            # Get all attachments for this row
-            attachments = smartsheet_client.Attachments.list_row_attachments(sheet_id, row_id).data
+def attachment_file_names(attachments):
+    """
+    {attachment ID: file name} for one row's attachments: the sanitized name, with the attachment ID
+    added when an earlier attachment of the row already has that name, so no file overwrites another.
+    """
+    names = {}
+    taken = set()
+    for attachment in attachments:
+        name = sanitize_filename(attachment.name)
+        if name in taken:
+            base, ext = os.path.splitext(name)
+            name = f"{base}_{attachment.id}{ext}"
+        taken.add(name)
+        names[attachment.id] = name
+    return names
+
+def _run_attachment_tasks(sheet_id, attachments_by_row, prepare_row, worker, verb):
+    """
+    Runs worker(sheet_id, attachment, file_name, row_target) for every attachment on a bounded pool of
+    ATTACHMENT_DOWNLOAD_WORKERS threads. prepare_row(row_id) returns the row_target handed to the
+    worker (or None to skip the row). Returns a summary with the per-file results and errors.
+    """
+    summary = {"completed": 0, "skipped": 0, "failed": [], "results": {}, "cancelled": False}
+    token = current_token()
+    executor = BoundedExecutor(
+        access_setting("ATTACHMENT_DOWNLOAD_WORKERS"),
+        queue_size=access_setting("ATTACHMENT_QUEUE_SIZE"),
+        thread_name_prefix=f"attachments-{sheet_id}",
+    )
+    pending = {}
+
+    def collect(future):
+        row_id, file_name = pending.pop(future)
+        try:
+            result = future.result()
+            if result:
+                summary["completed"] += 1
+                summary["results"][(row_id, file_name)] = result
+                process_state.finish_attachment(True)
+                print(f"✅ {verb}: {row_id}/{file_name}")
+            else:
+                summary["skipped"] += 1
+                print(f"⚠️ Skipped (No download link): {file_name}")
+        except Cancelled:
+            pass
+        except Exception as e:
+            summary["failed"].append((f"{row_id}/{file_name}", str(e)))
+            process_state.finish_attachment(False)
+            print(f"❌ Failed to transfer {file_name}: {e}")
 
+    try:
+        for row_id, attachments in attachments_by_row.items():
+            # Check for cancellation before processing a new row (waits here while paused)
+            try:
+                token.check()
+            except Cancelled:
+                print("Cancellation requested before processing row; stopping attachment transfers.")
+                break
+
+            row_target = prepare_row(row_id)
+            if row_target is None:
+                continue
+
+            file_names = attachment_file_names(attachments)
             for attachment in attachments:
-                # Check for cancellation before processing each attachment
-                if cancel_requested:
-                    print(f"Cancellation requested; stopping download for row {row_id}.")
-                    return
-
-                att_id = attachment.id
-                file_name = sanitize_filename(attachment.name)  # Clean the filename
-                file_path = os.path.join(row_folder, file_name)
-
-                # Fetch attachment details
-                retrieve_att = smartsheet_client.Attachments.get_attachment(sheet_id, att_id)
-                file_url = retrieve_att.url  # Check if it's downloadable
-
-                if file_url:
-                    # Download and save attachment
-                    response = requests.get(file_url, headers={"Authorization": f"Bearer {SMARTSHEET_API_KEY}"}, stream=True)
-                    with open(file_path, "wb") as file:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            # Check for cancellation during file download
-                            if cancel_requested:
-                                print(f"Cancellation requested during download of {file_path}; stopping file download.")
-                                return
-                            file.write(chunk)
-                    print(f"✅ Downloaded: {file_path}")
-                else:
-                    print(f"⚠️ Skipped (No download link): {file_name}")
-
-        print(f"🎉 Completed downloading all attachments for sheet {sheet_id}")
+                # Blocks while the queue is full
+                file_name = file_names[attachment.id]
+                future = executor.submit(worker, sheet_id, attachment, file_name, row_target)
+                pending[future] = (row_id, file_name)
+
+            # Report finished transfers as we go
+            for future in [f for f in pending if f.done()]:
+                collect(future)
+
+    finally:
+        summary["cancelled"] = token.cancelled
+        executor.shutdown(wait=True, cancel_pending=summary["cancelled"])
+        for future in list(pending):
+            if future.cancelled():
+                pending.pop(future)
+            else:
+                collect(future)
+
+    if summary["cancelled"]:
+        print(f"Cancellation requested; stopped attachment transfers for sheet {sheet_id}.")
+    elif summary["failed"]:
+        print(f"⚠️ {verb} {summary['completed']} attachments for sheet {sheet_id}, {len(summary['failed'])} failed")
+    return summary
+
+def download_smartsheet_attachments(sheet_id):
+    """
+    Downloads all attachments from a Smartsheet and saves them in attachments/{sheet_id}/{row_id}/ of the workspace,
+    registering each file as an attachment artifact.
+    Files are fetched by a bounded pool of ATTACHMENT_DOWNLOAD_WORKERS threads; returns a summary
+    with the number of files completed, skipped, and the per-file errors.
+    """
+    try:
+        # ✅ One paged sheet-wide listing instead of one call per row
+        attachments_by_row = list_sheet_attachments(sheet_id)
+        print(f"📎 Found {sum(len(a) for a in attachments_by_row.values())} attachments on {len(attachments_by_row)} rows of sheet {sheet_id}")
+        attachments_by_row = _skip_synced_attachments(sheet_id, attachments_by_row)
+
+        def prepare_row(row_id):
+            # Folders are only created for rows that actually have files
+            return current_workspace().folder(workspace.ATTACHMENT, sheet_id, row_id)
+
+        summary = _run_attachment_tasks(sheet_id, attachments_by_row, prepare_row, _download_attachment, "Downloaded")
+        if not summary["cancelled"] and not summary["failed"]:
+            print(f"🎉 Completed downloading all attachments for sheet {sheet_id}")
+        return summary
 
     except Exception as e:
         print(f"❌ Error downloading attachments for sheet {sheet_id}: {e}")
+        return None
 
-def upload_comments_to_drive(sheet_id):
-    """Uploads the comments Excel file to Google Drive inside comments/{sheet_id}/."""
+def transfer_attachments_to_drive(sheet_id):
+    """
+    Streams every attachment of a sheet from Smartsheet directly into Google Drive under
+    attachments/{sheet_id}/{row_id}/, without writing local files unless KEEP_LOCAL_ATTACHMENTS is on.
+    Returns {file name: Drive link}, like upload_attachments_to_drive.
+    """
     try:
-        GOOGLE_DRIVE__COMMENTS_FOLDER_ID = config.CREDENTIALS["GOOGLE_DRIVE__COMMENTS_FOLDER_ID"]
-        # ✅ Define the comments folder path
-        comments_folder = os.path.abspath(f"comments/{sheet_id}")
-        os.makedirs(comments_folder, exist_ok=True)  # Ensure directory exists
-
-        # ✅ Find the comments Excel file using wildcard (*.xlsx)
-        excel_files = glob.glob(os.path.join(comments_folder, "*.xlsx"))
-        if not excel_files:
-            print(f"❌ No comments file found in {comments_folder} for upload.")
+        GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID = access_config_file("GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID")
+        keep_local = access_setting("KEEP_LOCAL_ATTACHMENTS")
+
+        attachments_by_row = list_sheet_attachments(sheet_id)
+        print(f"📎 Found {sum(len(a) for a in attachments_by_row.values())} attachments on {len(attachments_by_row)} rows of sheet {sheet_id}")
+        attachments_by_row = _skip_synced_attachments(sheet_id, attachments_by_row)
+        if not attachments_by_row:
+            return {}
+
+        # ✅ Ensure Drive folders exist for attachments/{sheet_id} and each row, in a few batch requests
+        drive_sheet_folder_id = get_or_create_drive_folder(f"{sheet_id}", GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID)
+        if not drive_sheet_folder_id:
+            print(f"❌ Failed to create/find attachments folder in Google Drive for Sheet {sheet_id}")
             return None
+        drive_row_folder_ids = ensure_drive_folders(list(attachments_by_row), drive_sheet_folder_id)
+
+        def prepare_row(row_id):
+            drive_row_folder_id = drive_row_folder_ids.get(str(row_id)) or get_or_create_drive_folder(row_id, drive_sheet_folder_id)
+            if not drive_row_folder_id:
+                print(f"❌ Skipping row {row_id}: no Google Drive folder")
+                return None
+            local_row_folder = None
+            if keep_local:
+                local_row_folder = current_workspace().folder(workspace.ATTACHMENT, sheet_id, row_id)
+            return row_id, drive_row_folder_id, local_row_folder
+
+        summary = _run_attachment_tasks(sheet_id, attachments_by_row, prepare_row, _stream_attachment_to_drive, "Transferred")
+        if not summary["cancelled"] and not summary["failed"]:
+            print(f"🎉 Completed transferring all attachments for sheet {sheet_id}")
+        return {
+            file_name: f"https://drive.google.com/file/d/{file_id}/view"
+            for (_, file_name), file_id in summary["results"].items()
+        }
 
-        file_path = excel_files[0]  # Use the first (and only) found file
+    except Exception as e:
+        print(f"❌ Error transferring attachments for sheet {sheet_id}: {e}")
+        return None
+
+def upload_comments_to_drive(sheet_id):
+    """Uploads the comments Excel file to Google Drive inside comments/{sheet_id}/."""
+    try:
+        GOOGLE_DRIVE__COMMENTS_FOLDER_ID = access_config_file("GOOGLE_DRIVE__COMMENTS_FOLDER_ID")
+        # ✅ The comments table registered by the comments stages
+        file_path = current_workspace().get_path(workspace.COMMENTS, sheet_id)
+        if not file_path:
+            # The comments stages report their own failures; without a file the sheet has no comments
+            print(f"⏭️ No comments file for Sheet {sheet_id}, nothing to upload.")
+            return NOTHING_TO_DO
 
         # ✅ Ensure Drive folder exists for comments
         drive_folder_id = get_or_create_drive_folder(f"{sheet_id}", GOOGLE_DRIVE__COMMENTS_FOLDER_ID)
 
-        # ✅ Upload the file to Google Drive
-        file_metadata = {
-            "name": os.path.basename(file_path),
-            "mimeType": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            "parents": [drive_folder_id],
-        }
-        media = MediaFileUpload(file_path, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        file = drive_service.files().create(body=file_metadata, media_body=media, fields="id").execute()
+        # ✅ Upload the file to Google Drive (replacing last run's copy in incremental mode)
+        existing_file_id = sync_manifest.file_id(manifest_key(sheet_id), "comments") if incremental_sync_enabled() else None
+        file = upload_file_to_drive(file_path, os.path.basename(file_path), XLSX_MIMETYPE, drive_folder_id, existing_file_id)
+        sync_manifest.record_file(manifest_key(sheet_id), "comments", file.get("id"))
 
         print(f"✅ Uploaded {file_path} to Google Drive in comments/{sheet_id}/")
         return file.get("id")
@@ -470,46 +1200,65 @@ def upload_comments_to_drive(sheet_id):
 
 
 def upload_attachments_to_drive(sheet_id):
-    """Uploads all attachments in attachments/{sheet_id}/{row_id}/ to Google Drive."""
+    """Uploads the attachment files registered by download_smartsheet_attachments to Google Drive under attachments/{sheet_id}/{row_id}/."""
     try:
-        GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID = config.CREDENTIALS["GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID"]
-        # ✅ Define the base attachments directory
-        attachments_folder = os.path.abspath(f"attachments/{sheet_id}")
-        if not os.path.exists(attachments_folder):
-            print(f"❌ No attachments found for sheet {sheet_id}.")
-            return None
+        GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID = access_config_file("GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID")
+        # ✅ Group the downloaded files by row
+        files_by_row = {}
+        for artifact in current_workspace().all(workspace.ATTACHMENT, sheet_id):
+            files_by_row.setdefault(artifact.row_id, []).append(artifact)
+        if not files_by_row:
+            # Nothing was downloaded: the sheet has no (new) attachments
+            return {}
 
         # ✅ Ensure Drive folder exists for attachments/{sheet_id}
         drive_sheet_folder_id = get_or_create_drive_folder(f"{sheet_id}", GOOGLE_DRIVE_ATTACHMENTS_FOLDER_ID)
 
         uploaded_files = {}
 
+        row_folders = list(files_by_row)
+
+        # ✅ Create the whole attachments/{sheet_id}/{row_id} folder tree in a few batch requests
+        drive_row_folder_ids = ensure_drive_folders(row_folders, drive_sheet_folder_id)
+
         # ✅ Loop through row_id folders
-        for row_folder in os.listdir(attachments_folder):
-            row_folder_path = os.path.join(attachments_folder, row_folder)
-            if not os.path.isdir(row_folder_path):
-                continue  # Skip non-folder files
-            
+        for row_folder in row_folders:
             # ✅ Ensure Drive folder exists for attachments/{sheet_id}/{row_id}
-            drive_row_folder_id = get_or_create_drive_folder(row_folder, drive_sheet_folder_id)
+            drive_row_folder_id = drive_row_folder_ids.get(row_folder) or get_or_create_drive_folder(row_folder, drive_sheet_folder_id)
+            if not drive_row_folder_id:
+                print(f"❌ Skipping row {row_folder}: no Google Drive folder")
+                continue
 
-            # ✅ Find all files inside row_id folder
-            attachment_files = glob.glob(os.path.join(row_folder_path, "*.*"))
-            for file_path in attachment_files:
+            for artifact in files_by_row[row_folder]:
+                file_path = artifact.path
                 file_name = os.path.basename(file_path)
 
+                # ✅ Identical bytes already in Drive get a shortcut instead of another upload
+                if dedup_enabled():
+                    entry = sync_manifest.attachment_entry(manifest_key(sheet_id), artifact.attachment_id)
+                    if entry and entry.get("sha256"):
+                        sha256, size = entry["sha256"], entry["size"]
+                    else:
+                        digest = _hash_file(file_path)
+                        sha256, size = digest.hexdigest(), digest.size
+                    target_file_id = _live_dedup_target(sha256)
+                    if target_file_id:
+                        file = create_drive_shortcut(file_name, target_file_id, drive_row_folder_id)
+                        process_state.add_dedup_savings(size)
+                        uploaded_files[file_name] = f"https://drive.google.com/file/d/{file.get('id')}/view"
+                        sync_manifest.complete_attachment(manifest_key(sheet_id), artifact.attachment_id, file.get("id"))
+                        print(f"♻️ {file_name} is a duplicate, added a shortcut in attachments/{sheet_id}/{row_folder}/")
+                        continue
+
                 # ✅ Upload the file to Google Drive
-                file_metadata = {
-                    "name": file_name,
-                    "mimeType": "application/octet-stream",
-                    "parents": [drive_row_folder_id],
-                }
-                media = MediaFileUpload(file_path, mimetype="application/octet-stream")
-                file = drive_service.files().create(body=file_metadata, media_body=media, fields="id").execute()
+                file = upload_file_to_drive(file_path, file_name, "application/octet-stream", drive_row_folder_id)
+                if dedup_enabled():
+                    content_index.add(google_account(), sha256, file.get("id"), size)
                 drive_link = f"https://drive.google.com/file/d/{file.get('id')}/view"
 
                 # ✅ Store uploaded file info
                 uploaded_files[file_name] = drive_link
+                sync_manifest.complete_attachment(manifest_key(sheet_id), artifact.attachment_id, file.get("id"))
 
                 print(f"✅ Uploaded {file_name} to Google Drive in attachments/{sheet_id}/{row_folder}/")
 
@@ -520,47 +1269,45 @@ def upload_attachments_to_drive(sheet_id):
         return None
 
 # ✅ Send Data to AppSheet
-def send_data_to_appsheet_database(google_sheet_id, sheet_name):
-    """Fetches data from Google Sheets and sends it to AppSheet Database."""
-    try:
-        APPSHEET_API_KEY = config.CREDENTIALS["APPSHEET_API_KEY"]
-        APPSHEET_APP_ID = config.CREDENTIALS["APPSHEET_APP_ID"]
-        APPSHEET_TABLE_NAME = config.CREDENTIALS["APPSHEET_TABLE_NAME"]
-        # ✅ Fetch Google Sheets Data (Ensuring it remains an Excel file)
-        url = f"https://sheets.googleapis.com/v4/spreadsheets/{google_sheet_id}/values/{sheet_name}!A1:Z1000"
-        headers = {"Authorization": f"Bearer {credentials.token}"}
-        response = requests.get(url, headers=headers)
-
-        if response.status_code != 200:
-            print(f"❌ Failed to fetch Google Sheet data: {response.text}")
-            return
+# ✅ Fingerprints of the rows last sent to AppSheet, kept across runs for delta syncs
+appsheet_fingerprints = RowFingerprintStore(config.SETTINGS["APPSHEET_FINGERPRINT_FILE"])
 
-        sheet_data = response.json().get("values", [])
-        if not sheet_data:
-            print("⚠️ No data found in Google Sheet.")
-            return
 
-        # ✅ Format Data for AppSheet
-        headers = sheet_data[0]
-        rows_data = sheet_data[1:]
+def get_appsheet_sync():
+    """Returns an AppSheet sync engine configured from SETTINGS."""
+    return AppSheetSync(
+        get_sheets_service, api_scheduler, transport.get_session, access_setting("APPSHEET_API_BASE"),
+        block_rows=access_setting("APPSHEET_READ_BLOCK_ROWS"),
+        batch_size=access_setting("APPSHEET_BATCH_SIZE"),
+        max_concurrent=access_setting("APPSHEET_MAX_CONCURRENT_BATCHES"),
+    )
 
-        records = []
-        for row in rows_data:
-            record = {headers[i]: row[i] if i < len(row) else "" for i in range(len(headers))}
-            records.append(record)
-
-        # ✅ Send to AppSheet
-        appsheet_url = f"https://api.appsheet.com/api/v2/apps/{APPSHEET_APP_ID}/tables/{APPSHEET_TABLE_NAME}/Action"
-        payload = {"Action": "AddOrUpdate", "Properties": {"Locale": "en-US"}, "Rows": records}
-        appsheet_headers = {"Content-Type": "application/json", "ApplicationAccessKey": APPSHEET_API_KEY}
-
-        response = requests.post(appsheet_url, headers=appsheet_headers, json=payload)
-        if response.status_code == 200:
-            print(f"✅ Successfully synced data with AppSheet.")
+
+def send_data_to_appsheet_database(google_sheet_id, sheet_name):
+    """Copies a Google Sheets tab (only its changes, with APPSHEET_DELTA_SYNC) into the AppSheet table; returns the sync summary (None on error)."""
+    try:
+        summary = get_appsheet_sync().sync(
+            google_sheet_id, sheet_name,
+            access_config_file("APPSHEET_APP_ID"),
+            access_config_file("APPSHEET_TABLE_NAME"),
+            access_config_file("APPSHEET_API_KEY"),
+            fingerprints=appsheet_fingerprints if access_setting("APPSHEET_DELTA_SYNC") else None,
+        )
+        if summary is None:
+            print("⚠️ No data found in Google Sheet.")
+            return None
+        if summary["failed_batches"]:
+            print(f"❌ {summary['failed_batches']} of {summary['batches']} AppSheet batches failed "
+                  f"({summary['failed_rows']} rows): {summary['errors'][0]}")
+        elif summary["delta"]:
+            print(f"✅ Synced AppSheet changes: {summary['rows']} rows added or updated, {summary['deleted']} deleted, "
+                  f"{summary['unchanged']} unchanged.")
         else:
-            print(f"❌ Failed to sync with AppSheet: {response.text}")
+            print(f"✅ Successfully synced {summary['rows']} rows with AppSheet in {summary['batches']} batches.")
+        return summary
     except Exception as e:
         print(f"❌ Error syncing with AppSheet: {e}")
+        return None
 
 if __name__ == "__main__":
 # ✅ **Main Execution**
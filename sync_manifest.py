@@ -0,0 +1,83 @@
+# sync_manifest.py
+from json_store import JsonStore
+
+
+class SyncManifest(JsonStore):
+    """
+    Local record of what a previous run already put in Drive, so a re-run only syncs changes.
+
+    Entries are keyed by sync target rather than sheet ID alone (see ssextractor.manifest_key): the
+    same sheet synced into other Drive folders, or by another service account, starts from scratch.
+
+    Layout: {"sheets": {target: {"version": int, "files": {kind: drive_file_id},
+    "attachments": {attachment_id: {"row_id", "name", "file_id", "sha256", "size"}}}}}
+    """
+
+    def _empty(self):
+        return {"sheets": {}}
+
+    def _loaded(self, data):
+        data.setdefault("sheets", {})
+
+    def _sheet(self, target):
+        sheet = self._load()["sheets"].setdefault(str(target), {})
+        sheet.setdefault("files", {})
+        sheet.setdefault("attachments", {})
+        return sheet
+
+    # ✅ Sheets
+    def sheet_version(self, target):
+        with self._lock:
+            return self._sheet(target).get("version")
+
+    def record_sheet_version(self, target, version):
+        with self._lock:
+            self._sheet(target)["version"] = version
+            self._changed()
+
+    def file_id(self, target, kind):
+        """Drive file ID stored for a sheet output ('sheet' or 'comments'), if any."""
+        with self._lock:
+            return self._sheet(target)["files"].get(kind)
+
+    def record_file(self, target, kind, file_id):
+        with self._lock:
+            self._sheet(target)["files"][kind] = file_id
+            self._changed()
+
+    # ✅ Attachments
+    def synced_attachment_ids(self, target):
+        """IDs of attachments that already have a Drive file."""
+        with self._lock:
+            return {
+                att_id for att_id, entry in self._sheet(target)["attachments"].items()
+                if entry.get("file_id")
+            }
+
+    def record_attachment(self, target, att_id, row_id, name, file_id=None, sha256=None, size=None):
+        """Records an attachment; file_id stays None until its upload has finished."""
+        with self._lock:
+            self._sheet(target)["attachments"][str(att_id)] = {
+                "row_id": str(row_id),
+                "name": name,
+                "file_id": file_id,
+                "sha256": sha256,
+                "size": size,
+            }
+            self._changed()
+
+    def attachment_entry(self, target, att_id):
+        """Copy of an attachment's entry, or None if it was never recorded."""
+        with self._lock:
+            entry = self._sheet(target)["attachments"].get(str(att_id))
+            return dict(entry) if entry else None
+
+    def complete_attachment(self, target, att_id, file_id):
+        """Sets the Drive file ID of a downloaded-but-not-uploaded attachment."""
+        with self._lock:
+            entry = self._sheet(target)["attachments"].get(str(att_id))
+            if entry is None:
+                return False
+            entry["file_id"] = file_id
+            self._changed()
+            return True
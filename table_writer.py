@@ -0,0 +1,129 @@
+# table_writer.py
+# Row-at-a-time writers for the prepared sheet table in each OUTPUT_FORMAT. Rows go straight to disk
+# (parquet in row groups), so memory stays flat however large the sheet is.
+import csv
+import datetime
+
+# Number formats pandas' to_excel gives dates and datetimes, so streamed files look the same
+DATETIME_FORMAT = "YYYY-MM-DD HH:MM:SS"
+DATE_FORMAT = "YYYY-MM-DD"
+
+MIMETYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class XlsxTableWriter:
+    """Writes rows to a write-only openpyxl workbook with a single 'Sheet1' tab, like DataFrame.to_excel."""
+
+    def __init__(self, path, header):
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+
+        self.write_only_cell = WriteOnlyCell
+        self.path = path
+        self.book = openpyxl.Workbook(write_only=True)
+        self.sheet = self.book.create_sheet("Sheet1")
+        self.sheet.append(list(header))
+
+    def _cell(self, value):
+        if isinstance(value, datetime.datetime):
+            value = self.write_only_cell(self.sheet, value)
+            value.number_format = DATETIME_FORMAT
+        elif isinstance(value, datetime.date):
+            value = self.write_only_cell(self.sheet, value)
+            value.number_format = DATE_FORMAT
+        return value
+
+    def append(self, values):
+        self.sheet.append([self._cell(value) for value in values])
+
+    def close(self):
+        self.book.save(self.path)
+
+
+class CsvTableWriter:
+    """Writes rows as UTF-8 CSV; blanks are empty fields and dates are written the way pandas' to_csv does."""
+
+    def __init__(self, path, header):
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(header)
+
+    @staticmethod
+    def _text(value):
+        if value is None:
+            return ""
+        if isinstance(value, datetime.datetime):
+            return value.isoformat(sep=" ")
+        return value
+
+    def append(self, values):
+        self.writer.writerow([self._text(value) for value in values])
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetTableWriter:
+    """
+    Writes rows to Parquet (needs pyarrow), one row group per `row_group_size` rows. 'Row ID' is an int64
+    column; every other column is stored as text, since a Smartsheet column can hold numbers and text alike.
+    """
+
+    def __init__(self, path, header, row_group_size=10_000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("OUTPUT_FORMAT 'parquet' needs pyarrow (pip install pyarrow)") from None
+        self.pa = pyarrow
+        self.header = [str(name) for name in header]
+        self.schema = pyarrow.schema([
+            (name, pyarrow.int64() if name == "Row ID" else pyarrow.string()) for name in self.header
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.row_group_size = row_group_size
+        self.rows = []
+
+    @staticmethod
+    def _text(value):
+        if value is None:
+            return None
+        if isinstance(value, datetime.datetime):
+            return value.isoformat(sep=" ")
+        return str(value)
+
+    def append(self, values):
+        self.rows.append(values)
+        if len(self.rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows:
+            return
+        arrays = []
+        for index, field in enumerate(self.schema):
+            column = [row[index] if index < len(row) else None for row in self.rows]
+            if field.name != "Row ID":
+                column = [self._text(value) for value in column]
+            arrays.append(self.pa.array(column, type=field.type))
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+WRITERS = {"xlsx": XlsxTableWriter, "csv": CsvTableWriter, "parquet": ParquetTableWriter}
+
+
+def open_table_writer(path, output_format, header):
+    """Returns a writer (append(values), close()) for output_format: 'xlsx', 'csv' or 'parquet'."""
+    writer_class = WRITERS.get(output_format)
+    if writer_class is None:
+        raise ValueError(f"Unknown OUTPUT_FORMAT '{output_format}' (expected one of {', '.join(WRITERS)})")
+    return writer_class(path, header)
@@ -0,0 +1,86 @@
+import datetime
+
+import pandas as pd
+import pytest
+import smartsheet
+
+import config
+import ssextractor
+import workspace
+from workspace import use_workspace
+
+
+class PagedSheets:
+    """Sheets.get_sheet() serving `rows` page by page, like the API does with page_size / page."""
+
+    def __init__(self, columns, rows):
+        self.Sheets = self
+        self.columns = columns
+        self.rows = rows
+        self.pages = []
+
+    def get_sheet(self, sheet_id, page_size, page):
+        self.pages.append(page)
+        start = (page - 1) * page_size
+        return smartsheet.models.Sheet({
+            "id": sheet_id,
+            "name": "Projects",
+            "totalRowCount": len(self.rows),
+            "columns": self.columns,
+            "rows": self.rows[start:start + page_size],
+        })
+
+
+def _row(row_id, row_number, *values):
+    cells = [{"columnId": column_id, "value": value} for column_id, value in enumerate(values, start=1) if value is not None]
+    return {"id": row_id, "rowNumber": row_number, "cells": cells}
+
+
+@pytest.fixture
+def extract(tmp_path, monkeypatch):
+    monkeypatch.setitem(config.SETTINGS, "OUTPUT_FORMAT", "xlsx")
+    monkeypatch.setitem(config.SETTINGS, "CELL_VALUE_SOURCE", "value")
+    monkeypatch.setitem(config.SETTINGS, "SHEET_PAGE_SIZE", 2)
+
+    def run(client):
+        monkeypatch.setattr(ssextractor, "get_smartsheet_client", lambda: client)
+        with use_workspace(str(tmp_path)):
+            path = ssextractor.extract_sheet_from_api(7)
+            registered = workspace.current_workspace().get_path(workspace.SHEET, 7)
+        ssextractor.release_sheet_snapshot(7)
+        assert path == registered
+        return pd.read_excel(path)
+
+    return run
+
+
+def test_sheet_table_from_paged_responses(extract):
+    columns = [
+        {"id": 1, "title": "Task", "type": "TEXT_NUMBER"},
+        {"id": 2, "title": "Due", "type": "DATE"},
+        {"id": 3, "title": "Task", "type": "TEXT_NUMBER"},
+    ]
+    rows = [_row(101, 1, "a", "2024-03-01", 1.0), _row(102, 2, "b", None, 2.5), _row(103, 3, None, None, "c")]
+    client = PagedSheets(columns, rows)
+
+    df = extract(client)
+
+    assert client.pages == [1, 2]
+    assert list(df.columns) == ["Row ID", "Task", "Due", "Task.1", "Filename"]
+    assert list(df["Row ID"]) == [101, 102, 103]
+    assert df.loc[0, "Due"] == datetime.datetime(2024, 3, 1)
+    assert list(df["Task.1"]) == [1, 2.5, "c"]
+    assert set(df["Filename"]) == {"Projects.xlsx"}
+
+
+def test_existing_row_id_and_filename_columns_are_not_repeated(extract):
+    columns = [
+        {"id": 1, "title": "Row ID", "type": "TEXT_NUMBER"},
+        {"id": 2, "title": "Filename", "type": "TEXT_NUMBER"},
+        {"id": 3, "title": "Name", "type": "TEXT_NUMBER"},
+    ]
+    df = extract(PagedSheets(columns, [_row(101, 1, "R-1", "old.xlsx", "a")]))
+
+    assert list(df.columns) == ["Row ID", "Filename", "Name"]
+    assert df.loc[0, "Row ID"] == "R-1"
+    assert df.loc[0, "Filename"] == "Projects.xlsx"
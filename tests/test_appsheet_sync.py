@@ -0,0 +1,103 @@
+import re
+
+import requests
+
+import config
+from appsheet_sync import AppSheetSync
+from row_fingerprints import RowFingerprintStore
+
+
+class Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+class FakeSheets:
+    """A tab as the Sheets API sees it: a grid of `row_count` rows, of which `data` holds the filled ones."""
+
+    def __init__(self, data, row_count):
+        self.data = data
+        self.row_count = row_count
+        self.reads = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, fields=None, range=None):
+        if range is None:
+            grid = {"rowCount": self.row_count, "columnCount": len(self.data[0])}
+            return Request({"sheets": [{"properties": {"title": "Tab", "gridProperties": grid}}]})
+        first, last = (int(n) for n in re.match(r"'.*'!A(\d+):[A-Z]+(\d+)", range).groups())
+        self.reads.append((first, last))
+        rows = self.data[first - 1:last]
+        # Like the API: trailing empty rows are left out, so an all-blank range has no "values"
+        while rows and not any(rows[-1]):
+            rows.pop()
+        return Request({"values": rows} if rows else {})
+
+
+class FakeAppSheet:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, headers, json):
+        self.posts.append((json["Action"], [row["Row ID"] for row in json["Rows"]]))
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+
+class DirectScheduler:
+    def call(self, service, fn):
+        return fn()
+
+
+def _sync(sheets, appsheet, fingerprints):
+    sync = AppSheetSync(lambda: sheets, DirectScheduler(), lambda: appsheet, "http://appsheet", block_rows=2, batch_size=10)
+    return sync.sync("spreadsheet", "Tab", "app", "table", "key", fingerprints=fingerprints)
+
+
+def test_rows_after_a_blank_block_are_read_and_not_deleted(tmp_path):
+    header = ["Row ID", "Name"]
+    data = [header, ["1", "a"], ["2", "b"], [], [], ["3", "c"]]
+    sheets = FakeSheets(data, row_count=8)
+    appsheet = FakeAppSheet()
+    fingerprints = RowFingerprintStore(str(tmp_path / "fingerprints.json"))
+
+    summary = _sync(sheets, appsheet, fingerprints)
+    assert summary["rows"] == 3
+    assert sheets.reads[-1] == (8, 8)
+
+    # Nothing changed: row 3, behind the blank block, must not be taken for a deleted row
+    appsheet.posts.clear()
+    summary = _sync(sheets, appsheet, fingerprints)
+    assert summary["deleted"] == 0
+    assert summary["unchanged"] == 3
+    assert appsheet.posts == []
+
+
+def test_rows_gone_from_the_tab_are_deleted(tmp_path):
+    data = [["Row ID", "Name"], ["1", "a"], ["2", "b"], [], [], ["3", "c"]]
+    sheets = FakeSheets(data, row_count=6)
+    appsheet = FakeAppSheet()
+    fingerprints = RowFingerprintStore(str(tmp_path / "fingerprints.json"))
+    _sync(sheets, appsheet, fingerprints)
+
+    data[1] = []
+    appsheet.posts.clear()
+    summary = _sync(sheets, appsheet, fingerprints)
+    assert summary["deleted"] == 1
+    assert appsheet.posts == [("Delete", ["1"])]
+
+
+def test_fingerprints_live_under_workspace_root(tmp_path, monkeypatch):
+    monkeypatch.setitem(config.SETTINGS, "WORKSPACE_ROOT", str(tmp_path))
+    fingerprints = RowFingerprintStore("fingerprints.json")
+    fingerprints.replace("app/table", {"1": "abc"})
+    assert RowFingerprintStore(str(tmp_path / "fingerprints.json")).fingerprints("app/table") == {"1": "abc"}
@@ -0,0 +1,46 @@
+import smartsheet
+
+import ssextractor
+
+
+class Page:
+    def __init__(self, data):
+        self.data = data
+        self.total_pages = 1
+
+
+class FakeClient:
+    def __init__(self, attachments, discussions):
+        self.Attachments = self
+        self.Discussions = self
+        self.attachments = attachments
+        self.discussions = discussions
+
+    def list_all_attachments(self, sheet_id, page_size, page):
+        return Page([smartsheet.models.Attachment(a) for a in self.attachments])
+
+    def get_all_discussions(self, sheet_id, include, page_size, page):
+        return Page([smartsheet.models.Discussion(d) for d in self.discussions])
+
+
+def test_attachments_are_grouped_by_row_including_comment_attachments(monkeypatch):
+    client = FakeClient(
+        attachments=[
+            {"id": 1, "name": "row.pdf", "parentType": "ROW", "parentId": 100},
+            {"id": 2, "name": "comment.pdf", "parentType": "COMMENT", "parentId": 11},
+            {"id": 3, "name": "sheet.pdf", "parentType": "SHEET", "parentId": 7},
+        ],
+        discussions=[
+            {"id": 10, "parentType": "ROW", "parentId": 200, "comments": [{"id": 11}]},
+            # The SDK's enum raises KeyError when compared with a name it doesn't define
+            {"id": 20, "parentType": "SHEET", "parentId": 7, "comments": [{"id": 21}]},
+        ],
+    )
+    monkeypatch.setattr(ssextractor, "get_smartsheet_client", lambda: client)
+
+    by_row = ssextractor.list_sheet_attachments(7)
+
+    assert {row_id: [att.name for att in atts] for row_id, atts in by_row.items()} == {
+        100: ["row.pdf"],
+        200: ["comment.pdf"],
+    }
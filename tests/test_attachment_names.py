@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import ssextractor
+import workspace
+from sync_manifest import SyncManifest
+from workspace import current_workspace, use_workspace
+
+
+def _attachment(att_id, name):
+    return SimpleNamespace(id=att_id, name=name)
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+
+def test_same_named_attachments_get_distinct_names():
+    names = ssextractor.attachment_file_names([
+        _attachment(1, "report.pdf"), _attachment(2, "report.pdf"), _attachment(3, "report .pdf"), _attachment(4, "a.pdf"),
+    ])
+    assert names == {1: "report.pdf", 2: "report_2.pdf", 3: "report_.pdf", 4: "a.pdf"}
+
+
+def test_same_named_attachments_are_downloaded_and_recorded_separately(tmp_path, monkeypatch):
+    manifest = SyncManifest(str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(ssextractor, "sync_manifest", manifest)
+    monkeypatch.setattr(ssextractor, "manifest_key", lambda sheet_id: str(sheet_id))
+    bodies = {1: b"first", 2: b"second"}
+    monkeypatch.setattr(ssextractor, "_open_attachment_download", lambda sheet_id, att_id: FakeResponse(bodies[att_id]))
+    attachments = [_attachment(1, "report.pdf"), _attachment(2, "report.pdf")]
+
+    with use_workspace(str(tmp_path / "ws")):
+        row_folder = current_workspace().folder(workspace.ATTACHMENT, 7, 100)
+        names = ssextractor.attachment_file_names(attachments)
+        paths = [ssextractor._download_attachment(7, att, names[att.id], row_folder) for att in attachments]
+        artifacts = current_workspace().all(workspace.ATTACHMENT, 7)
+
+    assert [open(path, "rb").read() for path in paths] == [b"first", b"second"]
+    assert sorted(a.attachment_id for a in artifacts) == ["1", "2"]
+
+    # Each upload completes its own entry, so neither attachment is downloaded again next run
+    for artifact in artifacts:
+        assert manifest.attachment_entry("7", artifact.attachment_id)["name"] == names[int(artifact.attachment_id)]
+        manifest.complete_attachment("7", artifact.attachment_id, f"drive-{artifact.attachment_id}")
+    assert manifest.synced_attachment_ids("7") == {"1", "2"}
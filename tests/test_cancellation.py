@@ -0,0 +1,36 @@
+import pytest
+
+import main
+import ssextractor
+from cancellation import Cancelled, current_token
+from workspace import use_workspace
+
+
+def test_each_direct_run_gets_a_fresh_token(tmp_path, monkeypatch):
+    cancelled_at_start = []
+
+    def run():
+        cancelled_at_start.append(current_token().cancelled)
+        current_token().cancel()
+        return "Migration Cancelled by User"
+
+    monkeypatch.setattr(main, "_run_migration", run)
+    main.run_migration(str(tmp_path))
+    main.run_migration(str(tmp_path))
+    assert cancelled_at_start == [False, False]
+
+
+class CancelledSheets:
+    """A client whose export download is interrupted by a cancel (e.g. while waiting on the rate limiter)."""
+
+    def __init__(self):
+        self.Sheets = self
+
+    def get_sheet_as_excel(self, sheet_id, folder):
+        raise Cancelled()
+
+
+def test_stages_do_not_swallow_a_cancel(tmp_path, monkeypatch):
+    monkeypatch.setattr(ssextractor, "get_smartsheet_client", CancelledSheets)
+    with use_workspace(str(tmp_path)), pytest.raises(Cancelled):
+        ssextractor.download_smartsheet_as_excel(1)
@@ -0,0 +1,90 @@
+import json
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+import ssextractor
+from dedup_index import ContentIndex, use_verified_targets
+
+
+def test_entries_are_scoped_per_account(tmp_path):
+    index = ContentIndex(str(tmp_path / "index.json"))
+    index.add("a@x", "abc", "file-a", 4096)
+    assert index.get("a@x", "abc") == {"file_id": "file-a", "size": 4096}
+    assert index.get("b@x", "abc") is None
+    assert index.may_contain_size("a@x", 4)
+    assert not index.may_contain_size("b@x", 4)
+
+
+def test_forget_leaves_other_accounts_alone(tmp_path):
+    index = ContentIndex(str(tmp_path / "index.json"))
+    index.add("a@x", "abc", "file-a", 4096)
+    index.add("b@x", "abc", "file-b", 4096)
+    index.forget("a@x", "abc")
+    assert index.get("a@x", "abc") is None
+    assert not index.may_contain_size("a@x", 4)
+    assert index.get("b@x", "abc")["file_id"] == "file-b"
+
+
+def test_size_lookup_tolerates_kb_rounding(tmp_path):
+    index = ContentIndex(str(tmp_path / "index.json"))
+    index.add("a@x", "abc", "file-a", 10 * 1024 + 700)
+    assert index.may_contain_size("a@x", 11)
+    assert not index.may_contain_size("a@x", 13)
+    assert not index.may_contain_size("a@x", None)
+
+
+def test_writes_are_batched_and_reloaded_with_size_index(tmp_path):
+    path = tmp_path / "index.json"
+    index = ContentIndex(str(path), flush_every=2)
+    index.add("a@x", "d1", "f1", 1024)
+    assert not path.exists()
+    index.add("a@x", "d2", "f2", 2048)
+    assert set(json.loads(path.read_text())["scopes"]["a@x"]) == {"d1", "d2"}
+    reloaded = ContentIndex(str(path))
+    assert reloaded.may_contain_size("a@x", 2)
+
+
+class FakeDrive:
+    """files().get() that answers from a set of live file IDs, or 404."""
+
+    def __init__(self, live):
+        self.live = live
+        self.gets = 0
+
+    def files(self):
+        return self
+
+    def get(self, fileId, fields):
+        self.gets += 1
+        return self._Request(fileId in self.live, fileId)
+
+    class _Request:
+        def __init__(self, exists, file_id):
+            self.exists = exists
+            self.file_id = file_id
+
+        def execute(self):
+            if not self.exists:
+                raise HttpError(httplib2.Response({"status": 404}), b"not found")
+            return {"id": self.file_id, "trashed": False}
+
+
+def test_dedup_targets_are_checked_again_in_each_run(tmp_path, monkeypatch):
+    drive = FakeDrive({"file-a"})
+    index = ContentIndex(str(tmp_path / "index.json"))
+    index.add("a@x", "abc", "file-a", 4096)
+    monkeypatch.setattr(ssextractor, "content_index", index)
+    monkeypatch.setattr(ssextractor, "google_account", lambda: "a@x")
+    monkeypatch.setattr(ssextractor, "get_drive_service", lambda: drive)
+
+    with use_verified_targets(set()):
+        assert ssextractor._live_dedup_target("abc") == "file-a"
+        assert ssextractor._live_dedup_target("abc") == "file-a"
+    assert drive.gets == 1
+
+    # Deleted from Drive between runs (or jobs): the next run must not shortcut to it
+    drive.live.clear()
+    with use_verified_targets(set()):
+        assert ssextractor._live_dedup_target("abc") is None
+    assert index.get("a@x", "abc") is None
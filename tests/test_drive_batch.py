@@ -0,0 +1,65 @@
+import threading
+import time
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from cancellation import CancellationToken, Cancelled
+from drive_batch import DriveBatch
+from rate_limiter import RequestScheduler
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({"status": status}), b"{}")
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batches += 1
+        for request_id, key in self.requests:
+            outcome = self.service.outcomes[key].pop(0)
+            if isinstance(outcome, Exception):
+                self.callback(request_id, None, outcome)
+            else:
+                self.callback(request_id, outcome, None)
+
+
+class FakeService:
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.batches = 0
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+def test_retries_only_retryable_items():
+    service = FakeService({"a": [http_error(503), {"id": "a"}], "b": [http_error(404)], "c": [{"id": "c"}]})
+    sleeps = []
+    batch = DriveBatch(lambda: service, sleep=sleeps.append)
+    results, errors = batch.execute({key: (lambda key=key: key) for key in "abc"})
+    assert results == {"a": {"id": "a"}, "c": {"id": "c"}}
+    assert list(errors) == ["b"]
+    assert service.batches == 2 and len(sleeps) == 1
+
+
+def test_retry_wait_is_interrupted_by_cancel():
+    token = CancellationToken()
+    scheduler = RequestScheduler(base_backoff=30, max_backoff=30, sleep=token.wait)
+    scheduler.add_service("drive", 1000)
+    service = FakeService({"a": [http_error(503), {"id": "a"}]})
+    batch = DriveBatch(lambda: service, scheduler=scheduler)
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(Cancelled):
+        batch.execute({"a": lambda: "a"})
+    assert time.monotonic() - started < 5
@@ -0,0 +1,74 @@
+import itertools
+import threading
+
+from drive_folders import DriveFolderCache, current_folder_cache, use_folder_cache
+
+
+class FakeDrive:
+    """Just enough of the Drive files() API for folder listing and creation."""
+
+    def __init__(self):
+        self.folders = {}  # folder ID → (parent ID, name)
+        self.ids = itertools.count(1)
+        self.lists = 0
+        self.creates = 0
+        self.lock = threading.Lock()
+
+    def files(self):
+        return self
+
+    def list(self, q, fields, pageSize, pageToken):
+        parent_id = q.split("'")[1]
+        self.lists += 1
+        files = [{"id": i, "name": name} for i, (parent, name) in self.folders.items() if parent == parent_id]
+        return Request({"files": files})
+
+    def create(self, body, fields):
+        with self.lock:
+            self.creates += 1
+            folder_id = f"f{next(self.ids)}"
+            self.folders[folder_id] = (body["parents"][0], body["name"])
+        return Request({"id": folder_id})
+
+
+class Request:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+def test_lookups_are_answered_from_one_listing():
+    drive = FakeDrive()
+    drive.folders["existing"] = ("root", "Sheet A")
+    cache = DriveFolderCache(lambda: drive)
+    assert cache.get_or_create("Sheet A", "root") == "existing"
+    new_id = cache.get_or_create("Sheet B", "root")
+    assert cache.get_or_create("Sheet B", "root") == new_id
+    assert (drive.lists, drive.creates) == (1, 1)
+
+
+def test_parallel_workers_create_a_folder_once():
+    drive = FakeDrive()
+    cache = DriveFolderCache(lambda: drive)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("Row 1", "root"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1
+    assert drive.creates == 1
+
+
+def test_each_run_starts_with_its_own_cache():
+    drive = FakeDrive()
+    with use_folder_cache(DriveFolderCache(lambda: drive)):
+        first = current_folder_cache().get_or_create("Sheet A", "root")
+    # The folder was deleted in Drive between runs
+    del drive.folders[first]
+    with use_folder_cache(DriveFolderCache(lambda: drive)):
+        second = current_folder_cache().get_or_create("Sheet A", "root")
+    assert second != first
+    assert current_folder_cache() is None
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from getSsSheetID import get_sheets_in_folder
+
+
+class ChildrenFolders:
+    """SDKs without get_folder: the folder's sheets come from the paged children listing."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def get_folder_children(self, folder_id, children_resource_types, last_key=None):
+        self.calls.append(last_key)
+        data, next_key = self.pages[last_key]
+        return SimpleNamespace(data=data, last_key=next_key)
+
+
+def _sheet(sheet_id):
+    return SimpleNamespace(id=sheet_id, name=f"Sheet {sheet_id}")
+
+
+def test_sheets_come_from_every_children_page():
+    folders = ChildrenFolders({None: ([_sheet(1), _sheet(2)], "k1"), "k1": ([_sheet(3)], None)})
+    sheets, sheet_info, sheet_ids = get_sheets_in_folder(SimpleNamespace(Folders=folders), 42)
+    assert sheet_ids == [1, 2, 3]
+    assert sheet_info[2] == {"Sheet ID": 3, "Sheet Name": "Sheet 3"}
+    assert folders.calls == [None, "k1"]
+
+
+def test_older_sdks_fall_back_to_get_folder():
+    folders = SimpleNamespace(get_folder=lambda folder_id: SimpleNamespace(sheets=[_sheet(5)]))
+    sheets, sheet_info, sheet_ids = get_sheets_in_folder(SimpleNamespace(Folders=folders), 42)
+    assert sheet_ids == [5]
@@ -0,0 +1,98 @@
+import contextlib
+import os
+import shutil
+from types import SimpleNamespace
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import metrics
+import ssextractor
+import workspace
+from workspace import use_workspace
+
+ROW_IDS = {1: 101, 2: 102, 3: 103}
+
+
+def _write_export(path, comments=True):
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = "Projects"
+    for row in [["Task", "Owner"], ["a", "x"], ["b", "y"], ["c", "z"]]:
+        sheet.append(row)
+    if comments:
+        tab = book.create_sheet("Comments")
+        for row in [
+            ["Row 1", "First", "alice", "2024-01-02"],
+            [None, "Reply", "bob", "2024-01-03"],
+            ["Row 3", "Third", "carol", "2024-01-04"],
+        ]:
+            tab.append(row)
+    book.save(path)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def snapshot(monkeypatch):
+    monkeypatch.setattr(ssextractor, "get_sheet_snapshot", lambda sheet_id: SimpleNamespace(row_ids=ROW_IDS))
+
+
+@contextlib.contextmanager
+def _with_export(root, comments=True):
+    """A workspace at root with the sheet's export registered, as download_smartsheet_as_excel leaves it."""
+    with use_workspace(str(root)) as ws:
+        path = _write_export(ws.path(workspace.EXPORT, 5, "Projects.xlsx"), comments)
+        ws.register(workspace.EXPORT, 5, path)
+        yield ws
+
+
+def test_matches_the_stage_by_stage_pipeline(tmp_path):
+    with _with_export(tmp_path / "stages") as ws:
+        ssextractor.extract_and_store_comments(5)
+        ssextractor.create_relative_row_mapping(5)
+        expected_mapping = pd.read_excel(ws.get_path(workspace.ROW_MAPPING, 5))
+        expected_comments = pd.read_excel(ssextractor.merge_comments_with_row_mapping(5))
+        expected_sheet = pd.read_excel(ssextractor.prepare_sheet_for_drive_upload(5)[0])
+
+    with _with_export(tmp_path / "memory") as ws, metrics.use_run() as run:
+        export = ws.get_path(workspace.EXPORT, 5)
+        sheet_path, comments_path = ssextractor.process_sheet_in_memory(5, write_intermediate=True)
+        assert ws.get_path(workspace.SHEET, 5) == sheet_path
+        assert ws.get_path(workspace.COMMENTS, 5) == comments_path
+        assert ws.get(workspace.EXPORT, 5) is None
+        mapping = pd.read_excel(ws.get_path(workspace.ROW_MAPPING, 5))
+
+    assert not os.path.exists(export)
+    assert run.stage_durations["parsing workbook"].count == 1
+    pd.testing.assert_frame_equal(pd.read_excel(sheet_path), expected_sheet)
+    pd.testing.assert_frame_equal(pd.read_excel(comments_path), expected_comments)
+    pd.testing.assert_frame_equal(mapping, expected_mapping)
+    assert list(expected_comments["Row ID"]) == [101, 101, 103]
+
+
+def test_mapping_file_is_only_written_when_asked(tmp_path):
+    with _with_export(tmp_path) as ws:
+        assert ssextractor.process_sheet_in_memory(5, write_intermediate=False)
+        assert ws.get(workspace.ROW_MAPPING, 5) is None
+    assert not os.path.exists(tmp_path / "row_mapping" / "5")
+
+
+def test_sheet_without_comments(tmp_path):
+    with _with_export(tmp_path, comments=False) as ws:
+        sheet_path, comments_path = ssextractor.process_sheet_in_memory(5)
+        assert ws.get(workspace.COMMENTS, 5) is None
+    assert comments_path is None
+    assert list(pd.read_excel(sheet_path)["Row ID"]) == [101, 102, 103]
+
+
+def test_unreadable_export_fails_the_stage(tmp_path):
+    with _with_export(tmp_path) as ws:
+        shutil.copyfile(__file__, ws.get_path(workspace.EXPORT, 5))
+        assert ssextractor.process_sheet_in_memory(5) is None
+        assert ws.get(workspace.SHEET, 5) is None
+
+
+def test_missing_export_fails_the_stage(tmp_path):
+    with use_workspace(str(tmp_path)):
+        assert ssextractor.process_sheet_in_memory(5) is None
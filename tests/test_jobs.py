@@ -0,0 +1,104 @@
+import os
+import threading
+
+import config
+import jobs
+import main
+from workspace import current_workspace
+
+
+def _wait_finished(job, timeout=10):
+    for _ in range(int(timeout / 0.05)):
+        if job.finished_at is not None:
+            return
+        threading.Event().wait(0.05)
+    raise AssertionError(f"job {job.id} did not finish")
+
+
+def test_finish_migration_runs_without_the_manager_lock(tmp_path, monkeypatch):
+    manager = jobs.JobManager(2, 2, str(tmp_path))
+    lock_free = []
+
+    def probe():
+        acquired = manager._cond.acquire(timeout=2)
+        if acquired:
+            manager._cond.release()
+        lock_free.append(acquired)
+
+    def finish_migration():
+        # Another thread (e.g. a status request or the dispatcher) must be able to take the lock meanwhile
+        probe_thread = threading.Thread(target=probe)
+        probe_thread.start()
+        probe_thread.join()
+        return "finished"
+
+    monkeypatch.setattr(main, "plan_migration", lambda: [])
+    monkeypatch.setattr(main, "finish_migration", finish_migration)
+    job = manager.submit(dict(config.CREDENTIALS))
+    _wait_finished(job)
+    assert lock_free == [True]
+    assert job.state == jobs.DONE
+    assert job.result == "finished"
+
+
+def test_job_is_closed_once(tmp_path, monkeypatch):
+    manager = jobs.JobManager(4, 1, str(tmp_path))
+    calls = []
+    monkeypatch.setattr(main, "plan_migration", lambda: ["s1", "s2", "s3"])
+    monkeypatch.setattr(main, "process_sheet", lambda sheet_id: "done")
+    monkeypatch.setattr(main, "finish_migration", lambda: calls.append(1) or "finished")
+    job = manager.submit(dict(config.CREDENTIALS))
+    _wait_finished(job)
+    manager.cancel(job.id)
+    assert calls == [1]
+    assert job.state == jobs.DONE
+
+
+def test_form_submission_keeps_configured_appsheet_credentials(monkeypatch):
+    import app
+
+    submitted = []
+    monkeypatch.setitem(config.CREDENTIALS, "APPSHEET_APP_ID", "app-1")
+    monkeypatch.setattr(app.job_manager, "submit", lambda credentials: submitted.append(credentials) or jobs.Job(credentials, "/tmp"))
+    monkeypatch.setattr(app, "render_template", lambda *args, **kwargs: "")
+    client = app.app.test_client()
+    client.post("/", data={"smartsheet_api_key": "key", "smartsheet_folder_id": "42"})
+    credentials = submitted[0]
+    assert set(config.CREDENTIALS) <= set(credentials)
+    assert credentials["APPSHEET_APP_ID"] == "app-1"
+    assert credentials["SMARTSHEET_API_KEY"] == "key"
+
+
+def _finish_with_files():
+    # Stands in for a run: a working file, plus the run report finish_migration writes into the root
+    with open(current_workspace().path("sheet", 1, "export.xlsx"), "w") as f:
+        f.write("data")
+    with open(os.path.join(current_workspace().root, "run_report.json"), "w") as f:
+        f.write("{}")
+    return "finished"
+
+
+def test_finished_job_releases_credentials_and_working_files(tmp_path, monkeypatch):
+    manager = jobs.JobManager(2, 2, str(tmp_path))
+    monkeypatch.setattr(main, "plan_migration", lambda: [])
+    monkeypatch.setattr(main, "finish_migration", _finish_with_files)
+    job = manager.submit(dict(config.CREDENTIALS, SMARTSHEET_API_KEY="secret"))
+    _wait_finished(job)
+
+    assert job.run(config.current_credentials) == {}
+    assert os.listdir(job.workspace.root) == ["run_report.json"]
+    assert manager.get(job.id) is job
+
+
+def test_jobs_are_dropped_after_the_retention_period(tmp_path, monkeypatch):
+    manager = jobs.JobManager(2, 2, str(tmp_path), retention_seconds=0)
+    monkeypatch.setattr(main, "plan_migration", lambda: [])
+    monkeypatch.setattr(main, "finish_migration", _finish_with_files)
+    job = manager.submit(dict(config.CREDENTIALS))
+    _wait_finished(job)
+
+    # The next submission sweeps out jobs past their retention period
+    later = manager.submit(dict(config.CREDENTIALS))
+    assert manager.get(job.id) is None
+    _wait_finished(later)
+    assert not os.path.exists(job.workspace.root)
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram(buckets=(1.0, 5.0))
+    for value in (0.5, 1.0, 3.0, 10.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(1.0, 2), (5.0, 3), ("+Inf", 4)]
+    assert histogram.summary() == {"count": 4, "total_seconds": 14.5, "mean_seconds": 3.625, "max_seconds": 10.0}
+
+
+def test_empty_histogram_summary():
+    assert metrics.Histogram().summary() == {"count": 0, "total_seconds": 0.0, "mean_seconds": 0.0, "max_seconds": 0.0}
+
+
+def test_run_report_has_per_sheet_totals():
+    recorder = metrics.Recorder(per_sheet=True)
+    recorder.stage("exporting sheet", "1", 2.0, ok=True)
+    recorder.stage("exporting sheet", "2", 1.0, ok=False)
+    recorder.api_call("smartsheet", "1", 0.5, "ok")
+    recorder.api_call("smartsheet", "1", 0.25, "429")
+    recorder.retry("smartsheet", "1", "rate_limited")
+    recorder.add_bytes("downloaded", "1", 100)
+
+    report = recorder.report()
+    assert report["stages"]["exporting sheet"]["count"] == 2
+    assert report["stages"]["exporting sheet"]["errors"] == 1
+    assert report["api"]["smartsheet"]["outcomes"] == {"ok": 1, "429": 1}
+    assert report["api"]["smartsheet"]["retries"] == 1
+    assert report["bytes"] == {"downloaded": 100}
+    assert report["sheets"]["1"] == {
+        "stages": {"exporting sheet": 2.0}, "api_calls": 2, "api_errors": 1, "retries": 1,
+        "bytes_uploaded": 0, "bytes_downloaded": 100, "stage_errors": 0,
+    }
+    assert report["sheets"]["2"]["stage_errors"] == 1
+
+
+def test_process_wide_recorder_keeps_no_sheets():
+    recorder = metrics.Recorder()
+    recorder.stage("exporting sheet", "1", 1.0, ok=True)
+    assert recorder.report()["sheets"] == {}
+
+
+def test_render_prometheus():
+    recorder = metrics.Recorder()
+    recorder.stage('merging "comments"', None, 0.2, ok=False)
+    recorder.api_call("drive", None, 0.07, "ok")
+    recorder.add_bytes("uploaded", None, 42)
+
+    lines = recorder.render_prometheus().splitlines()
+    assert "# TYPE ssextractor_stage_duration_seconds histogram" in lines
+    assert 'ssextractor_stage_duration_seconds_bucket{stage="merging \\"comments\\"",le="0.1"} 0' in lines
+    assert 'ssextractor_stage_duration_seconds_bucket{stage="merging \\"comments\\"",le="0.25"} 1' in lines
+    assert 'ssextractor_stage_duration_seconds_count{stage="merging \\"comments\\""} 1' in lines
+    assert 'ssextractor_stage_errors_total{stage="merging \\"comments\\""} 1' in lines
+    assert 'ssextractor_api_calls_total{service="drive",outcome="ok"} 1' in lines
+    assert 'ssextractor_bytes_total{direction="uploaded"} 42' in lines
+
+
+def test_timer_counts_an_exception_as_a_stage_error():
+    with metrics.use_run() as run:
+        with metrics.timer("parsing workbook"):
+            pass
+        with pytest.raises(ValueError):
+            with metrics.timer("parsing workbook"):
+                raise ValueError("bad workbook")
+    assert run.stage_durations["parsing workbook"].count == 2
+    assert run.stage_errors == {"parsing workbook": 1}
+
+
+def test_records_go_to_the_run_and_the_registry():
+    before = metrics.registry.bytes.get("uploaded", 0)
+    with metrics.use_run() as run, metrics.sheet_scope(7):
+        metrics.add_bytes("uploaded", 10)
+        metrics.add_bytes("uploaded", 0)
+        metrics.record_retry("drive", None)
+    assert metrics.registry.bytes["uploaded"] == before + 10
+    assert run.sheets["7"]["bytes_uploaded"] == 10
+    assert run.retries == {("drive", "error"): 1}
+
+
+def test_nothing_is_recorded_into_a_finished_run():
+    with metrics.use_run() as run:
+        pass
+    metrics.record_stage("exporting sheet", 1.0)
+    assert run.stage_durations == {}
+
+
+def test_write_run_report(tmp_path):
+    path = tmp_path / "reports" / "run_report.json"
+    assert metrics.write_run_report(str(path)) is None
+
+    with metrics.use_run():
+        metrics.record_stage("exporting sheet", 1.5)
+        report = metrics.write_run_report(str(path))
+    assert report["stages"]["exporting sheet"]["total_seconds"] == 1.5
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["stages"] == report["stages"]
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from ssextractor import _PartialFile
+
+
+def test_moves_into_place_on_success(tmp_path):
+    path = tmp_path / "report.pdf"
+    with _PartialFile(str(path)) as f:
+        f.write(b"data")
+    assert path.read_bytes() == b"data"
+    assert os.listdir(tmp_path) == ["report.pdf"]
+
+
+def test_removes_temp_file_on_error(tmp_path):
+    path = tmp_path / "report.pdf"
+    with pytest.raises(RuntimeError):
+        with _PartialFile(str(path)) as f:
+            f.write(b"half")
+            raise RuntimeError("cancelled")
+    assert os.listdir(tmp_path) == []
+
+
+def test_same_named_downloads_use_separate_temp_files(tmp_path):
+    path = str(tmp_path / "report.pdf")
+    first, second = _PartialFile(path), _PartialFile(path)
+    with first as a, second as b:
+        assert first.partial_path != second.partial_path
+        a.write(b"first")
+        b.write(b"second")
+    # Neither download was corrupted by the other; the one finishing last holds the final name
+    assert open(path, "rb").read() == b"first"
+    assert os.listdir(tmp_path) == ["report.pdf"]
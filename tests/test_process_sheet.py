@@ -0,0 +1,46 @@
+import main
+import process_state
+from cancellation import CancellationToken, use_token
+from workspace import use_workspace
+
+
+def extract_sheet(sheet_id):
+    return None  # stages report their own errors and return None
+
+
+def upload_sheet(sheet_id):
+    return "file-id"
+
+
+def _run(tmp_path, monkeypatch, stages, token=None):
+    status = process_state.new_status()
+    monkeypatch.setattr(process_state, "migration_status", status)
+    monkeypatch.setattr(main, "_sheet_stages", lambda: [(stage.__name__, stage) for stage in stages])
+    process_state.start_sheets([1])
+    with use_workspace(str(tmp_path)), use_token(token or CancellationToken()):
+        return main.process_sheet(1), status
+
+
+def test_a_stage_returning_none_fails_the_sheet(tmp_path, monkeypatch):
+    outcome, status = _run(tmp_path, monkeypatch, [extract_sheet, upload_sheet])
+    assert outcome == 'failed'
+    assert status['sheets_failed'] == 1
+    assert status['sheets']['1'] == 'failed'
+
+
+def test_sheet_with_every_stage_done(tmp_path, monkeypatch):
+    outcome, status = _run(tmp_path, monkeypatch, [upload_sheet])
+    assert outcome == 'done'
+    assert status['sheets_done'] == 1
+
+
+def test_stage_stopped_by_a_cancel_is_not_a_failure(tmp_path, monkeypatch):
+    token = CancellationToken()
+
+    def cancelled_stage(sheet_id):
+        token.cancel()
+        return None
+
+    outcome, status = _run(tmp_path, monkeypatch, [cancelled_stage], token)
+    assert outcome == 'cancelled'
+    assert status['sheets_failed'] == 0
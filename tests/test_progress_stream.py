@@ -0,0 +1,109 @@
+import contextvars
+import json
+import time
+
+import config
+import jobs
+import process_state
+
+
+def _reporting_to(status):
+    """A context whose process_state updates go to `status`, as a job's workers would."""
+    context = contextvars.Context()
+    context.run(process_state.bind_status, status)
+    return context
+
+
+def test_updates_between_events_are_coalesced():
+    status = process_state.new_status()
+    context = _reporting_to(status)
+    context.run(process_state.start_sheets, ["1", "2"])
+    stream = process_state.stream_progress(status, lambda: False, interval=0, heartbeat=60)
+
+    event, data = next(stream)
+    assert event == "progress"
+    assert data["stages"] == {"queued": 2}
+
+    for stage in ("downloading export", "transforming", "uploading sheet"):
+        context.run(process_state.set_sheet_status, "1", stage)
+    context.run(process_state.finish_sheet, "2", "done")
+
+    # One event carries the latest state, not one event per update
+    event, data = next(stream)
+    assert event == "progress"
+    assert data["stages"] == {"uploading sheet": 1, "done": 1}
+    assert data["sheets_done"] == 1
+    assert data["progress"] == "Processed 1/2 sheets (1 in progress)"
+
+
+def test_idle_stream_sends_keep_alives():
+    status = process_state.new_status()
+    stream = process_state.stream_progress(status, lambda: False, interval=0, heartbeat=0)
+    assert next(stream)[0] == "progress"
+    # Only throughput and timings could have moved, so nothing is worth an event
+    assert next(stream) == (None, None)
+
+
+def test_stream_ends_with_done():
+    status = process_state.new_status()
+    finished = []
+    stream = process_state.stream_progress(status, lambda: bool(finished), interval=0)
+    assert next(stream)[0] == "progress"
+    finished.append(True)
+    process_state.mark_changed()
+    assert next(stream)[0] == "done"
+    assert next(stream, None) is None
+
+
+def test_upload_bytes_and_in_flight_files():
+    status = process_state.new_status()
+    context = _reporting_to(status)
+    context.run(process_state.set_upload_progress, "big.pdf", 400, 1000)
+    context.run(process_state.set_upload_progress, "big.pdf", 1000, 1000)
+    context.run(process_state.set_upload_progress, "other.pdf", 50, None)
+    event = process_state.progress_event(status)
+    assert event["bytes_uploaded"] == 1050
+    assert event["uploads"] == {"other.pdf": {"sent": 50, "total": None}}
+
+
+def _events(response):
+    for chunk in response.response:
+        text = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if text.startswith(":"):
+            continue
+        event, data = text.split("\n")[:2]
+        yield event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def test_events_endpoint_streams_a_job_until_it_finishes(monkeypatch, tmp_path):
+    import app
+
+    job = jobs.Job(dict(config.CREDENTIALS), str(tmp_path))
+    job.state = jobs.RUNNING
+    monkeypatch.setattr(app.job_manager, "get", lambda job_id: job if job_id == job.id else None)
+    monkeypatch.setitem(config.SETTINGS, "PROGRESS_EVENT_INTERVAL_SECONDS", 0)
+    client = app.app.test_client()
+
+    response = client.get(f"/events/{job.id}", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    events = _events(response)
+
+    job.run(process_state.start_sheets, ["1"])
+    event, data = next(events)
+    assert event == "progress"
+    assert data["job_id"] == job.id
+    assert data["state"] == jobs.RUNNING
+
+    job.state, job.result, job.finished_at = jobs.DONE, "finished", time.time()
+    process_state.mark_changed()
+    event, data = next(e for e in events if e[0] == "done")
+    assert data["state"] == jobs.DONE
+    assert data["result"] == "finished"
+    response.close()
+
+
+def test_events_for_an_unknown_job():
+    import app
+
+    assert app.app.test_client().get("/events/nope").status_code == 404
@@ -0,0 +1,205 @@
+import pytest
+import requests
+
+import rate_limiter
+from cancellation import CancellationToken, Cancelled
+from rate_limiter import RequestScheduler, TokenBucket
+
+
+class FakeClock:
+    """Stands in for the time module: sleep() just moves monotonic() forward and records the delay."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        # A real sleep always moves the clock on; a float-rounding-sized wait must not leave it standing still
+        self.now += max(seconds, 1e-6)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    # No jitter: the backoff is exactly base_backoff * 2 ** attempt
+    monkeypatch.setattr(rate_limiter.random, "random", lambda: 0.5)
+    return clock
+
+
+def _http_error(status, retry_after=None):
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers["Retry-After"] = str(retry_after)
+    return requests.HTTPError(response=response)
+
+
+def _failing(*errors, result="ok"):
+    """A call that raises each of `errors` in turn, then returns `result`."""
+    errors = list(errors)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    call.calls = calls
+    return call
+
+
+def _scheduler(clock, rate=10, **kwargs):
+    scheduler = RequestScheduler(sleep=clock.sleep, **kwargs)
+    scheduler.add_service("api", rate)
+    return scheduler
+
+
+def test_bucket_waits_for_a_refill(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.acquire(sleep=clock.sleep) == 0
+    assert bucket.acquire(sleep=clock.sleep) == 0
+    assert bucket.acquire(sleep=clock.sleep) == 0.5
+    assert clock.sleeps == [0.5]
+
+
+def test_bucket_refills_up_to_its_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    bucket.acquire(2, sleep=clock.sleep)
+    clock.now += 60
+    assert bucket.acquire(2, sleep=clock.sleep) == 0
+    assert bucket.acquire(sleep=clock.sleep) == 0.5
+
+
+def test_call_larger_than_the_bucket_leaves_it_in_debt(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.acquire(6, sleep=clock.sleep) == 0
+    # 4 tokens short, plus the one asked for, at 2 per second
+    assert bucket.acquire(sleep=clock.sleep) == 2.5
+
+
+def test_throttling_halves_the_rate_and_pauses_the_service(clock):
+    scheduler = _scheduler(clock, rate=10, base_backoff=1.0)
+    call = _failing(_http_error(429))
+    assert scheduler.call("api", call) == "ok"
+    assert len(call.calls) == 2
+    assert clock.sleeps == [1.0]
+
+    stats = scheduler.stats()["api"]
+    assert stats["throttled"] == 1
+    assert stats["retries"] == 1
+    # Halved to 5/s, then one success creeps it back up by 2% of the limit
+    assert stats["current_rate_per_second"] == 5.2
+
+
+def test_throttling_pauses_other_callers(clock):
+    scheduler = _scheduler(clock, base_backoff=1.0)
+    delay = scheduler.backoff("api", 0, _http_error(429, retry_after=7))
+    assert delay == 7.0
+    assert scheduler.call("api", lambda: "ok") == "ok"
+    assert clock.sleeps == [7.0]
+
+
+def test_backoff_grows_and_the_rate_stops_at_its_floor(clock):
+    scheduler = _scheduler(clock, rate=10, base_backoff=1.0, max_backoff=5.0)
+    call = _failing(*[_http_error(429)] * 5)
+    scheduler.call("api", call)
+    assert clock.sleeps == [1.0, 2.0, 4.0, 5.0, 5.0]
+    # 10 → 5 → 2.5 → 1.25 → 1.0 (10% of the limit) → 1.0, then +0.2 for the success
+    assert scheduler.stats()["api"]["current_rate_per_second"] == 1.2
+
+
+def test_successes_restore_the_rate_to_the_limit(clock):
+    scheduler = _scheduler(clock, rate=10)
+    scheduler.call("api", _failing(_http_error(429)))
+    for _ in range(50):
+        scheduler.call("api", lambda: None)
+    assert scheduler.stats()["api"]["current_rate_per_second"] == 10.0
+
+
+def test_server_errors_retry_without_slowing_the_service(clock):
+    scheduler = _scheduler(clock, rate=10, base_backoff=1.0)
+    assert scheduler.call("api", _failing(_http_error(503), _http_error(502))) == "ok"
+    assert clock.sleeps == [1.0, 2.0]
+    stats = scheduler.stats()["api"]
+    assert stats["server_errors"] == 2
+    assert stats["throttled"] == 0
+    assert stats["current_rate_per_second"] == 10.0
+
+
+def test_permanent_errors_are_not_retried(clock):
+    scheduler = _scheduler(clock)
+    call = _failing(_http_error(404))
+    with pytest.raises(requests.HTTPError):
+        scheduler.call("api", call)
+    assert len(call.calls) == 1
+    assert scheduler.stats()["api"]["failures"] == 1
+
+
+def test_gives_up_after_max_retries(clock):
+    scheduler = _scheduler(clock, max_retries=2)
+    call = _failing(*[_http_error(500)] * 3)
+    with pytest.raises(requests.HTTPError):
+        scheduler.call("api", call)
+    assert len(call.calls) == 3
+    assert scheduler.stats()["api"]["retries"] == 2
+
+
+def test_attempts_and_retries_are_reported(clock):
+    attempts, retries = [], []
+    scheduler = _scheduler(
+        clock, on_attempt=lambda service, seconds, outcome: attempts.append(outcome),
+        on_retry=lambda service, kind: retries.append(kind),
+    )
+    scheduler.call("api", _failing(_http_error(429), _http_error(503)))
+    assert attempts == ["throttled", "server", "ok"]
+    assert retries == ["throttled", "server"]
+
+
+def test_unknown_service():
+    with pytest.raises(ValueError):
+        RequestScheduler().call("nope", lambda: None)
+
+
+def test_checkpoint_stops_a_cancelled_call(clock):
+    token = CancellationToken()
+    token.cancel()
+    scheduler = _scheduler(clock, checkpoint=token.check)
+    call = _failing()
+    with pytest.raises(Cancelled):
+        scheduler.call("api", call)
+    assert call.calls == []
+
+
+def test_cancel_during_a_backoff_stops_the_retry():
+    token = CancellationToken()
+    scheduler = RequestScheduler(base_backoff=30, max_backoff=30, checkpoint=token.check, sleep=token.wait)
+    scheduler.add_service("api", 10)
+
+    def throttled():
+        token.cancel()
+        raise _http_error(429)
+
+    # token.wait() returns at once on a cancelled token rather than sleeping out the 30s backoff
+    with pytest.raises(Cancelled):
+        scheduler.call("api", throttled)
+
+
+def test_checkpoint_runs_before_each_retry(clock):
+    token = CancellationToken()
+
+    def sleep(seconds):
+        clock.sleep(seconds)
+        token.cancel()
+
+    scheduler = RequestScheduler(checkpoint=token.check, sleep=sleep)
+    scheduler.add_service("api", 10)
+    call = _failing(_http_error(503))
+    with pytest.raises(Cancelled):
+        scheduler.call("api", call)
+    assert len(call.calls) == 1
@@ -0,0 +1,71 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from sheet_cache import SheetSnapshotCache
+
+
+def fake_sheet(rows=3):
+    return SimpleNamespace(rows=[SimpleNamespace(row_number=n, id=100 + n, cells=[1, 2]) for n in range(1, rows + 1)])
+
+
+def test_get_fetches_once_and_builds_row_ids():
+    cache = SheetSnapshotCache()
+    calls = []
+    loader = lambda sheet_id: calls.append(sheet_id) or fake_sheet()
+    first = cache.get(1, loader)
+    assert cache.get(1, loader) is first
+    assert calls == [1]
+    assert first.row_ids == {1: 101, 2: 102, 3: 103}
+
+
+def test_concurrent_callers_share_one_fetch():
+    cache = SheetSnapshotCache()
+    calls = []
+
+    def loader(sheet_id):
+        calls.append(sheet_id)
+        time.sleep(0.05)
+        return fake_sheet()
+
+    threads = [threading.Thread(target=cache.get, args=(7, loader)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [7]
+
+
+def test_snapshot_is_stored_before_loading_marker_is_released():
+    cache = SheetSnapshotCache()
+    original_store = cache._store
+
+    def store(sheet_id, snapshot):
+        # Whoever looks up the sheet while it is being stored must not see a finished load with no snapshot
+        assert sheet_id in cache._loading
+        original_store(sheet_id, snapshot)
+
+    cache._store = store
+    cache.get(1, lambda sheet_id: fake_sheet())
+    assert 1 not in cache._loading
+
+
+def test_failed_load_releases_marker():
+    cache = SheetSnapshotCache()
+
+    def loader(sheet_id):
+        raise RuntimeError("boom")
+
+    try:
+        cache.get(1, loader)
+    except RuntimeError:
+        pass
+    assert 1 not in cache._loading
+    assert cache.get(1, lambda sheet_id: fake_sheet()).row_ids
+
+
+def test_eviction_respects_cell_budget_but_keeps_newest():
+    cache = SheetSnapshotCache(max_sheets=4, max_cells=10)
+    cache.get(1, lambda sheet_id: fake_sheet(3))  # 9 cell units
+    cache.get(2, lambda sheet_id: fake_sheet(3))
+    assert list(cache._entries) == [2]
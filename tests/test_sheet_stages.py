@@ -0,0 +1,19 @@
+import config
+import main
+
+
+def test_default_settings_run_the_export_pipeline():
+    stages = [stage for _, stage in main._sheet_stages()]
+    assert main.extract_comments_from_api not in stages
+    assert main.transfer_attachments_to_drive not in stages
+    assert main.download_smartsheet_attachments in stages
+    assert config.SETTINGS["INCREMENTAL_SYNC"] is False
+    assert config.SETTINGS["DEDUP_ATTACHMENTS"] is False
+    assert config.SETTINGS["APPSHEET_DELTA_SYNC"] is False
+
+
+def test_api_comments_source_adds_the_discussions_stage(monkeypatch):
+    monkeypatch.setitem(config.SETTINGS, "COMMENTS_SOURCE", "api")
+    stages = [stage for _, stage in main._sheet_stages()]
+    assert main.extract_comments_from_api in stages
+    assert main.extract_and_store_comments not in stages
@@ -0,0 +1,80 @@
+import json
+import re
+
+import httplib2
+import pytest
+
+from drive_upload import CHUNK_ALIGNMENT, streaming_media_upload_class, upload_stream
+
+CHUNK = CHUNK_ALIGNMENT
+
+
+class FakeResumableDrive:
+    """Plays Drive's side of a resumable upload and rejects malformed Content-Range headers."""
+
+    def __init__(self):
+        self.received = bytearray()
+        self.ranges = []
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if method == "POST":
+            return httplib2.Response({"status": 200, "location": "https://upload/session"}), b""
+        content_range = headers.get("Content-Range")
+        self.ranges.append(content_range)
+        match = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", content_range or "")
+        if match is None or int(match.group(2)) < int(match.group(1)):
+            return httplib2.Response({"status": 400}), b"invalid Content-Range"
+        self.received.extend(body)
+        total = match.group(3)
+        if total != "*" and len(self.received) == int(total):
+            return httplib2.Response({"status": 200}), json.dumps({"id": "file"}).encode()
+        return httplib2.Response({"status": 308, "range": f"bytes=0-{len(self.received) - 1}"}), b""
+
+
+class FakeFiles:
+    def __init__(self, http):
+        self.http = http
+
+    def files(self):
+        return self
+
+    def create(self, body, media_body, fields):
+        from googleapiclient.http import HttpRequest
+
+        return HttpRequest(
+            self.http, lambda resp, content: json.loads(content), "https://upload/files",
+            method="POST", body=json.dumps(body), headers={"content-type": "application/json"},
+            resumable=media_body,
+        )
+
+
+def pieces(data, size=100_000):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+@pytest.mark.parametrize("length", [CHUNK * 2, CHUNK * 2 + 123, CHUNK - 1, 1])
+def test_stream_uploads_whole_content(length):
+    drive = FakeResumableDrive()
+    data = bytes(range(256)) * (length // 256) + b"x" * (length % 256)
+    progress = []
+    file = upload_stream(FakeFiles(drive), pieces(data), {"name": "a.bin"}, "application/octet-stream", CHUNK,
+                         progress_callback=lambda sent, total: progress.append((sent, total)))
+    assert file == {"id": "file"}
+    assert bytes(drive.received) == data
+    assert progress[-1] == (length, length)
+    # The closing chunk carries data and the total; no empty chunk is sent
+    assert drive.ranges[-1].endswith(f"/{length}")
+
+
+def test_size_is_unknown_until_the_end_is_read_ahead():
+    media = streaming_media_upload_class()(pieces(b"a" * (CHUNK * 4)), "application/octet-stream", CHUNK)
+    assert media.size() is None
+    media.getbytes(0, CHUNK)
+    media.getbytes(CHUNK, CHUNK)
+    assert media.size() is None
+    media.getbytes(CHUNK * 2, CHUNK)
+    # The chunk that follows is the last one
+    assert media.size() == CHUNK * 4
+    with pytest.raises(ValueError):
+        media.getbytes(0, CHUNK)
@@ -0,0 +1,75 @@
+import contextvars
+import json
+
+import config
+import main
+import ssextractor
+from sync_manifest import SyncManifest
+
+
+def test_changes_are_written_in_batches(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = SyncManifest(str(path), flush_every=3)
+    manifest.record_sheet_version("s1", 4)
+    manifest.record_file("s1", "sheet", "file-1")
+    assert not path.exists()
+    manifest.record_attachment("s1", 10, 100, "a.pdf")
+    assert json.loads(path.read_text())["sheets"]["s1"]["version"] == 4
+    manifest.complete_attachment("s1", 10, "drive-a")
+    manifest.flush()
+    reloaded = SyncManifest(str(path))
+    assert reloaded.synced_attachment_ids("s1") == {"10"}
+    assert reloaded.file_id("s1", "sheet") == "file-1"
+
+
+def test_relative_path_lives_under_workspace_root(tmp_path, monkeypatch):
+    monkeypatch.setitem(config.SETTINGS, "WORKSPACE_ROOT", str(tmp_path))
+    manifest = SyncManifest("manifest.json")
+    manifest.record_sheet_version("s1", 1)
+    manifest.flush()
+    assert (tmp_path / "manifest.json").exists()
+
+
+def _key_for(credentials, account, monkeypatch):
+    monkeypatch.setattr(ssextractor, "google_account", lambda: account)
+
+    def key():
+        config.bind_credentials(credentials)
+        return ssextractor.manifest_key(42)
+
+    return contextvars.Context().run(key)
+
+
+def test_manifest_key_depends_on_destination_and_account(monkeypatch):
+    credentials = dict(config.CREDENTIALS, GOOGLE_DRIVE_SHEETS_FOLDER_ID="folder-a")
+    base = _key_for(credentials, "a@example.iam", monkeypatch)
+    assert _key_for(dict(credentials), "a@example.iam", monkeypatch) == base
+    assert _key_for(dict(credentials, GOOGLE_DRIVE_SHEETS_FOLDER_ID="folder-b"), "a@example.iam", monkeypatch) != base
+    assert _key_for(credentials, "b@example.iam", monkeypatch) != base
+
+
+def _run_sheet(monkeypatch, stages):
+    recorded = []
+    monkeypatch.setattr(main, "_sheet_stages", lambda: stages)
+    monkeypatch.setattr(main, "incremental_sync_enabled", lambda: True)
+    monkeypatch.setattr(main, "get_sheet_version", lambda sheet_id: 7)
+    monkeypatch.setattr(main, "is_sheet_unchanged", lambda sheet_id, version: False)
+    monkeypatch.setattr(main, "record_synced_sheet", lambda sheet_id, version: recorded.append(version))
+    monkeypatch.setattr(main, "release_sheet_snapshot", lambda sheet_id: None)
+    monkeypatch.setattr(main, "flush_sync_state", lambda: None)
+    monkeypatch.setattr(main, "reset_sheet_workspace", lambda sheet_id: None)
+    return main.process_sheet(1), recorded
+
+
+def test_version_is_recorded_only_when_every_non_attachment_stage_succeeded(monkeypatch):
+    ok = lambda sheet_id: "ok"
+    failed = lambda sheet_id: None
+    nothing = lambda sheet_id: ssextractor.NOTHING_TO_DO
+    attachments = lambda sheet_id: None
+    monkeypatch.setattr(main, "ATTACHMENT_STAGES", (attachments,))
+
+    assert _run_sheet(monkeypatch, [("uploading sheet", ok), ("uploading comments", failed)]) == ("failed", [])
+    # A sheet without comments still counts as synced; attachments are tracked per file instead
+    stages = [("uploading sheet", ok), ("uploading comments", nothing), ("attachments", attachments)]
+    assert _run_sheet(monkeypatch, stages) == ("failed", [7])
+    assert _run_sheet(monkeypatch, stages[:2]) == ("done", [7])
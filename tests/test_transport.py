@@ -0,0 +1,11 @@
+from google.auth.credentials import AnonymousCredentials
+
+import transport
+
+
+def test_google_transport_does_not_follow_308():
+    # Drive's resumable uploads answer each chunk with 308 "Resume Incomplete"
+    service = transport.build_google_service("drive", "v3", AnonymousCredentials())
+    redirect_codes = service._http.http.redirect_codes
+    assert 308 not in redirect_codes
+    assert 302 in redirect_codes
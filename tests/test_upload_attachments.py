@@ -0,0 +1,12 @@
+import ssextractor
+from workspace import use_workspace
+
+
+def _no_drive_calls(*args):
+    raise AssertionError("a sheet without attachments must not touch Drive")
+
+
+def test_sheet_without_attachments_has_nothing_to_upload(tmp_path, monkeypatch):
+    monkeypatch.setattr(ssextractor, "get_or_create_drive_folder", _no_drive_calls)
+    with use_workspace(str(tmp_path)):
+        assert ssextractor.upload_attachments_to_drive(1) == {}
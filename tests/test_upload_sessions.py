@@ -0,0 +1,54 @@
+import json
+import os
+import time
+
+import config
+import drive_upload
+from drive_upload import UploadSessionStore, _session_key, aligned_chunk_size
+
+
+def test_relative_path_lives_under_workspace_root(tmp_path, monkeypatch):
+    monkeypatch.setitem(config.SETTINGS, "WORKSPACE_ROOT", str(tmp_path))
+    store = UploadSessionStore("sessions.json")
+    store.put("k", "https://upload/1")
+    assert json.loads((tmp_path / "sessions.json").read_text())["k"]["uri"] == "https://upload/1"
+
+
+def test_new_sessions_are_written_at_once_and_removals_are_batched(tmp_path):
+    path = tmp_path / "sessions.json"
+    store = UploadSessionStore(str(path), flush_every=10)
+    store.put("k", "https://upload/1")
+    assert "k" in json.loads(path.read_text())
+    store.remove("k")
+    assert "k" in json.loads(path.read_text())  # not written yet
+    store.flush()
+    assert json.loads(path.read_text()) == {}
+
+
+def test_expired_sessions_are_dropped(tmp_path):
+    path = tmp_path / "sessions.json"
+    old = time.time() - drive_upload.SESSION_MAX_AGE_SECONDS - 1
+    path.write_text(json.dumps({"old": {"uri": "u1", "created": old}, "new": {"uri": "u2", "created": time.time()}}))
+    store = UploadSessionStore(str(path))
+    assert store.get("old") is None
+    assert store.get("new") == "u2"
+    store.flush()
+    assert list(json.loads(path.read_text())) == ["new"]
+
+
+def test_session_key_survives_rewriting_the_file(tmp_path):
+    path = tmp_path / "sheet.xlsx"
+    metadata = {"name": "sheet.xlsx", "parents": ["folder"]}
+    path.write_bytes(b"x" * 1000)
+    first = _session_key(str(path), metadata)
+    os.utime(path, (1, 1))
+    path.write_bytes(b"x" * 1000)
+    assert _session_key(str(path), metadata) == first
+    path.write_bytes(b"y" * 1000)
+    assert _session_key(str(path), metadata) != first
+    assert _session_key(str(path), {"name": "sheet.xlsx", "parents": ["other"]}) != _session_key(str(path), metadata)
+
+
+def test_chunks_align_to_256_kb():
+    assert aligned_chunk_size(1) == 256 * 1024
+    assert aligned_chunk_size(300 * 1024) == 512 * 1024
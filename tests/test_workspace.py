@@ -0,0 +1,82 @@
+import os
+
+import workspace
+from workers import BoundedExecutor
+from workspace import Workspace, current_workspace, use_workspace
+
+
+def _write(path):
+    with open(path, "w") as f:
+        f.write("data")
+    return path
+
+
+def test_files_live_under_their_kind_sheet_and_row(tmp_path):
+    ws = Workspace(str(tmp_path))
+    assert ws.path(workspace.EXPORT, 5, "5.xlsx") == os.path.join(str(tmp_path), "sheets", "5", "5.xlsx")
+    assert ws.folder(workspace.ATTACHMENT, 5, row_id=77) == os.path.join(str(tmp_path), "attachments", "5", "77")
+    assert os.path.isdir(os.path.join(str(tmp_path), "attachments", "5", "77"))
+
+
+def test_single_file_kinds_keep_the_latest_artifact(tmp_path):
+    ws = Workspace(str(tmp_path))
+    ws.register(workspace.EXPORT, 5, tmp_path / "first.xlsx")
+    ws.register(workspace.EXPORT, "5", tmp_path / "second.xlsx")
+    assert ws.get_path(workspace.EXPORT, 5) == str(tmp_path / "second.xlsx")
+    assert len(ws.all(workspace.EXPORT, 5)) == 1
+    assert ws.get(workspace.SHEET, 5) is None
+    assert ws.get_path(workspace.SHEET, 5) is None
+
+
+def test_attachments_accumulate(tmp_path):
+    ws = Workspace(str(tmp_path))
+    ws.register(workspace.ATTACHMENT, 5, tmp_path / "a.pdf", row_id=77, attachment_id=1)
+    ws.register(workspace.ATTACHMENT, 5, tmp_path / "b.pdf", row_id=77, attachment_id=2)
+    artifacts = ws.all(workspace.ATTACHMENT, 5)
+    assert [(a.path, a.row_id, a.attachment_id) for a in artifacts] == [
+        (str(tmp_path / "a.pdf"), "77", "1"),
+        (str(tmp_path / "b.pdf"), "77", "2"),
+    ]
+    ws.discard(workspace.ATTACHMENT, 5)
+    assert ws.all(workspace.ATTACHMENT, 5) == []
+
+
+def test_reset_sheet_only_touches_that_sheet(tmp_path):
+    ws = Workspace(str(tmp_path))
+    stale = _write(ws.path(workspace.ATTACHMENT, 5, "old.pdf", row_id=77))
+    ws.register(workspace.ATTACHMENT, 5, stale)
+    other = ws.register(workspace.SHEET, 6, _write(ws.path(workspace.SHEET, 6, "6.xlsx")))
+
+    ws.reset_sheet(5)
+    assert not os.path.exists(os.path.join(str(tmp_path), "attachments", "5"))
+    assert ws.all(workspace.ATTACHMENT, 5) == []
+    assert ws.get(workspace.SHEET, 6) == other
+    assert os.path.exists(other.path)
+
+
+def test_forget_sheet_keeps_the_files(tmp_path):
+    ws = Workspace(str(tmp_path))
+    path = _write(ws.path(workspace.COMMENTS, 5, "5_comments.xlsx"))
+    ws.register(workspace.COMMENTS, 5, path)
+    ws.forget_sheet(5)
+    assert ws.get(workspace.COMMENTS, 5) is None
+    assert os.path.exists(path)
+
+
+def test_clear_keeps_files_in_the_root(tmp_path):
+    ws = Workspace(str(tmp_path))
+    ws.register(workspace.SHEET, 5, _write(ws.path(workspace.SHEET, 5, "5.xlsx")))
+    _write(os.path.join(ws.root, "run_report.json"))
+    ws.clear()
+    assert os.listdir(ws.root) == ["run_report.json"]
+    assert ws.get(workspace.SHEET, 5) is None
+
+
+def test_use_workspace_is_seen_by_worker_threads(tmp_path):
+    outside = current_workspace()
+    with use_workspace(str(tmp_path)) as ws:
+        assert current_workspace() is ws
+        with BoundedExecutor(2) as executor:
+            seen = executor.submit(current_workspace).result()
+        assert seen is ws
+    assert current_workspace() is outside
@@ -0,0 +1,72 @@
+import openpyxl
+import pandas as pd
+import pytest
+
+import xlsx_stream
+
+
+def _write_sheet(path, rows):
+    book = openpyxl.Workbook()
+    sheet = book.active
+    for row_number, row in enumerate(rows, start=1):
+        for column, value in enumerate(row, start=1):
+            if value is not None:
+                sheet.cell(row=row_number, column=column, value=value)
+    book.save(path)
+
+
+def _as_pandas(path, row_ids, filename):
+    """What the pandas-based prepare step produced for the same export."""
+    df = pd.read_excel(path)
+    if "Row ID" not in df.columns:
+        df.insert(0, "Row ID", [row_ids.get(n) for n in range(1, len(df) + 1)])
+    df["Filename"] = filename
+    return df
+
+
+def test_column_names_match_pandas():
+    assert xlsx_stream.column_names(["A", "B", "A", None, "A.1", "A"]) == [
+        "A", "B", "A.1", "Unnamed: 3", "A.1.1", "A.2",
+    ]
+
+
+@pytest.mark.parametrize("rows", [
+    # A value past the header's last title gets its own 'Unnamed' column, not the Filename one
+    [["A", "B", "A", None], ["x", "y", None, None, "z"], [1, 2, 3]],
+    # Blank header cells in the middle and at the end, with data under them
+    [["A", None, "C", None], [1, 2, 3, 4], [5]],
+    # Blank rows in between are kept, trailing ones dropped
+    [["A", "B"], [1, 2], [], [3, 4], [], []],
+    # Header only
+    [["A", "B"]],
+    # The sheet already has Row ID and Filename columns: neither is added a second time
+    [["Filename", "Row ID", "A"], ["old.xlsx", 55, "x"], [None, 56, "y"]],
+])
+def test_upload_table_matches_pandas(tmp_path, rows):
+    source = tmp_path / "export.xlsx"
+    dest = tmp_path / "prepared.xlsx"
+    _write_sheet(source, rows)
+    row_ids = {1: 101, 2: 102, 3: 103, 4: 104}
+
+    with xlsx_stream.open_workbook(source) as book:
+        written = xlsx_stream.write_upload_table(book.active, dest, row_ids, "export.xlsx")
+
+    expected = _as_pandas(source, row_ids, "export.xlsx")
+    actual = pd.read_excel(dest)
+    assert written == len(expected)
+    assert list(actual.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+def test_value_past_header_stays_out_of_filename(tmp_path):
+    source = tmp_path / "export.xlsx"
+    dest = tmp_path / "prepared.xlsx"
+    _write_sheet(source, [["A", "B", "A", None], ["x", "y", None, None, "z"]])
+
+    with xlsx_stream.open_workbook(source) as book:
+        xlsx_stream.write_upload_table(book.active, dest, {1: 7}, "export.xlsx")
+
+    actual = pd.read_excel(dest)
+    assert list(actual.columns) == ["Row ID", "A", "B", "A.1", "Unnamed: 3", "Unnamed: 4", "Filename"]
+    assert actual.loc[0, "Unnamed: 4"] == "z"
+    assert actual.loc[0, "Filename"] == "export.xlsx"
@@ -0,0 +1,128 @@
+# transport.py
+# HTTP plumbing shared by every API call: keep-alive requests sessions with bounded connection pools,
+# and the Google service account credentials and API clients. Nothing heavy is imported until first use.
+import json
+import threading
+
+import requests
+import requests.adapters
+
+import config
+from rate_limiter import scheduled_request_class
+
+SCOPES = ["https://www.googleapis.com/auth/drive", "https://www.googleapis.com/auth/spreadsheets"]
+
+
+def http_timeout():
+    """(connect, read) timeout applied to every request that doesn't set its own."""
+    return (config.SETTINGS["HTTP_CONNECT_TIMEOUT_SECONDS"], config.SETTINGS["HTTP_READ_TIMEOUT_SECONDS"])
+
+
+class TimeoutHTTPAdapter(requests.adapters.HTTPAdapter):
+    """requests adapter that applies a default (connect, read) timeout to every request."""
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def mount_pooled_adapter(session, pool_size=None):
+    """Mounts a timeout-applying adapter keeping up to pool_size (HTTP_POOL_MAXSIZE) connections per host on session."""
+    adapter = TimeoutHTTPAdapter(
+        http_timeout(),
+        pool_connections=config.SETTINGS["HTTP_POOL_CONNECTIONS"],
+        pool_maxsize=pool_size or config.SETTINGS["HTTP_POOL_MAXSIZE"],
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# requests sessions aren't guaranteed thread-safe, so each thread keeps its own, reused across calls
+_sessions = threading.local()
+
+
+def get_session():
+    """Returns the calling thread's keep-alive requests session."""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = mount_pooled_adapter(requests.Session())
+    return session
+
+
+# ✅ Google service account credentials (loaded on first use, then cached per key file)
+_google_credentials = {}
+_google_credentials_lock = threading.Lock()
+
+
+def google_service_account_file():
+    """Service account key file of the job running in this context (config.CREDENTIALS outside a job)."""
+    return config.current_credentials().get("GOOGLE_SERVICE_ACCOUNT_FILE") or config.CREDENTIALS["GOOGLE_SERVICE_ACCOUNT_FILE"]
+
+
+def get_google_credentials():
+    """Returns the service account credentials for this context, reading the key file on first use."""
+    key_file = google_service_account_file()
+    with _google_credentials_lock:
+        credentials = _google_credentials.get(key_file)
+        if credentials is None:
+            from google.oauth2 import service_account
+            credentials = service_account.Credentials.from_service_account_file(key_file, scopes=SCOPES)
+            _google_credentials[key_file] = credentials
+    return credentials
+
+
+def google_access_token():
+    """A current OAuth access token of the service account, for plain HTTP calls to Google APIs."""
+    import google.auth.transport.requests
+
+    credentials = get_google_credentials()
+    if not credentials.valid:
+        credentials.refresh(google.auth.transport.requests.Request(session=get_session()))
+    return credentials.token
+
+
+# ✅ Google API clients
+def build_google_service(name, version, credentials, scheduler=None):
+    """Builds a Google API client whose requests go through scheduler (when given) and time out instead of hanging."""
+    import httplib2
+    import google_auth_httplib2
+    from googleapiclient.discovery import build, build_from_document
+    from googleapiclient.discovery_cache import get_static_doc
+
+    transport = httplib2.Http(timeout=http_timeout()[1])
+    # Drive answers resumable upload chunks with 308 "Resume Incomplete"; httplib2 must not follow it as a redirect
+    transport.redirect_codes = transport.redirect_codes - {308}
+    http = google_auth_httplib2.AuthorizedHttp(credentials, http=transport)
+    options = {"http": http}
+    if scheduler is not None:
+        options["requestBuilder"] = scheduled_request_class(scheduler, name)
+    root_url = config.SETTINGS["GOOGLE_API_ROOT_URL"]
+    if root_url:
+        # Swap the root in the discovery document itself, so media uploads and batch requests move with it
+        document = json.loads(get_static_doc(name, version))
+        document["rootUrl"] = document["mtlsRootUrl"] = root_url.rstrip("/") + "/"
+        return build_from_document(document, **options)
+    return build(name, version, **options)
+
+
+# httplib2 transports are not thread-safe, so each thread gets its own clients, built on first use
+# and kept alive for the thread's later calls
+_google_services = threading.local()
+
+
+def get_google_service(name, version, scheduler=None):
+    """Returns a Google API client owned by the calling thread, for this context's service account."""
+    services = getattr(_google_services, "services", None)
+    if services is None:
+        services = _google_services.services = {}
+    key = (name, version, google_service_account_file(), id(scheduler))
+    service = services.get(key)
+    if service is None:
+        service = services[key] = build_google_service(name, version, get_google_credentials(), scheduler)
+    return service
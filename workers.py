@@ -0,0 +1,42 @@
+# workers.py
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a bounded backlog: submit() blocks once `max_workers + queue_size`
+    tasks are pending, so producers can't queue up an unbounded amount of work.
+    """
+
+    def __init__(self, max_workers, queue_size=None, thread_name_prefix="worker"):
+        self.max_workers = max(1, int(max_workers))
+        queue_size = self.max_workers * 2 if queue_size is None else max(0, int(queue_size))
+        self._slots = threading.BoundedSemaphore(self.max_workers + queue_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix=thread_name_prefix
+        )
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs), waiting for a free slot; the caller's context variables are carried over."""
+        self._slots.acquire()
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(context.run, fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """Stops the pool; cancel_pending drops tasks that have not started yet."""
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(wait=True, cancel_pending=exc_type is not None)
+        return False
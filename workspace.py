@@ -0,0 +1,138 @@
+# workspace.py
+import contextlib
+import contextvars
+import os
+import shutil
+import threading
+from collections import namedtuple
+
+import config
+
+# ✅ Artifact kinds produced and consumed by the sheet stages
+EXPORT = "export"  # Excel export as downloaded from Smartsheet
+SHEET = "sheet"  # Export with Row ID / Filename columns, ready for Drive
+COMMENTS = "comments"  # Comments table (merged with row IDs once the merge stage ran)
+ROW_MAPPING = "row_mapping"  # Relative Row → Row ID table
+ATTACHMENT = "attachment"  # One downloaded attachment (one artifact per file)
+
+# Local folder each kind lives under: {root}/{folder}/{sheet_id}/...
+_FOLDERS = {
+    EXPORT: "sheets",
+    SHEET: "sheets",
+    COMMENTS: "comments",
+    ROW_MAPPING: "row_mapping",
+    ATTACHMENT: "attachments",
+}
+
+Artifact = namedtuple("Artifact", ["kind", "sheet_id", "path", "row_id", "attachment_id"], defaults=[None, None])
+
+
+class Workspace:
+    """
+    Local working area of a run, rooted at `root`, plus the registry of the files each stage produced.
+
+    Stages register the exact path they wrote and later stages look it up by (sheet ID, kind), so no
+    stage has to scan a folder and guess which file is the right one.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._artifacts = {}
+        self._lock = threading.Lock()
+
+    def folder(self, kind, sheet_id, row_id=None):
+        """Returns (and creates) the folder artifacts of this kind are written to."""
+        parts = [self.root, _FOLDERS[kind], str(sheet_id)]
+        if row_id is not None:
+            parts.append(str(row_id))
+        path = os.path.join(*parts)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def path(self, kind, sheet_id, file_name, row_id=None):
+        return os.path.join(self.folder(kind, sheet_id, row_id), file_name)
+
+    def register(self, kind, sheet_id, path, row_id=None, attachment_id=None):
+        """Records a file a stage produced; a single-file kind replaces its earlier artifact."""
+        artifact = Artifact(
+            kind, str(sheet_id), os.path.abspath(path),
+            None if row_id is None else str(row_id),
+            None if attachment_id is None else str(attachment_id),
+        )
+        with self._lock:
+            entries = self._artifacts.setdefault((str(sheet_id), kind), [])
+            if kind != ATTACHMENT:
+                entries.clear()
+            entries.append(artifact)
+        return artifact
+
+    def get(self, kind, sheet_id):
+        """Returns the registered artifact of this kind for the sheet, or None."""
+        with self._lock:
+            entries = self._artifacts.get((str(sheet_id), kind))
+            return entries[-1] if entries else None
+
+    def get_path(self, kind, sheet_id):
+        artifact = self.get(kind, sheet_id)
+        return artifact.path if artifact else None
+
+    def all(self, kind, sheet_id):
+        with self._lock:
+            return list(self._artifacts.get((str(sheet_id), kind), []))
+
+    def discard(self, kind, sheet_id):
+        with self._lock:
+            self._artifacts.pop((str(sheet_id), kind), None)
+
+    def forget_sheet(self, sheet_id):
+        """Drops every artifact registered for the sheet (the files stay on disk)."""
+        with self._lock:
+            for key in [key for key in self._artifacts if key[0] == str(sheet_id)]:
+                del self._artifacts[key]
+
+    def reset_sheet(self, sheet_id):
+        """Clears the sheet's local working folders and registry entries so it only sees files from its own run."""
+        self.forget_sheet(sheet_id)
+        for folder in set(_FOLDERS.values()):
+            shutil.rmtree(os.path.join(self.root, folder, str(sheet_id)), ignore_errors=True)
+
+    def clear(self):
+        """Removes every working folder and registry entry; files directly in the root (the run report) stay."""
+        with self._lock:
+            self._artifacts.clear()
+        for folder in set(_FOLDERS.values()):
+            shutil.rmtree(os.path.join(self.root, folder), ignore_errors=True)
+
+
+_default_workspace = None
+_default_lock = threading.Lock()
+_current_workspace = contextvars.ContextVar("workspace", default=None)
+
+
+def current_workspace():
+    """The workspace of the running migration (worker threads inherit it), or the default one under WORKSPACE_ROOT."""
+    global _default_workspace
+    workspace = _current_workspace.get()
+    if workspace is not None:
+        return workspace
+    with _default_lock:
+        if _default_workspace is None:
+            _default_workspace = Workspace(config.SETTINGS["WORKSPACE_ROOT"])
+        return _default_workspace
+
+
+def bind_workspace(root):
+    """Makes a workspace at root current for the rest of this context (used to set up a job's context)."""
+    workspace = Workspace(root)
+    _current_workspace.set(workspace)
+    return workspace
+
+
+@contextlib.contextmanager
+def use_workspace(root):
+    """Runs the enclosed block (and the threads it starts through BoundedExecutor) against a workspace at root."""
+    token = _current_workspace.set(Workspace(root))
+    try:
+        yield _current_workspace.get()
+    finally:
+        _current_workspace.reset(token)
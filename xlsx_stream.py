@@ -0,0 +1,126 @@
+# xlsx_stream.py
+# Row-by-row xlsx transforms: read with openpyxl's read-only iterator, write with a write-only workbook,
+# so memory stays flat however large the sheet is. openpyxl is imported on first use.
+import contextlib
+
+from table_writer import XlsxTableWriter
+
+
+@contextlib.contextmanager
+def open_workbook(path):
+    """Opens an xlsx read-only (cell values, not formulas) and closes it afterwards."""
+    import openpyxl
+
+    book = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield book
+    finally:
+        book.close()
+
+
+def column_names(header):
+    """Header titles as pandas reads them: blanks become 'Unnamed: n', repeats get '.1', '.2', ... suffixes."""
+    names = []
+    counts = {}
+    for index, name in enumerate(header):
+        if name is None or name == "":
+            name = f"Unnamed: {index}"
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        counts[name] = count + 1
+        names.append(name)
+    return names
+
+
+class UploadLayout:
+    """
+    Columns of the table uploaded to Drive, as the pandas prepare step built them from a sheet's header:
+    'Row ID' is inserted first unless the sheet already has one, and 'Filename' is added last unless the
+    sheet already has one, in which case that column is filled with the file name instead.
+    """
+
+    def __init__(self, header):
+        header = list(header)
+        self.add_row_id = "Row ID" not in header
+        self.filename_index = header.index("Filename") if "Filename" in header else None
+        self.columns = (["Row ID"] if self.add_row_id else []) + header
+        if self.filename_index is None:
+            self.columns.append("Filename")
+
+    def row(self, row_id, values, filename):
+        """A table row from the sheet row's values (one per header column), its Row ID and the file name."""
+        values = list(values)
+        if self.filename_index is None:
+            values.append(filename)
+        else:
+            values[self.filename_index] = filename
+        return ([row_id] if self.add_row_id else []) + values
+
+
+def _cell_value(cell):
+    """A read-only cell's value as pandas would hand it back: errors and empty text are blank, whole floats are ints."""
+    if cell.data_type == "e":
+        return None
+    value = cell.value
+    if value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _width(row):
+    """Columns up to the row's last non-blank cell; like pandas, error cells count as filled."""
+    end = len(row)
+    while end and row[end - 1].value in (None, ""):
+        end -= 1
+    return end
+
+
+def write_upload_table(worksheet, dest_path, row_ids, filename):
+    """
+    Streams worksheet (the exported sheet tab) into a new workbook at dest_path with a 'Row ID' column
+    first (looked up in row_ids by data row number) and a 'Filename' column last (see UploadLayout). The
+    first row is the header. Trailing blank rows are dropped; blank rows in between are kept so Row IDs
+    stay aligned.
+    Returns the number of data rows written.
+
+    The table is as wide as its widest row, as pandas reads it: a first pass over the sheet finds that
+    width, so a value past the header's last title lands under an 'Unnamed: n' column, not 'Filename'.
+    """
+    if hasattr(worksheet, "reset_dimensions"):
+        # Exported files may carry a too-small dimension tag; read every cell that is there
+        worksheet.reset_dimensions()
+    width = max((_width(row) for row in worksheet.iter_rows()), default=0)
+
+    def padded(row):
+        values = [_cell_value(c) for c in row[:width]]
+        return values + [None] * (width - len(values))
+
+    rows = worksheet.iter_rows()
+    layout = UploadLayout(column_names(padded(next(rows, ()))))
+    if not layout.add_row_id:
+        print(f"⚠️ 'Row ID' column already exists in {filename}, skipping insertion.")
+    out = XlsxTableWriter(dest_path, layout.columns)
+
+    def write(row_number, values):
+        out.append(layout.row(row_ids.get(row_number), values, filename))
+
+    written = 0
+    pending_blank = 0  # blank rows held back until a later row shows they aren't trailing
+    for row in rows:
+        if not _width(row):
+            pending_blank += 1
+            continue
+        for _ in range(pending_blank):
+            written += 1
+            write(written, [None] * width)
+        pending_blank = 0
+        written += 1
+        write(written, padded(row))
+
+    out.close()
+    return written